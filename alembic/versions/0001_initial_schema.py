@@ -0,0 +1,81 @@
+"""initial schema
+
+Creates the users, beacons and presence_logs tables on an empty database.
+Databases that already have the tables (created before migrations were
+tracked) are left unchanged, so this revision can be applied everywhere.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_initial_schema"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing_tables:
+        op.create_table(
+            "users",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "beacons" not in existing_tables:
+        op.create_table(
+            "beacons",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("beacon_id", sa.String(), nullable=False),
+            sa.Column("location_name", sa.String(), nullable=True),
+            sa.Column("latitude", sa.Float(), nullable=True),
+            sa.Column("longitude", sa.Float(), nullable=True),
+            sa.Column("app_token", sa.String(length=255), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_beacons_id", "beacons", ["id"])
+        op.create_index("ix_beacons_beacon_id", "beacons", ["beacon_id"], unique=True)
+
+    if "presence_logs" not in existing_tables:
+        op.create_table(
+            "presence_logs",
+            sa.Column(
+                "id",
+                postgresql.UUID(as_uuid=True),
+                primary_key=True,
+                server_default=sa.func.gen_random_uuid()
+            ),
+            sa.Column("user_id", sa.Text(), nullable=False),
+            sa.Column("beacon_id", sa.Text(), nullable=True),
+            sa.Column("timestamp", sa.DateTime(timezone=False), nullable=True),
+            sa.Column("latitude", sa.Float(), nullable=True),
+            sa.Column("longitude", sa.Float(), nullable=True),
+            sa.Column("signal_strength", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=False), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=False), nullable=True),
+        )
+        op.create_index("ix_presence_logs_id", "presence_logs", ["id"])
+        op.create_index("ix_presence_logs_user_id", "presence_logs", ["user_id"])
+        op.create_index("ix_presence_logs_beacon_id", "presence_logs", ["beacon_id"])
+
+
+def downgrade() -> None:
+    # The tables may predate this revision; never drop production data here
+    pass
@@ -0,0 +1,75 @@
+"""presence log composite and BRIN indexes
+
+Adds the indexes behind the hot presence-log queries, which filter by
+user_id or beacon_id with a timestamp range and sort by timestamp desc:
+
+    ix_presence_logs_user_id_timestamp    (user_id, "timestamp" DESC)
+    ix_presence_logs_beacon_id_timestamp  (beacon_id, "timestamp" DESC)
+    ix_presence_logs_created_at_brin      BRIN (created_at)
+
+On PostgreSQL the indexes are built CONCURRENTLY so ingestion keeps
+running during the migration; CREATE INDEX CONCURRENTLY cannot run inside
+a transaction, hence the autocommit block.
+
+Revision ID: 0002_presence_log_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_presence_log_indexes"
+down_revision: Union[str, None] = "0001_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COMPOSITE_INDEXES = {
+    "ix_presence_logs_user_id_timestamp": "user_id",
+    "ix_presence_logs_beacon_id_timestamp": "beacon_id",
+}
+BRIN_INDEX = "ix_presence_logs_created_at_brin"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, column in COMPOSITE_INDEXES.items():
+            op.create_index(name, "presence_logs", [column, sa.text('"timestamp" DESC')])
+        return
+
+    with op.get_context().autocommit_block():
+        for name, column in COMPOSITE_INDEXES.items():
+            op.create_index(
+                name,
+                "presence_logs",
+                [column, sa.text('"timestamp" DESC')],
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+        op.create_index(
+            BRIN_INDEX,
+            "presence_logs",
+            ["created_at"],
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name in COMPOSITE_INDEXES:
+            op.drop_index(name, table_name="presence_logs")
+        return
+
+    with op.get_context().autocommit_block():
+        for name in (BRIN_INDEX, *COMPOSITE_INDEXES):
+            op.drop_index(
+                name,
+                table_name="presence_logs",
+                postgresql_concurrently=True,
+                if_exists=True
+            )
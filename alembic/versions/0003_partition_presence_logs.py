@@ -0,0 +1,211 @@
+"""partition presence_logs by timestamp
+
+Converts presence_logs into a table partitioned by RANGE ("timestamp").
+
+    1. Views that depend on presence_logs (e.g. v_presence_tracking) are
+       captured with pg_get_viewdef and dropped, deepest first
+    2. The table is renamed to presence_logs_legacy
+    3. A partitioned presence_logs is created with the same columns;
+       "timestamp" becomes NOT NULL and the primary key becomes
+       (id, "timestamp") because the partition key must be part of it
+    4. Partitions are created for the existing data plus the premake window,
+       with a DEFAULT partition for rows outside every range
+    5. Rows are copied (NULL timestamps fall back to created_at), indexes,
+       foreign keys and views are recreated and the legacy table is dropped
+
+The whole conversion runs in one transaction and rewrites the table, so run
+it in a maintenance window. Grants on the recreated views must be reapplied.
+Afterwards partitions are managed by PartitionService
+(POST /v1/maintenance/presence-partitions).
+
+Partition granularity follows PRESENCE_PARTITION_INTERVAL ("month" or
+"day") and must not be changed after this revision has run.
+
+Revision ID: 0003_partition_presence_logs
+Revises: 0002_presence_log_indexes
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+import os
+from datetime import date, timedelta
+from typing import List, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_partition_presence_logs"
+down_revision: Union[str, None] = "0002_presence_log_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INTERVAL = os.getenv("PRESENCE_PARTITION_INTERVAL", "month").lower()
+PREMAKE = int(os.getenv("PRESENCE_PARTITION_PREMAKE", "3"))
+
+INDEXES = (
+    'CREATE INDEX ix_presence_logs_id ON presence_logs (id)',
+    'CREATE INDEX ix_presence_logs_user_id ON presence_logs (user_id)',
+    'CREATE INDEX ix_presence_logs_beacon_id ON presence_logs (beacon_id)',
+    'CREATE INDEX ix_presence_logs_user_id_timestamp ON presence_logs (user_id, "timestamp" DESC)',
+    'CREATE INDEX ix_presence_logs_beacon_id_timestamp ON presence_logs (beacon_id, "timestamp" DESC)',
+    'CREATE INDEX ix_presence_logs_created_at_brin ON presence_logs USING brin (created_at)',
+)
+
+# Views depending on presence_logs, directly or through other views
+DEPENDENT_VIEWS_SQL = """
+WITH RECURSIVE dependents(oid, depth) AS (
+    SELECT DISTINCT r.ev_class, 1
+    FROM pg_depend d
+    JOIN pg_rewrite r ON r.oid = d.objid
+    WHERE d.refobjid = 'presence_logs'::regclass AND r.ev_class <> 'presence_logs'::regclass
+    UNION
+    SELECT r.ev_class, dependents.depth + 1
+    FROM dependents
+    JOIN pg_depend d ON d.refobjid = dependents.oid
+    JOIN pg_rewrite r ON r.oid = d.objid
+    WHERE r.ev_class <> dependents.oid
+)
+SELECT n.nspname, c.relname, c.relkind, pg_get_viewdef(c.oid), max(dependents.depth) AS depth
+FROM dependents
+JOIN pg_class c ON c.oid = dependents.oid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+GROUP BY n.nspname, c.relname, c.relkind, c.oid
+ORDER BY depth
+"""
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_bound(start: date) -> date:
+    if INTERVAL == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: date) -> str:
+    if INTERVAL == "day":
+        return f"presence_logs_p{start:%Y%m%d}"
+    return f"presence_logs_p{start:%Y%m}"
+
+
+def partition_ranges(first: date, last: date) -> List[Tuple[str, date, date]]:
+    """Ranges from the period containing first up to the one containing last."""
+    start = first if INTERVAL == "day" else month_start(first)
+    ranges = []
+    while start <= last:
+        end = next_bound(start)
+        ranges.append((partition_name(start), start, end))
+        start = end
+    return ranges
+
+
+def capture_dependent_views(connection) -> List[Tuple[str, str, str, str]]:
+    views = [tuple(row[:4]) for row in connection.execute(sa.text(DEPENDENT_VIEWS_SQL))]
+    for schema, name, kind, _ in reversed(views):
+        keyword = "MATERIALIZED VIEW" if kind == "m" else "VIEW"
+        op.execute(f'DROP {keyword} "{schema}"."{name}"')
+    return views
+
+
+def restore_dependent_views(views: List[Tuple[str, str, str, str]]) -> None:
+    for schema, name, kind, definition in views:
+        keyword = "MATERIALIZED VIEW" if kind == "m" else "VIEW"
+        op.execute(f'CREATE {keyword} "{schema}"."{name}" AS {definition}')
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        # Declarative partitioning is PostgreSQL only
+        return
+
+    if INTERVAL not in ("month", "day"):
+        raise ValueError("PRESENCE_PARTITION_INTERVAL must be 'month' or 'day'")
+
+    views = capture_dependent_views(connection)
+    foreign_keys = connection.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = 'presence_logs'::regclass AND contype = 'f'"
+    )).all()
+
+    op.execute("ALTER TABLE presence_logs RENAME TO presence_logs_legacy")
+    for index_name in connection.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'presence_logs_legacy' "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint "
+        "WHERE conrelid = 'presence_logs_legacy'::regclass)"
+    )).scalars():
+        op.execute(f'DROP INDEX "{index_name}"')
+    primary_key = connection.execute(sa.text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = 'presence_logs_legacy'::regclass AND contype = 'p'"
+    )).scalar()
+    if primary_key:
+        op.execute(f'ALTER TABLE presence_logs_legacy RENAME CONSTRAINT "{primary_key}" TO presence_logs_legacy_pkey')
+
+    op.execute(
+        "CREATE TABLE presence_logs (LIKE presence_logs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        'PARTITION BY RANGE ("timestamp")'
+    )
+    op.execute('ALTER TABLE presence_logs ALTER COLUMN "timestamp" SET NOT NULL')
+    op.execute('ALTER TABLE presence_logs ADD CONSTRAINT presence_logs_pkey PRIMARY KEY (id, "timestamp")')
+
+    bounds = connection.execute(sa.text(
+        'SELECT min(COALESCE("timestamp", created_at))::date FROM presence_logs_legacy'
+    )).scalar()
+    today = date.today()
+    last = today + timedelta(days=PREMAKE) if INTERVAL == "day" else today + timedelta(days=31 * PREMAKE)
+    for name, start, end in partition_ranges(min(bounds or today, today), last):
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF presence_logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    op.execute("CREATE TABLE presence_logs_default PARTITION OF presence_logs DEFAULT")
+
+    op.execute(
+        'UPDATE presence_logs_legacy SET "timestamp" = COALESCE(created_at, now()) WHERE "timestamp" IS NULL'
+    )
+    op.execute("INSERT INTO presence_logs SELECT * FROM presence_logs_legacy")
+
+    for statement in INDEXES:
+        op.execute(statement)
+    for name, definition in foreign_keys:
+        op.execute(f'ALTER TABLE presence_logs ADD CONSTRAINT "{name}" {definition}')
+
+    op.execute("DROP TABLE presence_logs_legacy")
+    restore_dependent_views(views)
+    op.execute("ANALYZE presence_logs")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+
+    views = capture_dependent_views(connection)
+    foreign_keys = connection.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = 'presence_logs'::regclass AND contype = 'f'"
+    )).all()
+
+    op.execute("ALTER TABLE presence_logs RENAME TO presence_logs_partitioned")
+    op.execute("ALTER TABLE presence_logs_partitioned RENAME CONSTRAINT presence_logs_pkey TO presence_logs_partitioned_pkey")
+    for index_name in connection.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'presence_logs_partitioned' "
+        "AND indexname LIKE 'ix_presence_logs_%'"
+    )).scalars():
+        op.execute(f'DROP INDEX "{index_name}"')
+
+    op.execute("CREATE TABLE presence_logs (LIKE presence_logs_partitioned INCLUDING DEFAULTS)")
+    op.execute('ALTER TABLE presence_logs ALTER COLUMN "timestamp" DROP NOT NULL')
+    op.execute("ALTER TABLE presence_logs ADD CONSTRAINT presence_logs_pkey PRIMARY KEY (id)")
+    op.execute("INSERT INTO presence_logs SELECT * FROM presence_logs_partitioned")
+
+    for statement in INDEXES:
+        op.execute(statement)
+    for name, definition in foreign_keys:
+        op.execute(f'ALTER TABLE presence_logs ADD CONSTRAINT "{name}" {definition}')
+
+    # Detached partitions are independent tables and are left alone
+    op.execute("DROP TABLE presence_logs_partitioned")
+    restore_dependent_views(views)
@@ -0,0 +1,47 @@
+"""presence_state table
+
+Adds presence_state, the latest detection per user, which the absence
+queries read instead of aggregating presence_logs. The API upserts it on
+every presence-log insert; this revision backfills it from the existing
+logs. Rebuild it later with python -m app.tools.rebuild_presence_state.
+
+Revision ID: 0004_presence_state
+Revises: 0003_partition_presence_logs
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_presence_state"
+down_revision: Union[str, None] = "0003_partition_presence_logs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "presence_state",
+        sa.Column("user_id", sa.Text(), primary_key=True),
+        sa.Column("last_detected_at", sa.DateTime(timezone=False), nullable=False),
+        sa.Column("beacon_id", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=False), server_default=sa.func.now()),
+    )
+    op.execute("""
+        INSERT INTO presence_state (user_id, last_detected_at, beacon_id, updated_at)
+        SELECT user_id, "timestamp", beacon_id, CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, "timestamp", beacon_id,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY "timestamp" DESC, created_at DESC) AS position
+            FROM presence_logs
+            WHERE "timestamp" IS NOT NULL
+        ) AS latest
+        WHERE position = 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("presence_state")
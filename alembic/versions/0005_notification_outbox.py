@@ -0,0 +1,62 @@
+"""notification outbox
+
+Adds notification_jobs and notification_outbox. With
+NOTIFICATION_OUTBOX_ENABLED the notification endpoints only enqueue rows
+here and background workers deliver them (see
+app/services/notification_outbox.py).
+
+Revision ID: 0005_notification_outbox
+Revises: 0004_presence_state
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_notification_outbox"
+down_revision: Union[str, None] = "0004_presence_state"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=False), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "job_id", postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("notification_jobs.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("position", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("employee_id", sa.Text(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=False), nullable=False),
+        sa.Column("response_code", sa.Integer(), nullable=True),
+        sa.Column("response_message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=False), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=False), nullable=True),
+    )
+    op.create_index("ix_notification_outbox_job_id", "notification_outbox", ["job_id"])
+    op.create_index(
+        "ix_notification_outbox_status_next_attempt_at", "notification_outbox", ["status", "next_attempt_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_outbox_status_next_attempt_at", table_name="notification_outbox")
+    op.drop_index("ix_notification_outbox_job_id", table_name="notification_outbox")
+    op.drop_table("notification_outbox")
+    op.drop_table("notification_jobs")
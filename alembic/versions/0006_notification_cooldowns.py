@@ -0,0 +1,34 @@
+"""notification cooldowns
+
+Adds notification_cooldowns, the last time each notification type was sent
+to each employee. notify-absence skips employees notified within
+NOTIFICATION_COOLDOWN_MINUTES.
+
+Revision ID: 0006_notification_cooldowns
+Revises: 0005_notification_outbox
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_notification_cooldowns"
+down_revision: Union[str, None] = "0005_notification_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_cooldowns",
+        sa.Column("employee_id", sa.Text(), primary_key=True),
+        sa.Column("kind", sa.String(16), primary_key=True),
+        sa.Column("last_sent_at", sa.DateTime(timezone=False), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("notification_cooldowns")
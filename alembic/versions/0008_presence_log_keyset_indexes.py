@@ -0,0 +1,92 @@
+"""presence log keyset indexes
+
+Replaces the (user_id, "timestamp" DESC) and (beacon_id, "timestamp" DESC)
+indexes of revision 0002 with indexes that end in id DESC, the tie-breaker
+of GET /v1/presence-logs, so a page is a range scan of the index instead of
+a sort of every matching row:
+
+    ix_presence_logs_user_id_timestamp_id    (user_id, "timestamp" DESC, id DESC)
+    ix_presence_logs_beacon_id_timestamp_id  (beacon_id, "timestamp" DESC, id DESC)
+
+A partitioned presence_logs (revision 0003) cannot be indexed CONCURRENTLY,
+so the index is created on the parent only and every partition's index is
+built CONCURRENTLY and attached to it, which keeps ingestion running.
+
+Revision ID: 0008_presence_log_keyset_indexes
+Revises: 0007_refresh_tokens
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_presence_log_keyset_indexes"
+down_revision: Union[str, None] = "0007_refresh_tokens"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# new index -> (replaced index, leading column)
+KEYSET_INDEXES = {
+    "ix_presence_logs_user_id_timestamp_id": ("ix_presence_logs_user_id_timestamp", "user_id"),
+    "ix_presence_logs_beacon_id_timestamp_id": ("ix_presence_logs_beacon_id_timestamp", "beacon_id"),
+}
+
+PARTITIONS_SQL = (
+    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = 'presence_logs'::regclass ORDER BY c.relname"
+)
+
+
+def is_partitioned(connection) -> bool:
+    return connection.execute(sa.text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = 'presence_logs'::regclass"
+    )).scalar()
+
+
+def create_index(connection, name: str, columns: str) -> None:
+    if not is_partitioned(connection):
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON presence_logs ({columns})")
+        return
+
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY presence_logs ({columns})")
+    for partition in connection.execute(sa.text(PARTITIONS_SQL)).scalars().all():
+        partition_index = f"{partition}_{name[len('ix_presence_logs_'):]}"[:63]
+        op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{partition_index}" ON "{partition}" ({columns})')
+        op.execute(f'ALTER INDEX {name} ATTACH PARTITION "{partition_index}"')
+
+
+def drop_index(connection, name: str) -> None:
+    # Partitioned indexes cannot be dropped CONCURRENTLY
+    concurrently = "" if is_partitioned(connection) else "CONCURRENTLY "
+    op.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        for name, (old_name, column) in KEYSET_INDEXES.items():
+            op.drop_index(old_name, table_name="presence_logs")
+            op.create_index(name, "presence_logs", [column, sa.text('"timestamp" DESC'), sa.text("id DESC")])
+        return
+
+    with op.get_context().autocommit_block():
+        for name, (old_name, column) in KEYSET_INDEXES.items():
+            create_index(connection, name, f'{column}, "timestamp" DESC, id DESC')
+            drop_index(connection, old_name)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        for name, (old_name, column) in KEYSET_INDEXES.items():
+            op.drop_index(name, table_name="presence_logs")
+            op.create_index(old_name, "presence_logs", [column, sa.text('"timestamp" DESC')])
+        return
+
+    with op.get_context().autocommit_block():
+        for name, (old_name, column) in KEYSET_INDEXES.items():
+            create_index(connection, old_name, f'{column}, "timestamp" DESC')
+            drop_index(connection, name)
@@ -0,0 +1,29 @@
+"""user tokens_valid_after
+
+Adds users.tokens_valid_after. Access tokens issued before it are rejected
+when they are verified (on every miss of the verified-token cache); it is
+set when refresh token reuse revokes a user's tokens.
+
+Revision ID: 0009_user_tokens_valid_after
+Revises: 0008_presence_log_keyset_indexes
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_user_tokens_valid_after"
+down_revision: Union[str, None] = "0008_presence_log_keyset_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("tokens_valid_after", sa.DateTime(timezone=False), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "tokens_valid_after")
@@ -0,0 +1,55 @@
+"""employee roster
+
+Creates employee_roster, a materialized view with the employee, shift and
+store columns of v_presence_tracking but not its "Last Detection", so the
+absence queries join it to presence_state without aggregating presence_logs
+on every call. v_presence_tracking is maintained outside this repository;
+the roster is refreshed CONCURRENTLY from it at most every
+EMPLOYEE_ROSTER_REFRESH_MINUTES (see EmployeeRosterService).
+
+Skipped when v_presence_tracking does not exist; run `alembic downgrade -1`
+and `alembic upgrade head` once it has been created.
+
+Revision ID: 0010_employee_roster
+Revises: 0009_user_tokens_valid_after
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_employee_roster"
+down_revision: Union[str, None] = "0009_user_tokens_valid_after"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROSTER_COLUMNS = (
+    '"Store ID", "Store", "Location", "Employee ID", "Employee", '
+    '"Employee Token", "Shift In", "Shift Out"'
+)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+    if connection.execute(sa.text("SELECT to_regclass('v_presence_tracking')")).scalar() is None:
+        print("v_presence_tracking does not exist; employee_roster was not created")
+        return
+
+    op.execute(
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS employee_roster AS "
+        f"SELECT DISTINCT {ROSTER_COLUMNS} FROM v_presence_tracking"
+    )
+    # REFRESH ... CONCURRENTLY needs a unique index over whole rows
+    op.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_employee_roster ON employee_roster ({ROSTER_COLUMNS})")
+    op.execute('CREATE INDEX IF NOT EXISTS ix_employee_roster_employee_id ON employee_roster ("Employee ID")')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS employee_roster")
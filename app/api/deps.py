@@ -0,0 +1,40 @@
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Security, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.security import verify_token_cached
+from app.database.session import get_db
+
+security = HTTPBearer()
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    db: AsyncSession = Depends(get_db)
+) -> dict:
+    """Dependency to get current authenticated user."""
+    return await verify_token_cached(credentials.credentials, db)
+
+
+async def require_maintenance_key(
+    x_maintenance_key: Optional[str] = Header(None, description="MAINTENANCE_API_KEY")
+) -> None:
+    """
+    Dependency guarding maintenance endpoints with a dedicated key, so a
+    user or device token alone cannot run them. Disabled (404) when
+    MAINTENANCE_API_KEY is not set.
+    """
+    if not settings.maintenance_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Maintenance endpoints are disabled (MAINTENANCE_API_KEY is not set)"
+        )
+    if x_maintenance_key is None or not secrets.compare_digest(
+        x_maintenance_key.encode(), settings.maintenance_api_key.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid maintenance key"
+        )
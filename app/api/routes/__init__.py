@@ -2,4 +2,6 @@ from . import auth
 from . import beacons
 from . import presence_logs
 from . import notifications
+from . import diagnostics
+from . import maintenance
 # FCM module moved to archived_fcm/ directory
\ No newline at end of file
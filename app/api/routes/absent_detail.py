@@ -1,26 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import logging
 from app.database.session import get_db
 from app.services.absent_detail_service import AbsentDetailService
 from app.schemas.absent_detail import AbsentDetailRecord
 from app.schemas.error import ErrorResponse
-from app.core.security import verify_token
+from app.api.deps import get_current_user
 
 router = APIRouter(tags=["Absent Detail"])
-security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Security(security)
-):
-    """Dependency to get current authenticated user."""
-    return verify_token(credentials.credentials)
-
-
 @router.get(
     "/absent-detail",
     response_model=List[AbsentDetailRecord],
@@ -34,20 +25,23 @@ def get_current_user(
     },
     summary="Get absent detail records for a specific employee",
     description="""
-    Retrieve absent detail records for a specific employee from the v_presence_tracking view.
+    Retrieve absent detail records for a specific employee from employee_roster,
+    with the last detection taken from presence_state.
     
     This endpoint:
     1. Accepts an employee_id as a query parameter
-    2. Executes a SELECT query against the v_presence_tracking view
+    2. Executes a SELECT query against employee_roster joined to presence_state
     3. Filters results by the provided employee_id
     4. Returns matching records as a JSON array
     
     The query executed is:
     ```sql
-    SELECT "Store ID", "Store", "Location", "Employee ID", "Employee", 
-           "Shift In", "Shift Out", "Last Detection", "Absent Duration (Hour:Minute)"
-    FROM v_presence_tracking
-    WHERE "Employee ID" = :employee_id;
+    SELECT er."Store ID", er."Store", er."Location", er."Employee ID", er."Employee",
+           er."Shift In", er."Shift Out",
+           GREATEST(ps.last_detected_at, (CURRENT_DATE || ' ' || er."Shift In")::timestamp) AS last_detection
+    FROM employee_roster er
+    LEFT JOIN presence_state ps ON ps.user_id = er."Employee ID"
+    WHERE er."Employee ID" = :employee_id;
     ```
     
     **Query Parameter:**
@@ -61,7 +55,7 @@ def get_current_user(
 )
 async def get_absent_detail(
     employee_id: str = Query(..., description="The employee ID to get absent details for"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get absent detail records for a specific employee."""
@@ -79,7 +73,7 @@ async def get_absent_detail(
     try:
         # Create service instance and get absent detail records
         absent_detail_service = AbsentDetailService(db)
-        records = absent_detail_service.get_absent_detail_by_employee_id(employee_id.strip())
+        records = await absent_detail_service.get_absent_detail_by_employee_id(employee_id.strip())
         
         logger.info(f"Service returned {len(records)} records for employee_id: '{employee_id}'")
         
@@ -113,7 +107,7 @@ async def get_absent_detail(
     description="Temporary diagnostic endpoint to troubleshoot the v_presence_tracking view"
 )
 async def debug_absent_detail(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Debug endpoint to check v_presence_tracking view structure and data."""
@@ -129,22 +123,22 @@ async def debug_absent_detail(
             ORDER BY ordinal_position
         """)
         
-        structure_result = db.execute(structure_query)
+        structure_result = await db.execute(structure_query)
         structure_rows = structure_result.fetchall()
         
         # Test 2: Get sample data from view
         sample_query = text("SELECT * FROM v_presence_tracking LIMIT 5")
-        sample_result = db.execute(sample_query)
+        sample_result = await db.execute(sample_query)
         sample_rows = sample_result.fetchall()
         
         # Test 3: Check for specific employee_id
         employee_query = text("SELECT DISTINCT \"Employee ID\" FROM v_presence_tracking WHERE \"Employee ID\" = '202201209'")
-        employee_result = db.execute(employee_query)
+        employee_result = await db.execute(employee_query)
         employee_rows = employee_result.fetchall()
         
         # Test 4: Get all unique employee IDs
         all_employees_query = text("SELECT DISTINCT \"Employee ID\" FROM v_presence_tracking ORDER BY \"Employee ID\" LIMIT 20")
-        all_employees_result = db.execute(all_employees_query)
+        all_employees_result = await db.execute(all_employees_query)
         all_employees_rows = all_employees_result.fetchall()
         
         return {
@@ -154,7 +148,7 @@ async def debug_absent_detail(
             "employee_202201209_found": len(employee_rows) > 0,
             "employee_202201209_data": [row[0] for row in employee_rows],
             "sample_employee_ids": [row[0] for row in all_employees_rows],
-            "total_records_in_view": db.execute(text("SELECT COUNT(*) FROM v_presence_tracking")).scalar()
+            "total_records_in_view": (await db.execute(text("SELECT COUNT(*) FROM v_presence_tracking"))).scalar()
         }
         
     except Exception as e:
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.session import get_db
 from app.services.auth_service import AuthService
-from app.schemas.auth import UserRegistration, UserLogin, AuthSuccess
+from app.schemas.auth import UserRegistration, UserLogin, AuthSuccess, RefreshTokenRequest
 from app.schemas.error import ErrorResponse
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -14,40 +14,61 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
     status_code=status.HTTP_201_CREATED,
     responses={
         409: {"model": ErrorResponse, "description": "User with this username already exists"},
-        400: {"model": ErrorResponse, "description": "Invalid input data"}
+        400: {"model": ErrorResponse, "description": "Invalid input data"},
+        503: {"model": ErrorResponse, "description": "Password hashing saturated, retry later"}
     },
     summary="Register a new user",
     operation_id="registerUser"
 )
 async def register_user(
     user_data: UserRegistration,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user with username and password."""
     auth_service = AuthService(db)
-    user = auth_service.register_user(user_data)
+    user = await auth_service.register_user(user_data)
     
-    # Create token for the new user
-    token = auth_service.authenticate_user(user_data)
-    
-    return AuthSuccess(token=token)
+    # Create tokens for the new user (no second bcrypt verification)
+    return await auth_service.issue_tokens(user)
 
 
 @router.post(
     "/login",
     response_model=AuthSuccess,
     responses={
-        401: {"model": ErrorResponse, "description": "Invalid credentials"}
+        401: {"model": ErrorResponse, "description": "Invalid credentials"},
+        503: {"model": ErrorResponse, "description": "Password hashing saturated, retry later"}
     },
     summary="Log in a user",
     operation_id="loginUser"
 )
 async def login_user(
     user_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Authenticate user and return JWT token."""
+    """Authenticate user and return a JWT access token and a refresh token."""
     auth_service = AuthService(db)
-    token = auth_service.authenticate_user(user_data)
-    
-    return AuthSuccess(token=token)
+    return await auth_service.login(user_data)
+
+
+@router.post(
+    "/refresh",
+    response_model=AuthSuccess,
+    responses={
+        401: {"model": ErrorResponse, "description": "Invalid, expired or reused refresh token"}
+    },
+    summary="Refresh an access token",
+    operation_id="refreshToken"
+)
+async def refresh_token(
+    request: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    Refresh tokens are single use. Reusing a rotated token revokes every
+    token issued from the same login.
+    """
+    auth_service = AuthService(db)
+    return await auth_service.refresh(request.refresh_token)
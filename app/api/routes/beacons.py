@@ -1,28 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from app.core.config import settings
 from app.database.session import get_db
 from app.services.beacon_service import BeaconService
-from app.schemas.beacon import Beacon, BeaconCreate, BeaconUpdate
+from app.schemas.beacon import Beacon, BeaconCreate, BeaconUpdate, BeaconNearby, BeaconBulkResponse
 from app.schemas.error import ErrorResponse
-from app.core.security import verify_token
+from app.api.deps import get_current_user
 
 router = APIRouter(prefix="/beacons", tags=["Beacons"])
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Security(security)
-):
-    """Dependency to get current authenticated user."""
-    return verify_token(credentials.credentials)
 
 
 @router.get(
     "",
     response_model=List[Beacon],
     responses={
+        304: {"description": "Beacon list unchanged since the ETag in If-None-Match"},
         401: {"model": ErrorResponse, "description": "Authentication required"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"}
     },
@@ -30,12 +23,25 @@ def get_current_user(
     operation_id="getAllBeacons"
 )
 async def get_all_beacons(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get a list of all beacons."""
+    """
+    Get a list of all beacons.
+
+    The response carries an ETag. Send it back in If-None-Match to get an
+    empty 304 Not Modified while the beacon list is unchanged.
+    """
     beacon_service = BeaconService(db)
-    return beacon_service.get_all_beacons()
+    if not settings.beacon_registry_enabled:
+        return await beacon_service.get_all_beacons()
+
+    etag, body = await beacon_service.get_all_beacons_serialized()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if BeaconService.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post(
@@ -53,12 +59,100 @@ async def get_all_beacons(
 )
 async def create_beacon(
     beacon_data: BeaconCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Create a new beacon."""
     beacon_service = BeaconService(db)
-    return beacon_service.create_beacon(beacon_data)
+    return await beacon_service.create_beacon(beacon_data)
+
+
+@router.put(
+    ":bulk",
+    response_model=BeaconBulkResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Empty request, too many items, or an invalid item with atomic=true"},
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"}
+    },
+    summary="Create or replace many beacons",
+    description="""
+    Upsert a list of beacons by beacon_id in a single statement.
+
+    New beacon_ids are created and existing ones get all fields of their
+    item. The response reports the outcome of every item by its position.
+    With `atomic=true` the request fails as a whole if any item is invalid.
+    """,
+    operation_id="bulkUpsertBeacons"
+)
+async def bulk_upsert_beacons(
+    beacon_data: List[BeaconCreate],
+    atomic: bool = Query(False, description="Write all items or none"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create or replace many beacons."""
+    BeaconService.check_bulk_size(len(beacon_data))
+    beacon_service = BeaconService(db)
+    return await beacon_service.bulk_upsert_beacons(beacon_data, atomic=atomic)
+
+
+@router.post(
+    ":bulk-delete",
+    response_model=BeaconBulkResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Empty request or too many items"},
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        404: {"model": ErrorResponse, "description": "Unknown beacon_id with atomic=true"}
+    },
+    summary="Delete many beacons",
+    description="""
+    Delete a list of beacons by beacon_id in a single statement.
+
+    Unknown beacon_ids are reported as failed. With `atomic=true` any
+    unknown beacon_id fails the request and nothing is deleted.
+    """,
+    operation_id="bulkDeleteBeacons"
+)
+async def bulk_delete_beacons(
+    beacon_ids: List[str],
+    atomic: bool = Query(False, description="Delete all beacons or none"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Delete many beacons."""
+    BeaconService.check_bulk_size(len(beacon_ids))
+    beacon_service = BeaconService(db)
+    return await beacon_service.bulk_delete_beacons(beacon_ids, atomic=atomic)
+
+
+@router.get(
+    "/nearby",
+    response_model=List[BeaconNearby],
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"}
+    },
+    summary="Find the beacons nearest to a point",
+    description="""
+    Get the beacons within radius_m meters of a point, nearest first, with
+    their great-circle distance. Beacons without coordinates are never
+    returned. Served from an in-memory grid index of the beacon registry.
+    """,
+    operation_id="getNearbyBeacons"
+)
+async def get_nearby_beacons(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the point"),
+    radius_m: float = Query(100, gt=0, le=settings.beacon_nearby_max_radius_m, description="Search radius in meters"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of beacons to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Find the beacons nearest to a point."""
+    beacon_service = BeaconService(db)
+    return await beacon_service.get_nearby_beacons(lat, lon, radius_m, limit)
 
 
 @router.get(
@@ -74,12 +168,12 @@ async def create_beacon(
 )
 async def get_beacon_by_id(
     beacon_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get a beacon by its beacon_id."""
     beacon_service = BeaconService(db)
-    return beacon_service.get_beacon_by_beacon_id(beacon_id)
+    return await beacon_service.get_beacon_by_beacon_id(beacon_id)
 
 
 @router.put(
@@ -97,12 +191,12 @@ async def get_beacon_by_id(
 async def update_beacon(
     beacon_id: str,
     beacon_data: BeaconUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Update an existing beacon."""
     beacon_service = BeaconService(db)
-    return beacon_service.update_beacon(beacon_id, beacon_data)
+    return await beacon_service.update_beacon(beacon_id, beacon_data)
 
 
 @router.delete(
@@ -118,10 +212,10 @@ async def update_beacon(
 )
 async def delete_beacon(
     beacon_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a beacon."""
     beacon_service = BeaconService(db)
-    beacon_service.delete_beacon(beacon_id)
+    await beacon_service.delete_beacon(beacon_id)
     return None
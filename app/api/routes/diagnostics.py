@@ -0,0 +1,174 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.security import token_cache
+from app.core.password_hasher import password_hasher
+from app.services.beacon_registry import beacon_registry
+from app.services.job_scheduler import in_process_scheduler
+from app.schemas.error import ErrorResponse
+from app.api.deps import get_current_user
+from app.database.pool import get_pool_stats
+from app.database.session import engine, async_engine, get_db
+from app.services.absence_diagnostics_service import AbsenceDiagnosticsService
+from app.services.presence_buffer import presence_buffer
+from app.services.notification_outbox import notification_outbox_worker
+from app.services.notification_transport import get_transport_stats
+
+router = APIRouter(prefix="/diagnostics", tags=["Diagnostics"])
+
+
+@router.get(
+    "/presence-buffer",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get presence write-behind buffer metrics",
+    operation_id="getPresenceBufferMetrics"
+)
+async def get_presence_buffer_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get queue depth and flush latency of the presence write buffer."""
+    return presence_buffer.stats()
+
+
+@router.get(
+    "/db-pool",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get database connection pool metrics",
+    operation_id="getDatabasePoolMetrics"
+)
+async def get_database_pool_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get checkout, overflow and wait statistics of the connection pools."""
+    return {
+        "api": get_pool_stats(async_engine.sync_engine),
+        "sync": get_pool_stats(engine)
+    }
+
+
+@router.get(
+    "/notification-outbox",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get notification outbox worker metrics",
+    operation_id="getNotificationOutboxMetrics"
+)
+async def get_notification_outbox_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get delivery counters of the notification outbox workers."""
+    return notification_outbox_worker.stats()
+
+
+@router.get(
+    "/notification-service",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get notification circuit breaker and rate limiter metrics",
+    operation_id="getNotificationServiceMetrics"
+)
+async def get_notification_service_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the circuit breaker state, rejection counts and current send rate of outbound notifications."""
+    return get_transport_stats()
+
+
+@router.get(
+    "/absence",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        404: {"model": ErrorResponse, "description": "Diagnostics disabled (DEBUG is off)"},
+        500: {"model": ErrorResponse, "description": "Database error"}
+    },
+    summary="Troubleshoot the absence notification query",
+    description="""
+    Run the checks that help explain notify-absence results: database
+    connection and clock, the v_presence_tracking row count and columns,
+    the employee_roster row count and the employees currently over the threshold with their computed
+    absence in minutes. Only available when DEBUG is enabled.
+    """,
+    operation_id="getAbsenceDiagnostics"
+)
+async def get_absence_diagnostics(
+    threshold: int = Query(30, description="Absence threshold in minutes"),
+    store_id: Optional[str] = Query(None, description="Only employees of this store"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get diagnostics for the absence notification query."""
+    if not settings.debug:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Absence diagnostics are only available when DEBUG is enabled"
+        )
+
+    diagnostics_service = AbsenceDiagnosticsService(db)
+    return await diagnostics_service.collect(threshold, store_id)
+
+
+@router.get(
+    "/auth-cache",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get verified-token cache metrics",
+    operation_id="getAuthCacheMetrics"
+)
+async def get_auth_cache_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get size, hit rate, evictions and invalidations of the token verification cache."""
+    return token_cache.stats()
+
+
+@router.get(
+    "/password-hasher",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get password hashing pool metrics",
+    operation_id="getPasswordHasherMetrics"
+)
+async def get_password_hasher_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get pending, completed and rejected bcrypt operations of the hashing pool."""
+    return password_hasher.stats()
+
+
+@router.get(
+    "/beacon-registry",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get beacon registry metrics",
+    operation_id="getBeaconRegistryMetrics"
+)
+async def get_beacon_registry_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get size, hit and reload counts of the in-process beacon registry."""
+    return beacon_registry.stats()
+
+
+@router.get(
+    "/scheduler",
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    },
+    summary="Get in-process scheduler state",
+    operation_id="getSchedulerState"
+)
+async def get_scheduler_state(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get whether the in-process scheduler runs here, holds the leader lock, and its last result."""
+    return in_process_scheduler.stats()
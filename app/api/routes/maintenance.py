@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.session import get_db
+from app.services.partition_service import PartitionService
+from app.schemas.maintenance import PartitionMaintenanceResponse
+from app.schemas.error import ErrorResponse
+from app.api.deps import get_current_user, require_maintenance_key
+
+router = APIRouter(prefix="/maintenance", tags=["Maintenance"])
+
+
+@router.post(
+    "/presence-partitions",
+    response_model=PartitionMaintenanceResponse,
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Missing or invalid X-Maintenance-Key"},
+        404: {"model": ErrorResponse, "description": "Maintenance disabled (MAINTENANCE_API_KEY is not set)"},
+        409: {"model": ErrorResponse, "description": "presence_logs is not partitioned"},
+        500: {"model": ErrorResponse, "description": "Partition maintenance failed"}
+    },
+    summary="Create upcoming and expire old presence log partitions",
+    operation_id="runPresencePartitionMaintenance"
+)
+async def run_presence_partition_maintenance(
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    _: None = Depends(require_maintenance_key)
+):
+    """
+    Pre-create the current and upcoming presence_logs partitions and detach
+    (or drop) partitions older than the retention window.
+    
+    Requires X-Maintenance-Key (MAINTENANCE_API_KEY) besides a user token.
+    
+    Safe to call repeatedly; the scheduler calls it once a day.
+    """
+    partition_service = PartitionService(db)
+    return await partition_service.run_maintenance()
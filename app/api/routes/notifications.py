@@ -1,21 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+from app.core.config import settings
 from app.database.session import get_db
 from app.services.notification_service import NotificationService
-from app.schemas.notification import NotifyToQleapRequest, NotifyToQleapResponse, NotifyAbsenceRequest, NotifyAbsenceResponse, NotificationDetail
+from app.services.notification_outbox import NotificationOutboxService
+from app.schemas.notification import NotifyToQleapRequest, NotifyToQleapResponse, NotifyAbsenceRequest, NotifyAbsenceResponse, NotificationDetail, NotificationJobResponse
 from app.schemas.error import ErrorResponse
-from app.core.security import verify_token
+from app.api.deps import get_current_user
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Security(security)
-):
-    """Dependency to get current authenticated user."""
-    return verify_token(credentials.credentials)
 
 
 @router.post(
@@ -23,6 +19,7 @@ def get_current_user(
     response_model=NotifyToQleapResponse,
     status_code=status.HTTP_200_OK,
     responses={
+        202: {"model": NotificationJobResponse, "description": "Notifications queued (outbox mode)"},
         400: {"model": ErrorResponse, "description": "Invalid input data"},
         401: {"model": ErrorResponse, "description": "Authentication required"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
@@ -42,12 +39,16 @@ def get_current_user(
     - Title: "Eraspace Member is Detected!"
     - Body: "Open Information" 
     - Link: "https://erabeacon-7e08e.web.app/"
+
+    When the notification outbox is enabled, the notifications are only
+    queued and the endpoint returns 202 with a job to poll at
+    `GET /notifications/jobs/{job_id}`.
     """,
     operation_id="notifyToQleap"
 )
 async def notify_to_qleap(
     request_data: NotifyToQleapRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -59,10 +60,14 @@ async def notify_to_qleap(
         current_user: Authenticated user
         
     Returns:
-        NotifyToQleapResponse with success message and count of notifications sent
+        NotifyToQleapResponse with success message and count of notifications sent,
+        or the queued NotificationJobResponse in outbox mode
     """
     notification_service = NotificationService(db)
-    return notification_service.notify_to_qleap(request_data)
+    if settings.notification_outbox_enabled:
+        job = await notification_service.enqueue_notify_to_qleap(request_data)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(job))
+    return await notification_service.notify_to_qleap(request_data)
 
 
 @router.post(
@@ -70,6 +75,7 @@ async def notify_to_qleap(
     response_model=NotifyAbsenceResponse,
     status_code=status.HTTP_200_OK,
     responses={
+        202: {"model": NotificationJobResponse, "description": "Notifications queued (outbox mode)"},
         400: {"model": ErrorResponse, "description": "Invalid input data"},
         401: {"model": ErrorResponse, "description": "Authentication required"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
@@ -80,21 +86,26 @@ async def notify_to_qleap(
     Send absence notifications to employees who have exceeded the specified duration threshold.
     
     This endpoint:
-    1. Queries the v_presence_tracking view to find employees with duration_minutes >= threshold
+    1. Queries employee_roster and presence_state to find employees absent for at least threshold minutes
     2. Retrieves Employee ID and Employee Token for matching records
     3. Sends FCM notifications to each employee with absence alert
-    4. Returns summary of notifications sent and failed
+    4. Returns summary of notifications sent and failed, with per-employee
+       detail according to `detail_level` (none, summary, failures or full)
     
     The notification contains:
     - Title: "No Presence Detected!"
     - Body: "Out of store range"
     - Data: Employee ID for tracking purposes
+
+    When the notification outbox is enabled, the matching employees are
+    queued in the same transaction as the query and the endpoint returns 202
+    with a job to poll at `GET /notifications/jobs/{job_id}`.
     """,
     operation_id="notifyAbsence"
 )
 async def notify_absence(
     request_data: NotifyAbsenceRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -106,10 +117,17 @@ async def notify_absence(
         current_user: Authenticated user
         
     Returns:
-        NotifyAbsenceResponse with detailed results of the notification process
+        NotifyAbsenceResponse with detailed results of the notification process,
+        or the queued NotificationJobResponse in outbox mode
     """
     notification_service = NotificationService(db)
-    result = await notification_service.notify_absence(request_data.threshold)
+    if settings.notification_outbox_enabled:
+        job = await notification_service.enqueue_notify_absence(request_data.threshold, request_data.store_id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(job))
+
+    result = await notification_service.notify_absence(
+        request_data.threshold, request_data.detail_level, request_data.store_id
+    )
     
     if not result["success"]:
         raise HTTPException(
@@ -118,3 +136,24 @@ async def notify_absence(
         )
     
     return NotifyAbsenceResponse(**result)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=NotificationJobResponse,
+    responses={
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        404: {"model": ErrorResponse, "description": "Notification job not found"}
+    },
+    summary="Get the delivery progress of a queued notification job",
+    operation_id="getNotificationJob"
+)
+async def get_notification_job(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the status, counts and per-item delivery results of a notification job."""
+    outbox_service = NotificationOutboxService(db)
+    return await outbox_service.get_job(job_id)
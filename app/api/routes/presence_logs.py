@@ -1,23 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 from app.database.session import get_db
 from app.services.presence_service import PresenceService
-from app.schemas.presence_log import PresenceLog, PresenceLogCreate
+from app.services.presence_buffer import presence_buffer
+from app.schemas.presence_log import PresenceLog, PresenceLogCreate, PresenceLogBatchResponse
 from app.schemas.error import ErrorResponse
-from app.core.security import verify_token
+from app.core.config import settings
+from app.api.deps import get_current_user
 
 router = APIRouter(prefix="/presence-logs", tags=["Presence Logs"])
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Security(security)
-):
-    """Dependency to get current authenticated user."""
-    return verify_token(credentials.credentials)
 
 
 @router.post(
@@ -35,12 +28,99 @@ def get_current_user(
 )
 async def create_presence_log(
     presence_data: PresenceLogCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Log a user's presence near a beacon."""
     presence_service = PresenceService(db)
-    return presence_service.create_presence_log(presence_data)
+    return await presence_service.create_presence_log(presence_data)
+
+
+@router.post(
+    "/batch",
+    response_model=PresenceLogBatchResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": ErrorResponse, "description": "Empty batch or too many items"},
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"}
+    },
+    summary="Log many presence sightings in one request",
+    description="""
+    Store a batch of presence logs buffered by a device.
+
+    All beacon_ids are validated with one lookup and all valid items are
+    inserted in a single transaction. The response reports the outcome of
+    every item by its position in the request array.
+    """,
+    operation_id="createPresenceLogsBatch"
+)
+async def create_presence_logs_batch(
+    presence_data: List[PresenceLogCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Log a batch of presence sightings."""
+    if not presence_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Batch must contain at least one presence log"
+        )
+    if len(presence_data) > settings.presence_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch cannot contain more than {settings.presence_batch_max_items} presence logs"
+        )
+
+    presence_service = PresenceService(db)
+    return await presence_service.create_presence_logs_batch(presence_data)
+
+
+@router.post(
+    "/buffered",
+    response_model=PresenceLog,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input data"},
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        404: {"model": ErrorResponse, "description": "Beacon not found"},
+        503: {"model": ErrorResponse, "description": "Buffered ingestion disabled or buffer full"}
+    },
+    summary="Log a user's presence through the write-behind buffer",
+    description="""
+    Validate a presence log and queue it for a grouped background write.
+
+    The log is acknowledged with 202 before it is stored; its id is assigned
+    up front and returned in the response. When the buffer is full the
+    request is rejected with 503 and a Retry-After header. Use
+    `POST /presence-logs` for a synchronous write.
+    """,
+    operation_id="createPresenceLogBuffered"
+)
+async def create_presence_log_buffered(
+    presence_data: PresenceLogCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Queue a user's presence near a beacon for a buffered write."""
+    if not presence_buffer.running:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Buffered presence ingestion is not enabled"
+        )
+
+    presence_service = PresenceService(db)
+    row = await presence_service.prepare_presence_row(presence_data)
+
+    if not presence_buffer.enqueue(row):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Presence log buffer is full, retry later",
+            headers={"Retry-After": str(settings.presence_buffer_retry_after_seconds)}
+        )
+
+    return PresenceLog(**row)
 
 
 @router.get(
@@ -55,25 +135,42 @@ async def create_presence_log(
     operation_id="getAllPresenceLogs"
 )
 async def get_all_presence_logs(
+    response: Response,
     user_id: Optional[str] = Query(None, description="Filter logs by user ID"),
     beacon_id: Optional[str] = Query(None, description="Filter logs by beacon ID"),
     start_date: Optional[datetime] = Query(None, description="Filter logs from a specific timestamp (inclusive)"),
     end_date: Optional[datetime] = Query(None, description="Filter logs up to a specific timestamp (exclusive)"),
     limit: int = Query(100, ge=1, description="Maximum number of results to return"),
     offset: int = Query(0, ge=0, description="Number of results to skip for pagination"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Continue after the page that returned this X-Next-Cursor value"),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get a list of presence logs with optional filtering."""
+    """
+    Get a list of presence logs with optional filtering.
+    
+    When a full page is returned, the X-Next-Cursor response header holds
+    the cursor for the next page.
+    """
+    if cursor and offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor cannot be combined with offset"
+        )
+    
     presence_service = PresenceService(db)
-    return presence_service.get_all_presence_logs(
+    presence_logs = await presence_service.get_all_presence_logs(
         user_id=user_id,
         beacon_id=beacon_id,
         start_date=start_date,
         end_date=end_date,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
+    if len(presence_logs) == limit:
+        response.headers["X-Next-Cursor"] = presence_service.encode_cursor(presence_logs[-1])
+    return presence_logs
 
 
 @router.get(
@@ -89,12 +186,12 @@ async def get_all_presence_logs(
 )
 async def get_presence_log_by_id(
     id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get a presence log by its ID."""
     presence_service = PresenceService(db)
-    return presence_service.get_presence_log_by_id(id)
+    return await presence_service.get_presence_log_by_id(id)
 
 
 @router.delete(
@@ -110,10 +207,10 @@ async def get_presence_log_by_id(
 )
 async def delete_presence_log(
     id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a presence log by its ID."""
     presence_service = PresenceService(db)
-    presence_service.delete_presence_log(id)
+    await presence_service.delete_presence_log(id)
     return None
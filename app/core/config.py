@@ -10,16 +10,126 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str
+    # Connection pool (ignored for SQLite)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Open a new connection per checkout instead of pooling (AWS Lambda)
+    db_null_pool: bool = False
+    # Connections go through a pooler in transaction mode (PgBouncer pool_mode=transaction)
+    db_transaction_pooling: bool = False
+    # Per-session server settings (per transaction with db_transaction_pooling); 0 disables the statement timeout
+    db_statement_timeout_ms: int = 30000
+    db_application_name: str = "era-beacon-api"
+    # Session timezone of every connection (CURRENT_DATE in the absence queries); empty keeps the server default
+    db_timezone: str = "Asia/Jakarta"
     
     # Security
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Rotating refresh tokens issued at login (POST /v1/auth/refresh)
+    refresh_token_expire_days: int = 30
+    # bcrypt cost factor for new hashes (existing hashes keep theirs)
+    bcrypt_rounds: int = 12
+    # Password hashing thread pool; requests beyond max_pending get 503
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 16
+    password_hash_retry_after_seconds: int = 1
+    # Verified tokens cached per process (entries never outlive the token's exp); 0 disables
+    auth_token_cache_size: int = 10000
+    auth_token_cache_ttl_seconds: int = 300
+    # Shared secret required in X-Maintenance-Key by /maintenance endpoints
+    # (partition DETACH/DROP); unset disables them
+    maintenance_api_key: Optional[str] = None
     
     # Server
     host: str = "0.0.0.0"
     port: int = 8000
-    
+
+    # Beacons
+    # In-process beacon registry; other processes' writes are detected within the check interval
+    beacon_registry_enabled: bool = True
+    beacon_registry_check_interval_seconds: float = 5
+    # PUT /beacons:bulk and POST /beacons:bulk-delete
+    beacon_bulk_max_items: int = 500
+    # GET /beacons/nearby: grid cell size of the in-memory spatial index and largest radius
+    beacon_nearby_cell_meters: float = 1000
+    beacon_nearby_max_radius_m: float = 50000
+
+    # Presence ingestion
+    presence_batch_max_items: int = 500
+    # Write-behind buffer for POST /presence-logs/buffered (disabled by default)
+    presence_buffer_enabled: bool = False
+    presence_buffer_max_size: int = 10000
+    presence_buffer_flush_size: int = 500
+    presence_buffer_flush_interval_ms: int = 200
+    presence_buffer_flush_retries: int = 2
+    presence_buffer_drain_timeout_seconds: int = 30
+    presence_buffer_retry_after_seconds: int = 1
+    # Range partitions of presence_logs ("month" or "day"; fixed by migration 0003)
+    presence_partition_interval: str = "month"
+    presence_partition_premake: int = 3
+    # Partitions entirely older than this are detached (or dropped); 0 keeps everything
+    presence_retention_days: int = 0
+    presence_retention_drop: bool = False
+
+    # Notifications
+    notification_url: str = "https://even-trainer-464609-d1.et.r.appspot.com/send-notification"
+    notification_timeout_seconds: float = 30.0
+    # Overall deadline for notify-to-qleap; slower tokens are reported as failed
+    notification_deadline_seconds: float = 10.0
+    # Response bodies kept in results and the outbox are cut to this length (0 keeps all)
+    notification_response_max_chars: int = 500
+    # Absence notifications sent in parallel
+    notification_concurrency: int = 10
+    # Employees notified within this window are skipped (0 disables); LRU of recent sends in front of the table
+    notification_cooldown_minutes: int = 60
+    notification_cooldown_cache_size: int = 10000
+    # employee_roster (employee, shift and store columns of v_presence_tracking) is
+    # refreshed from the view at most this often; 0 leaves refreshing to the database
+    employee_roster_refresh_minutes: int = 60
+    # Circuit breaker around the notification service: opens when the failure
+    # rate over the last window_size calls (at least min_calls) reaches the threshold
+    notification_breaker_failure_rate: float = 0.5
+    notification_breaker_window_size: int = 20
+    notification_breaker_min_calls: int = 10
+    notification_breaker_open_seconds: float = 30.0
+    notification_breaker_half_open_calls: int = 1
+    # Token bucket pacing outbound notifications; halves on 429/5xx, recovers on success
+    notification_rate_limit_per_second: float = 20.0
+    notification_rate_limit_min_per_second: float = 1.0
+    notification_rate_limit_max_per_second: float = 50.0
+    notification_rate_limit_burst: int = 20
+    # Durable outbox: endpoints enqueue a job (202) and background workers deliver it
+    notification_outbox_enabled: bool = False
+    notification_outbox_workers: int = 2
+    notification_outbox_batch_size: int = 50
+    notification_outbox_poll_interval_ms: int = 1000
+    notification_outbox_lease_seconds: int = 120
+    notification_outbox_max_attempts: int = 5
+    notification_outbox_backoff_base_seconds: float = 2.0
+    notification_outbox_backoff_max_seconds: float = 300.0
+
+    # Shared outbound HTTP client (connection pool with keep-alive)
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+
+    # In-process scheduler: runs the jobs of scheduler/scheduler.py inside the API
+    # (start.sh then skips the separate scheduler process)
+    scheduler_in_process: bool = False
+    # Absence threshold, also the interval between runs
+    scheduler_threshold_minutes: int = 5
+    scheduler_weekday_start_hour: int = 9
+    scheduler_weekday_end_hour: int = 18
+    scheduler_partition_maintenance_enabled: bool = False
+    scheduler_partition_maintenance_hour: int = 1
+    # Postgres advisory lock held by the one process that runs the jobs
+    scheduler_lock_id: int = 724601
+
     # FCM Configuration (DISABLED - endpoints removed)
     # fcm_server_key: Optional[str] = None
     # fcm_sender_id: Optional[str] = None
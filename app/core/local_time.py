@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+from app.core.config import settings
+
+# presence_logs.timestamp has no time zone and holds wall-clock time in the
+# database session's zone (DB_TIMEZONE), the zone LOCALTIMESTAMP and
+# CURRENT_DATE use in the absence queries; without one, the zone the API
+# runs in (see app.main)
+LOCAL_TIMEZONE = ZoneInfo(settings.db_timezone or "Asia/Jakarta")
+
+
+def to_local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an offset-aware datetime to naive local time; naive values are kept as they are."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(LOCAL_TIMEZONE).replace(tzinfo=None)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """
+    Run bcrypt hashing and verification off the event loop.
+
+    bcrypt costs hundreds of milliseconds of CPU per call, so calls run on a
+    small dedicated thread pool (bcrypt releases the GIL while it works).
+    At most max_pending calls may be running or queued; beyond that the
+    request is rejected with 503 and Retry-After instead of queueing behind
+    a login burst.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retry_after_seconds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after_seconds = retry_after_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+        # Metrics
+        self.completed_total = 0
+        self.rejected_total = 0
+        self.max_pending_seen = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            self.rejected_total += 1
+            logger.warning(f"Password hashing saturated ({self._pending} pending), rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, retry later",
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+
+        self._pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+            self.completed_total += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads; a new pool is created on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "max_pending_seen": self.max_pending_seen,
+            "completed_total": self.completed_total,
+            "rejected_total": self.rejected_total,
+            "bcrypt_rounds": settings.bcrypt_rounds
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    retry_after_seconds=settings.password_hash_retry_after_seconds
+)
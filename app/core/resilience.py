@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreakerOpen(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreakerCall(NamedTuple):
+    """An admitted call: the breaker generation it was admitted in and whether it is a probe."""
+    generation: int
+    probe: bool
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker.
+
+    Closed: calls pass and their outcomes are kept in a rolling window. Once
+    the window holds at least min_calls outcomes and the failure rate reaches
+    failure_rate_threshold, the breaker opens.
+    Open: calls are rejected immediately for open_seconds.
+    Half-open: up to half_open_max_calls probe calls pass; a successful probe
+    closes the breaker, a failed one opens it again.
+
+    Every admitted call must end in record_success, record_failure or
+    record_abandoned with the CircuitBreakerCall that before_call returned;
+    a probe that ends without an outcome would otherwise hold its slot and
+    keep the breaker half-open for good. Every state change starts a new
+    generation, and outcomes only count in the generation their call was
+    admitted in: a slow call admitted while closed cannot close or reopen
+    the half-open breaker, only its probes can.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._outcomes: deque = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._generation = 0
+
+        # Metrics
+        self.rejected_total = 0
+        self.opened_total = 0
+        self.successes_total = 0
+        self.failures_total = 0
+        self.abandoned_total = 0
+        self.stale_outcomes_total = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            self._generation += 1
+            logger.info(f"Circuit breaker {self.name} is half-open")
+        return self._state
+
+    @property
+    def allows_requests(self) -> bool:
+        """True unless the breaker would reject a call right now (does not reserve a probe)."""
+        state = self.state
+        return state == self.CLOSED or (
+            state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls
+        )
+
+    def available_calls(self, limit: int) -> int:
+        """How many of limit calls would be admitted right now (does not reserve probes)."""
+        state = self.state
+        if state == self.CLOSED:
+            return limit
+        if state == self.HALF_OPEN:
+            return max(0, min(limit, self.half_open_max_calls - self._half_open_calls))
+        return 0
+
+    def before_call(self) -> CircuitBreakerCall:
+        """Admit a call or raise CircuitBreakerOpen. Pass the result to the record_* method of its outcome."""
+        state = self.state
+        if state == self.CLOSED:
+            return CircuitBreakerCall(self._generation, probe=False)
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return CircuitBreakerCall(self._generation, probe=True)
+        self.rejected_total += 1
+        raise CircuitBreakerOpen(f"Circuit breaker {self.name} is open")
+
+    def record_success(self, call: CircuitBreakerCall) -> None:
+        self.successes_total += 1
+        if self._is_current_probe(call):
+            self._close()
+        elif self._counts_in_window(call):
+            self._outcomes.append(True)
+
+    def record_failure(self, call: CircuitBreakerCall) -> None:
+        self.failures_total += 1
+        if self._is_current_probe(call):
+            self._open()
+        elif self._counts_in_window(call):
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self.min_calls and self.failure_rate >= self.failure_rate_threshold:
+                self._open()
+
+    def record_abandoned(self, call: CircuitBreakerCall) -> None:
+        """
+        Record a call that ended without an outcome, e.g. cancelled or failed
+        with an unexpected error. An abandoned probe opens the breaker again.
+        """
+        self.abandoned_total += 1
+        if self._is_current_probe(call):
+            self._open()
+
+    def _is_current_probe(self, call: CircuitBreakerCall) -> bool:
+        return self._state == self.HALF_OPEN and call.probe and call.generation == self._generation
+
+    def _counts_in_window(self, call: CircuitBreakerCall) -> bool:
+        """Closed-state outcomes from the current generation; anything else is a late outcome and ignored."""
+        if self._state == self.CLOSED and call.generation == self._generation:
+            return True
+        self.stale_outcomes_total += 1
+        return False
+
+    @property
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self.opened_total += 1
+        logger.warning(f"Circuit breaker {self.name} opened (failure rate {self.failure_rate:.0%})")
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._generation += 1
+        self._outcomes.clear()
+        logger.info(f"Circuit breaker {self.name} closed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate, 3),
+            "window_calls": len(self._outcomes),
+            "rejected_total": self.rejected_total,
+            "opened_total": self.opened_total,
+            "successes_total": self.successes_total,
+            "failures_total": self.failures_total,
+            "abandoned_total": self.abandoned_total,
+            "stale_outcomes_total": self.stale_outcomes_total
+        }
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to the downstream service (AIMD).
+
+    Every throttling signal (429 or 5xx) halves the rate down to min_rate;
+    every success adds rate_increase requests per second back up to
+    max_rate. acquire() waits for a token instead of rejecting the call.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: int,
+        rate_increase: float = 0.5,
+        decrease_factor: float = 0.5
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.rate_increase = rate_increase
+        self.decrease_factor = decrease_factor
+
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = None
+        self._lock_loop = None
+
+        # Metrics
+        self.acquired_total = 0
+        self.waited_total = 0
+        self.throttled_total = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Locks belong to an event loop; create one per running loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        async with self._get_lock():
+            self._refill()
+            if self._tokens < 1:
+                self.waited_total += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+            self.acquired_total += 1
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.rate_increase)
+
+    def on_throttle(self) -> None:
+        self.throttled_total += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate_per_second": round(self.rate, 3),
+            "min_rate_per_second": self.min_rate,
+            "max_rate_per_second": self.max_rate,
+            "available_tokens": round(self._tokens, 3),
+            "acquired_total": self.acquired_total,
+            "waited_total": self.waited_total,
+            "throttled_total": self.throttled_total
+        }
@@ -1,13 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional, Union
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core.token_cache import TokenCache
+from app.models.user import User
 
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -28,26 +33,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
+    # iat lets tokens issued before a revocation be told apart
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
-def verify_token(token: str) -> dict:
-    """Verify and decode JWT token."""
+def decode_token(token: str) -> dict:
+    """Verify a JWT and return its payload, or raise 401."""
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return {"user_id": user_id}
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+# Verified tokens, shared by every authenticated request of this process
+token_cache = TokenCache(
+    max_size=settings.auth_token_cache_size,
+    ttl_seconds=settings.auth_token_cache_ttl_seconds
+)
+
+
+async def ensure_token_not_revoked(db: AsyncSession, payload: dict) -> None:
+    """Raise 401 if the token was issued before its user's tokens_valid_after."""
+    try:
+        user_id = uuid.UUID(str(payload.get("sub")))
+    except ValueError:
+        return
+    valid_after = await db.scalar(select(User.tokens_valid_after).where(User.id == user_id))
+    if valid_after is None:
+        return
+    issued_at = payload.get("iat")
+    # iat has whole seconds; tokens from the second of the revocation are rejected too
+    if issued_at is None or datetime.utcfromtimestamp(issued_at) <= valid_after:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def verify_token_cached(token: str, db: AsyncSession) -> dict:
+    """
+    Verify and decode JWT token, reusing the result for repeated tokens.
+
+    On a cache miss the token is also checked against its user's
+    tokens_valid_after, so revoked tokens are not cached again.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    payload = decode_token(token)
+    await ensure_token_not_revoked(db, payload)
+    claims = {"user_id": payload.get("sub")}
+    exp = payload.get("exp")
+    token_cache.put(token, claims, expires_at=float(exp) if exp is not None else None)
+    return claims
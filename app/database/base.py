@@ -3,3 +3,7 @@ from app.database.session import Base
 from app.models.user import User
 from app.models.beacon import Beacon
 from app.models.presence_log import PresenceLog
+from app.models.presence_state import PresenceState
+from app.models.notification_outbox import NotificationJob, NotificationOutbox
+from app.models.notification_cooldown import NotificationCooldown
+from app.models.refresh_token import RefreshToken
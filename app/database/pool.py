@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Dict, Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolWaitStats:
+    """Counters for connection checkouts and the time spent waiting for them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts_total = 0
+        self.timeouts_total = 0
+        self.invalidated_total = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.last_wait_ms = 0.0
+
+    def record_wait(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.checkouts_total += 1
+            self.wait_total_ms += elapsed_ms
+            self.last_wait_ms = elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts_total += 1
+
+    def record_invalidated(self) -> None:
+        with self._lock:
+            self.invalidated_total += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            average = self.wait_total_ms / self.checkouts_total if self.checkouts_total else 0.0
+            return {
+                "checkouts_total": self.checkouts_total,
+                "timeouts_total": self.timeouts_total,
+                "invalidated_total": self.invalidated_total,
+                "last_wait_ms": round(self.last_wait_ms, 3),
+                "avg_wait_ms": round(average, 3),
+                "max_wait_ms": round(self.wait_max_ms, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """Time every checkout from the pool, including the wait for a free slot."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+        if "_dispatch" not in kwargs:
+            # Connections dropped by pre-ping or after a disconnect error;
+            # recreated pools inherit this listener through _dispatch
+            event.listen(self, "invalidate", self._on_invalidate)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.wait_stats.record_invalidated()
+
+    def recreate(self):
+        # Keep the counters when the pool is recreated after a dispose()
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record_timeout()
+            raise
+        self.wait_stats.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool that records checkout wait statistics."""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait statistics."""
+
+
+def get_pool_stats(engine: Engine) -> Dict[str, Any]:
+    """Describe the live state of an engine's connection pool."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    else:
+        stats["status"] = pool.status()
+
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.snapshot())
+    return stats
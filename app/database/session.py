@@ -1,22 +1,165 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.database.pool import TimedQueuePool, TimedAsyncAdaptedQueuePool
 
-# Create database engine
-engine = create_engine(settings.database_url)
+# Async driver used for each database backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str) -> URL:
+    """Translate a sync database URL into the equivalent async driver URL."""
+    url = make_url(database_url)
+    async_driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if async_driver is None or url.drivername == async_driver:
+        return url
+
+    url = url.set(drivername=async_driver)
+    # asyncpg does not understand libpq's sslmode; it takes the same values as "ssl"
+    if async_driver == "postgresql+asyncpg" and "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+def get_engine_options(database_url: str, use_async: bool = False) -> Dict[str, Any]:
+    """Build pool and connection options for an engine from the settings."""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options: Dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if settings.db_null_pool:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if use_async else TimedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle
+        )
+
+    if url.get_backend_name() == "postgresql":
+        if use_async:
+            options["connect_args"] = {"server_settings": {"application_name": settings.db_application_name}}
+            if settings.db_transaction_pooling:
+                # Consecutive statements may run on different server connections, so
+                # prepared statements are not cached and get names that cannot collide
+                options["connect_args"].update(
+                    statement_cache_size=0,
+                    prepared_statement_cache_size=0,
+                    prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__"
+                )
+        else:
+            options["connect_args"] = {"application_name": settings.db_application_name}
+    return options
+
+
+def get_session_settings() -> Dict[str, str]:
+    """Server settings applied to every PostgreSQL session or transaction."""
+    session_settings = {}
+    if settings.db_statement_timeout_ms > 0:
+        session_settings["statement_timeout"] = str(int(settings.db_statement_timeout_ms))
+    if settings.db_timezone:
+        # CURRENT_DATE and now() in the absence queries follow the session timezone
+        session_settings["timezone"] = settings.db_timezone
+    return session_settings
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def get_session_statements() -> List[str]:
+    """SET statements applied to every new PostgreSQL connection."""
+    statements = []
+    for name, value in get_session_settings().items():
+        if name == "statement_timeout":
+            statements.append(f"SET {name} = {value}")
+        else:
+            statements.append(f"SET {name} = {_quote(value)}")
+    return statements
+
+
+def get_transaction_statement() -> Optional[str]:
+    """
+    Single statement applying the session settings to the current transaction only.
+
+    Used with transaction pooling, where a session-level SET stays on whichever
+    server connection ran it rather than the one that runs later queries.
+    """
+    session_settings = get_session_settings()
+    if not session_settings:
+        return None
+    calls = ", ".join(
+        f"set_config({_quote(name)}, {_quote(value)}, true)" for name, value in session_settings.items()
+    )
+    return f"SELECT {calls}"
+
+
+def configure_session_settings(sync_engine) -> None:
+    """Apply server settings to every new PostgreSQL connection, or every transaction when pooled."""
+    if sync_engine.dialect.name != "postgresql":
+        return
+
+    if settings.db_transaction_pooling:
+        statement = get_transaction_statement()
+        if statement is None:
+            return
+
+        @event.listens_for(sync_engine, "begin")
+        def set_transaction_settings(connection):
+            # Equivalent to SET LOCAL; reset by the server at COMMIT or ROLLBACK
+            connection.exec_driver_sql(statement)
+        return
+
+    statements = get_session_statements()
+    if not statements:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_session_settings(dbapi_connection, connection_record):
+        # Sent as SETs rather than startup options, which PgBouncer rejects
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+        dbapi_connection.commit()
+
+
+# Create sync database engine (migrations and command line tools)
+engine = create_engine(settings.database_url, **get_engine_options(settings.database_url))
+configure_session_settings(engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async database engine used by the API
+async_engine = create_async_engine(
+    get_async_database_url(settings.database_url),
+    **get_engine_options(settings.database_url, use_async=True)
+)
+configure_session_settings(async_engine.sync_engine)
+
+# Create AsyncSessionLocal class
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency to get async database session."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
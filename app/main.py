@@ -1,14 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import auth, beacons, presence_logs, notifications, absent_detail
+from app.api.routes import auth, beacons, presence_logs, notifications, absent_detail, diagnostics, maintenance
+from app.services.presence_buffer import presence_buffer
+from app.services.notification_outbox import notification_outbox_worker
+from app.core.http_client import close_http_client
+from app.core.password_hasher import password_hasher
+from app.database.session import AsyncSessionLocal
+from app.services.beacon_registry import beacon_registry
+from app.services.job_scheduler import in_process_scheduler
+import logging
 import os
 import time
 
+logger = logging.getLogger(__name__)
+
 # Set timezone to GMT+7 (Asia/Jakarta) to match database timezone
 os.environ['TZ'] = 'Asia/Jakarta'
 time.tzset()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background components with the application."""
+    if settings.beacon_registry_enabled:
+        try:
+            async with AsyncSessionLocal() as db:
+                await beacon_registry.load(db)
+        except Exception as e:
+            # The registry loads on first use instead
+            logger.warning(f"Could not preload the beacon registry: {str(e)}")
+    if settings.presence_buffer_enabled:
+        await presence_buffer.start()
+    if settings.notification_outbox_enabled:
+        await notification_outbox_worker.start()
+    if settings.scheduler_in_process:
+        await in_process_scheduler.start()
+    yield
+    await in_process_scheduler.stop()
+    # Drain buffered presence logs before the process exits
+    await presence_buffer.stop()
+    await notification_outbox_worker.stop()
+    await close_http_client()
+    password_hasher.shutdown()
+
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.project_name,
@@ -16,7 +53,8 @@ app = FastAPI(
     version="1.0.0",
     openapi_url=f"{settings.api_v1_str}/openapi.json",
     docs_url=f"{settings.api_v1_str}/docs",
-    redoc_url=f"{settings.api_v1_str}/redoc"
+    redoc_url=f"{settings.api_v1_str}/redoc",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -26,6 +64,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
@@ -34,6 +73,8 @@ app.include_router(beacons.router, prefix=settings.api_v1_str)
 app.include_router(presence_logs.router, prefix=settings.api_v1_str)
 app.include_router(notifications.router, prefix=settings.api_v1_str)
 app.include_router(absent_detail.router, prefix=settings.api_v1_str)
+app.include_router(diagnostics.router, prefix=settings.api_v1_str)
+app.include_router(maintenance.router, prefix=settings.api_v1_str)
 
 
 @app.get("/")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, String, Text
+from app.database.session import Base
+
+
+class NotificationCooldown(Base):
+    """When a notification of a kind was last sent to an employee."""
+    __tablename__ = "notification_cooldowns"
+
+    employee_id = Column(Text, primary_key=True)
+    # Notification type, e.g. "absence"
+    kind = Column(String(16), primary_key=True)
+    # Naive UTC
+    last_sent_at = Column(DateTime(timezone=False), nullable=False)
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, Text, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database.session import Base
+import uuid
+
+
+class NotificationJob(Base):
+    """One notification request, delivered in the background through the outbox."""
+    __tablename__ = "notification_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # "qleap" (notify-to-qleap) or "absence" (notify-absence)
+    kind = Column(String(16), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=False), server_default=func.now())
+
+
+class NotificationOutbox(Base):
+    """A single push notification waiting for, or done with, delivery."""
+    __tablename__ = "notification_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("notification_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Order of the item within its job
+    position = Column(Integer, nullable=False, default=0)
+    employee_id = Column(Text, nullable=True)
+    # JSON body posted to the notification service
+    payload = Column(JSON, nullable=False)
+    # pending -> sending -> sent | failed (retries go back to pending)
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Naive UTC; for "sending" rows this is the end of the worker's lease
+    next_attempt_at = Column(DateTime(timezone=False), nullable=False)
+    response_code = Column(Integer, nullable=True)
+    response_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=False), server_default=func.now())
+    updated_at = Column(DateTime(timezone=False), nullable=True)
+
+    __table_args__ = (
+        # Workers claim due rows by status and next_attempt_at
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
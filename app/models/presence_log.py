@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Float, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, Float, Integer, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -15,8 +15,9 @@ class PresenceLog(Base):
     user_id = Column(Text, nullable=False, index=True)
     # beacon_id text NULL - with foreign key constraint (but make it optional for now)
     beacon_id = Column(Text, nullable=True, index=True)
-    # "timestamp" timestamp NULL
-    timestamp = Column(DateTime(timezone=False), nullable=True)  # Note: no timezone in your schema
+    # "timestamp" timestamp NOT NULL - range partition key, part of the
+    # (id, "timestamp") primary key since migration 0003_partition_presence_logs
+    timestamp = Column(DateTime(timezone=False), nullable=False)  # Note: no timezone in your schema
     # latitude float8 NULL
     latitude = Column(Float, nullable=True)
     # longitude float8 NULL
@@ -27,3 +28,13 @@ class PresenceLog(Base):
     created_at = Column(DateTime(timezone=False), server_default=func.now(), nullable=True)
     # updated_at timestamp NULL
     updated_at = Column(DateTime(timezone=False), nullable=True)
+
+    __table_args__ = (
+        # Hot queries filter by user or beacon with a time range, newest first
+        # in (timestamp DESC, id DESC) order, the order of cursor pagination
+        # (created by alembic revisions 0002_presence_log_indexes and
+        # 0008_presence_log_keyset_indexes)
+        Index("ix_presence_logs_user_id_timestamp_id", "user_id", timestamp.desc(), id.desc()),
+        Index("ix_presence_logs_beacon_id_timestamp_id", "beacon_id", timestamp.desc(), id.desc()),
+        Index("ix_presence_logs_created_at_brin", "created_at", postgresql_using="brin"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Text
+from sqlalchemy.sql import func
+from app.database.session import Base
+
+
+class PresenceState(Base):
+    """Latest presence detection per user, maintained on every presence-log insert."""
+    __tablename__ = "presence_state"
+
+    user_id = Column(Text, primary_key=True)
+    # "timestamp" of the user's newest presence log (naive local time, like presence_logs)
+    last_detected_at = Column(DateTime(timezone=False), nullable=False)
+    beacon_id = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=False), server_default=func.now(), onupdate=func.now())
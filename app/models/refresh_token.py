@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, ForeignKey, String
+from sqlalchemy.dialects.postgresql import UUID
+from app.database.session import Base
+
+
+class RefreshToken(Base):
+    """An issued refresh token. Only the SHA-256 of the token is stored."""
+    __tablename__ = "refresh_tokens"
+
+    token_hash = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Shared by every token rotated from the same login
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    # Naive UTC
+    expires_at = Column(DateTime(timezone=False), nullable=False, index=True)
+    # Set when the token is rotated or revoked; a second use revokes the family
+    used_at = Column(DateTime(timezone=False), nullable=True)
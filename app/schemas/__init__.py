@@ -2,4 +2,5 @@ from .auth import *
 from .beacon import *
 from .presence_log import *
 from .error import *
-from .notification import *
\ No newline at end of file
+from .notification import *
+from .maintenance import *
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import uuid
 
 
@@ -59,3 +59,61 @@ class Beacon(BeaconBase):
                 "app_token": "eXQJ8V9K5fD:APA91bH..."
             }
         }
+
+
+class BeaconNearby(Beacon):
+    # Great-circle distance from the queried point
+    distance_m: float
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "123e4567-e89b-12d3-a456-426614174000",
+                "beacon_id": "E2C56DB5-DFFB-48D2-B060-D0F5A71096E0",
+                "location_name": "Main Entrance",
+                "latitude": 34.052235,
+                "longitude": -118.243683,
+                "app_token": "eXQJ8V9K5fD:APA91bH...",
+                "distance_m": 42.7
+            }
+        }
+
+class BeaconBulkItemResult(BaseModel):
+    index: int
+    beacon_id: str
+    success: bool
+    # "created", "updated" or "deleted"
+    status: Optional[str] = None
+    id: Optional[uuid.UUID] = None
+    error: Optional[str] = None
+
+
+class BeaconBulkResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BeaconBulkItemResult] = []
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "total": 2,
+                "succeeded": 1,
+                "failed": 1,
+                "results": [
+                    {
+                        "index": 0,
+                        "beacon_id": "E2C56DB5-DFFB-48D2-B060-D0F5A71096E0",
+                        "success": True,
+                        "status": "created",
+                        "id": "123e4567-e89b-12d3-a456-426614174000"
+                    },
+                    {
+                        "index": 1,
+                        "beacon_id": "E2C56DB5-DFFB-48D2-B060-D0F5A71096E0",
+                        "success": False,
+                        "error": "Duplicate beacon_id in request"
+                    }
+                ]
+            }
+        }
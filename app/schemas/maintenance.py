@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class PartitionMaintenanceResponse(BaseModel):
+    interval: str
+    created: List[str]
+    detached: List[str]
+    dropped: List[str]
+    # Partitions that could not be created or expired; retried on the next run
+    failed: List[str] = []
+    # Rows outside every partition range (presence_logs_default)
+    default_partition_rows: int = 0
+    partitions: List[str]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "interval": "month",
+                "created": ["presence_logs_p202701"],
+                "detached": ["presence_logs_p202509"],
+                "dropped": [],
+                "failed": [],
+                "default_partition_rows": 0,
+                "partitions": [
+                    "presence_logs_p202510",
+                    "presence_logs_p202511",
+                    "presence_logs_p202512",
+                    "presence_logs_p202701"
+                ]
+            }
+        }
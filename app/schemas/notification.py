@@ -1,5 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
+from datetime import datetime
+import uuid
 
 
 class NotifyToQleapRequest(BaseModel):
@@ -34,20 +36,29 @@ class NotifyToQleapResponse(BaseModel):
 
 class NotifyAbsenceRequest(BaseModel):
     threshold: int
+    # none: no notifications_detail; summary: employee_id and response_code only;
+    # failures: failed notifications only; full: every notification
+    detail_level: Literal["none", "summary", "failures", "full"] = "full"
+    # Only notify employees of this store ("Store ID" of employee_roster)
+    store_id: Optional[str] = None
     
     class Config:
         json_schema_extra = {
             "example": {
-                "threshold": 30
+                "threshold": 30,
+                "detail_level": "failures",
+                "store_id": "ST001"
             }
         }
 
 
 class NotificationDetail(BaseModel):
     employee_id: str
-    request_curl: str
+    # Only included when DEBUG is on
+    request_curl: Optional[str] = None
     response_code: int
-    response_message: str
+    # Truncated to NOTIFICATION_RESPONSE_MAX_CHARS; omitted at detail_level "summary"
+    response_message: Optional[str] = None
     
     class Config:
         json_schema_extra = {
@@ -67,6 +78,9 @@ class NotifyAbsenceResponse(BaseModel):
     total_employees: int
     notifications_sent: int
     notifications_failed: int
+    # Employees skipped because they were notified within the cooldown window
+    notifications_skipped: int = 0
+    skipped_employee_ids: List[str] = []
     notifications_detail: List[NotificationDetail] = []
     
     class Config:
@@ -74,10 +88,12 @@ class NotifyAbsenceResponse(BaseModel):
             "example": {
                 "success": True,
                 "threshold_minutes": 30,
-                "message": "Processed 2 employees",
-                "total_employees": 2,
+                "message": "Processed 3 employees",
+                "total_employees": 3,
                 "notifications_sent": 0,
                 "notifications_failed": 2,
+                "notifications_skipped": 1,
+                "skipped_employee_ids": ["202304677"],
                 "notifications_detail": [
                     {
                         "employee_id": "202304676",
@@ -88,3 +104,56 @@ class NotifyAbsenceResponse(BaseModel):
                 ]
             }
         }
+
+
+class NotificationJobItem(BaseModel):
+    employee_id: Optional[str] = None
+    status: str
+    attempts: int
+    response_code: Optional[int] = None
+    response_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class NotificationJobResponse(BaseModel):
+    job_id: uuid.UUID
+    kind: str
+    status: str
+    total: int
+    pending: int
+    sent: int
+    failed: int
+    created_at: Optional[datetime] = None
+    items: List[NotificationJobItem] = []
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "a1b2c3d4-e5f6-7890-1234-567890abcdef",
+                "kind": "absence",
+                "status": "running",
+                "total": 2,
+                "pending": 1,
+                "sent": 1,
+                "failed": 0,
+                "created_at": "2025-07-22T10:30:00",
+                "items": [
+                    {
+                        "employee_id": "202304676",
+                        "status": "sent",
+                        "attempts": 1,
+                        "response_code": 200,
+                        "response_message": "{\"success\":true}"
+                    },
+                    {
+                        "employee_id": "202304677",
+                        "status": "pending",
+                        "attempts": 1,
+                        "response_code": 503,
+                        "response_message": "Service Unavailable"
+                    }
+                ]
+            }
+        }
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, field_validator
+from typing import Optional, List
 from datetime import datetime
 import uuid
+from app.core.local_time import to_local_naive
 
 
 class PresenceLogBase(BaseModel):
@@ -15,6 +16,12 @@ class PresenceLogBase(BaseModel):
 class PresenceLogCreate(PresenceLogBase):
     timestamp: Optional[datetime] = None  # Allow timestamp to be set optionally
 
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_to_local_time(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # The column has no time zone, so offsets are converted to local time
+        return to_local_naive(value)
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -48,3 +55,38 @@ class PresenceLog(PresenceLogBase):
                 "created_at": "2024-01-15T14:30:00Z"
             }
         }
+
+
+class PresenceLogBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[uuid.UUID] = None
+    error: Optional[str] = None
+
+
+class PresenceLogBatchResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[PresenceLogBatchItemResult] = []
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "total": 2,
+                "created": 1,
+                "failed": 1,
+                "results": [
+                    {
+                        "index": 0,
+                        "success": True,
+                        "id": "a1b2c3d4-e5f6-7890-1234-567890abcdef"
+                    },
+                    {
+                        "index": 1,
+                        "success": False,
+                        "error": "Beacon with provided beacon_id not found"
+                    }
+                ]
+            }
+        }
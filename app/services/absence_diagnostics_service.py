@@ -0,0 +1,86 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from fastapi import HTTPException, status
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from app.services.notification_service import ABSENT_EMPLOYEES_QUERY
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AbsenceDiagnosticsService:
+    """
+    Troubleshooting checks for the absence notification query.
+
+    These used to run before every notify-absence call; they are now only
+    run on demand through GET /diagnostics/absence (DEBUG only).
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def collect(self, threshold: int, store_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Report the connection, clocks, v_presence_tracking and the employees
+        over threshold (of one store if store_id is given).
+        """
+        try:
+            db_info = (await self.db.execute(text(
+                "SELECT current_database(), current_user, inet_server_addr(), inet_server_port()"
+            ))).fetchone()
+            db_time = (await self.db.execute(text("SELECT now(), current_setting('timezone')"))).fetchone()
+
+            view_rows = await self.db.scalar(text("SELECT COUNT(*) FROM v_presence_tracking"))
+            roster_rows = await self.db.scalar(text("SELECT COUNT(*) FROM employee_roster"))
+            view_over_threshold = await self.db.scalar(
+                text("SELECT COUNT(*) FROM v_presence_tracking WHERE duration_minutes >= :threshold"),
+                {"threshold": threshold}
+            )
+            columns = (await self.db.execute(text("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name = 'v_presence_tracking'
+                ORDER BY ordinal_position
+            """))).fetchall()
+
+            employees = (await self.db.execute(
+                ABSENT_EMPLOYEES_QUERY, {"threshold": threshold, "store_id": store_id}
+            )).fetchall()
+        except Exception as e:
+            logger.error(f"Absence diagnostics failed: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Absence diagnostics failed: {str(e)}"
+            )
+
+        return {
+            "threshold_minutes": threshold,
+            "store_id": store_id,
+            "database": {
+                "name": db_info[0],
+                "user": db_info[1],
+                "host": str(db_info[2]) if db_info[2] is not None else None,
+                "port": db_info[3]
+            },
+            "clock": {
+                "database_now": db_time[0],
+                "database_timezone": db_time[1],
+                "server_local_time": datetime.now(),
+                "server_utc_time": datetime.now(timezone.utc),
+                "server_timezone": list(time.tzname)
+            },
+            "view": {
+                "rows": view_rows,
+                "rows_over_threshold_by_view_duration": view_over_threshold,
+                "columns": [{"name": column[0], "type": column[1]} for column in columns]
+            },
+            "roster": {
+                "rows": roster_rows
+            },
+            "employees_over_threshold": [
+                {"employee_id": row[0], "calculated_minutes": float(row[2]) if row[2] is not None else None}
+                for row in employees
+            ]
+        }
@@ -1,8 +1,9 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import List, Dict, Any
 import logging
 from app.schemas.absent_detail import AbsentDetailRecord
+from app.services.employee_roster_service import EmployeeRosterService
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -11,12 +12,13 @@ logger = logging.getLogger(__name__)
 class AbsentDetailService:
     """Service for handling absent detail operations."""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_absent_detail_by_employee_id(self, employee_id: str) -> List[AbsentDetailRecord]:
+    async def get_absent_detail_by_employee_id(self, employee_id: str) -> List[AbsentDetailRecord]:
         """
-        Get absent detail records for a specific employee from v_presence_tracking view.
+        Get absent detail records for a specific employee from employee_roster,
+        with the last detection taken from presence_state.
         
         Args:
             employee_id: The employee ID to filter by
@@ -30,16 +32,27 @@ class AbsentDetailService:
         try:
             logger.info(f"Querying absent detail for employee_id: {employee_id}")
             
-            # Execute the specific SQL query as requested
+            # Employee, shift and store come from employee_roster and the last
+            # detection from presence_state, instead of v_presence_tracking and
+            # its aggregate over presence_logs; detections before today's shift
+            # start count as the shift start
+            await EmployeeRosterService(self.db).refresh_if_stale()
             query = text("""
-                SELECT "Store ID", "Store", "Location", "Employee ID", "Employee", 
-                       "Shift In", "Shift Out", "Last Detection", "Absent Duration (Hour:Minute)"
-                FROM v_presence_tracking
-                WHERE "Employee ID" = :employee_id
+                SELECT "Store ID", "Store", "Location", "Employee ID", "Employee",
+                       "Shift In", "Shift Out", last_detection,
+                       to_char(LOCALTIMESTAMP - last_detection, 'HH24:MI')
+                FROM (
+                    SELECT er."Store ID", er."Store", er."Location", er."Employee ID", er."Employee",
+                           er."Shift In", er."Shift Out",
+                           GREATEST(ps.last_detected_at, (CURRENT_DATE || ' ' || er."Shift In")::timestamp) AS last_detection
+                    FROM employee_roster er
+                    LEFT JOIN presence_state ps ON ps.user_id = er."Employee ID"
+                    WHERE er."Employee ID" = :employee_id
+                ) tracking
             """)
             
             logger.info(f"Executing query with parameter employee_id: '{employee_id}'")
-            result = self.db.execute(query, {"employee_id": employee_id})
+            result = await self.db.execute(query, {"employee_id": employee_id})
             rows = result.fetchall()
             
             logger.info(f"Query returned {len(rows)} rows")
@@ -52,10 +65,10 @@ class AbsentDetailService:
                 logger.warning(f"No rows found for employee_id: {employee_id}")
                 
                 # Let's also try a more permissive query to see if the employee exists at all
-                test_query = text("SELECT DISTINCT \"Employee ID\" FROM v_presence_tracking LIMIT 10")
-                test_result = self.db.execute(test_query)
+                test_query = text("SELECT DISTINCT \"Employee ID\" FROM employee_roster LIMIT 10")
+                test_result = await self.db.execute(test_query)
                 test_rows = test_result.fetchall()
-                logger.info(f"Sample employee IDs in view: {[row[0] for row in test_rows]}")
+                logger.info(f"Sample employee IDs in employee_roster: {[row[0] for row in test_rows]}")
             
             # Convert rows to list of AbsentDetailRecord objects
             records = []
@@ -1,18 +1,35 @@
-from sqlalchemy.orm import Session
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete
 from fastapi import HTTPException, status
+from app.core.config import settings
 from app.models.user import User
-from app.schemas.auth import UserRegistration, UserLogin
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.models.refresh_token import RefreshToken
+from app.schemas.auth import UserRegistration, UserLogin, AuthSuccess
+from app.core.security import create_access_token, token_cache
+from app.core.password_hasher import password_hasher
+
+logger = logging.getLogger(__name__)
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    """Digest under which a refresh token is stored."""
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
 
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def register_user(self, user_data: UserRegistration) -> User:
+    async def register_user(self, user_data: UserRegistration) -> User:
         """Register a new user."""
         # Check if user already exists
-        existing_user = self.db.query(User).filter(User.username == user_data.username).first()
+        existing_user = await self.db.scalar(select(User).where(User.username == user_data.username))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -20,23 +37,28 @@ class AuthService:
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        # bcrypt runs on the password hashing pool, not the event loop
+        hashed_password = await password_hasher.hash(user_data.password)
         db_user = User(
             username=user_data.username,
             hashed_password=hashed_password
         )
         
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
         
         return db_user
 
-    def authenticate_user(self, user_data: UserLogin) -> str:
-        """Authenticate user and return JWT token."""
-        user = self.db.query(User).filter(User.username == user_data.username).first()
+    async def login(self, user_data: UserLogin) -> AuthSuccess:
+        """Authenticate user and return an access token with a new refresh token."""
+        user = await self._verify_credentials(user_data)
+        return await self.issue_tokens(user)
+
+    async def _verify_credentials(self, user_data: UserLogin) -> User:
+        user = await self.db.scalar(select(User).where(User.username == user_data.username))
         
-        if not user or not verify_password(user_data.password, user.hashed_password):
+        if not user or not await password_hasher.verify(user_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password"
@@ -48,13 +70,98 @@ class AuthService:
                 detail="User account is deactivated"
             )
         
-        # Create access token
-        access_token = create_access_token(data={"sub": str(user.id)})
-        return access_token
+        return user
+
+    def create_token(self, user: User) -> str:
+        """Create an access token for a user."""
+        return create_access_token(data={"sub": str(user.id)})
+
+    async def issue_tokens(self, user: User, family_id: Optional[uuid.UUID] = None) -> AuthSuccess:
+        """
+        Create an access token and a refresh token for a user and commit.
+
+        A login starts a new token family; refreshes continue the family of
+        the token they rotate.
+        """
+        now = datetime.utcnow()
+        if family_id is None:
+            # New login: drop expired refresh tokens (range scan on expires_at)
+            await self.db.execute(delete(RefreshToken).where(RefreshToken.expires_at < now))
+
+        refresh_token = secrets.token_urlsafe(32)
+        self.db.add(RefreshToken(
+            token_hash=hash_refresh_token(refresh_token),
+            user_id=user.id,
+            family_id=family_id or uuid.uuid4(),
+            expires_at=now + timedelta(days=settings.refresh_token_expire_days)
+        ))
+        await self.db.commit()
+
+        return AuthSuccess(
+            token=self.create_token(user),
+            refresh_token=refresh_token,
+            expires_in=settings.access_token_expire_minutes * 60
+        )
+
+    async def refresh(self, refresh_token: str) -> AuthSuccess:
+        """
+        Rotate a refresh token: consume it and issue a new access and refresh token.
+
+        No password check is involved. A refresh token is single use;
+        presenting one that was already rotated means it leaked, so its whole
+        family is revoked and every access token issued to the user so far is
+        rejected from now on (users.tokens_valid_after).
+        """
+        now = datetime.utcnow()
+        token_hash = hash_refresh_token(refresh_token)
+        # Consume atomically, so concurrent refreshes with one token cannot both succeed
+        consumed = (await self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.expires_at > now
+            )
+            .values(used_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+        )).first()
+
+        if consumed is None:
+            stored = await self.db.scalar(select(RefreshToken).where(RefreshToken.token_hash == token_hash))
+            if stored is not None and stored.used_at is not None:
+                await self.db.execute(
+                    update(RefreshToken)
+                    .where(RefreshToken.family_id == stored.family_id, RefreshToken.used_at.is_(None))
+                    .values(used_at=now)
+                )
+                # Access tokens cannot be tied to a family; reject every one issued so far
+                await self.db.execute(
+                    update(User).where(User.id == stored.user_id).values(tokens_valid_after=now)
+                )
+                await self.db.commit()
+                token_cache.invalidate_user(str(stored.user_id))
+                logger.warning(
+                    f"Refresh token reuse detected for user {stored.user_id}, "
+                    f"token family and access tokens revoked"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired refresh token"
+            )
+
+        user = await self.db.scalar(select(User).where(User.id == consumed.user_id))
+        if not user or not user.is_active:
+            await self.db.commit()
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User account is deactivated"
+            )
+
+        return await self.issue_tokens(user, family_id=consumed.family_id)
 
-    def get_user_by_id(self, user_id: str) -> User:
+    async def get_user_by_id(self, user_id: str) -> User:
         """Get user by ID."""
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = await self.db.scalar(select(User).where(User.id == user_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
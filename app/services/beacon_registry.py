@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from pydantic import TypeAdapter
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.beacon import Beacon
+from app.schemas.beacon import Beacon as BeaconSchema
+from app.services.beacon_spatial import BeaconGridIndex
+
+logger = logging.getLogger(__name__)
+
+_beacon_list_adapter = TypeAdapter(List[BeaconSchema])
+
+
+class BeaconRegistry:
+    """
+    In-process snapshot of the beacons table, indexed by beacon_id.
+
+    Beacons change rarely, so reads are served from memory. Writes through
+    BeaconService invalidate the snapshot of their own process. Writes from
+    other processes are picked up through a version of the table (row count
+    and latest updated_at), checked at most once per check interval; until
+    then a beacon deleted elsewhere may still be seen as existing. Callers
+    that need a definite "not found" fall back to the database on a miss.
+    """
+
+    def __init__(self, check_interval_seconds: float):
+        self.check_interval_seconds = check_interval_seconds
+        self._beacons: Dict[str, BeaconSchema] = {}
+        self._version: Optional[Tuple[int, Any]] = None
+        self._bind = None
+        self._stale = True
+        self._checked_at = 0.0
+        # Serialised GET /v1/beacons body and its ETag, built once per snapshot
+        self._serialized: Optional[Tuple[str, bytes]] = None
+        # Spatial index for nearby queries, built once per snapshot
+        self._grid: Optional[BeaconGridIndex] = None
+        self.loaded_at: Optional[float] = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.version_checks = 0
+
+    def invalidate(self) -> None:
+        """Reload the snapshot on next use."""
+        self._stale = True
+
+    async def load(self, db: AsyncSession) -> None:
+        """Load every beacon in one query."""
+        # Read the version first: a write in between only causes an extra reload
+        version = await self._read_version(db)
+        beacons = (await db.scalars(select(Beacon))).all()
+        self._beacons = {beacon.beacon_id: BeaconSchema.model_validate(beacon) for beacon in beacons}
+        self._version = version
+        self._serialized = None
+        self._grid = None
+        self._bind = db.bind
+        self._stale = False
+        self._checked_at = time.monotonic()
+        self.loaded_at = time.time()
+        self.reloads += 1
+        logger.info(f"Beacon registry loaded {len(self._beacons)} beacons")
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Reload if invalidated or if the table version changed since the last check."""
+        # A snapshot belongs to the database it was loaded from
+        if self._stale or self._bind is not db.bind:
+            await self.load(db)
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_seconds:
+            return
+        self._checked_at = now
+        self.version_checks += 1
+        if await self._read_version(db) != self._version:
+            await self.load(db)
+
+    async def get_all(self, db: AsyncSession) -> List[BeaconSchema]:
+        await self.sync(db)
+        return list(self._beacons.values())
+
+    async def get_all_serialized(self, db: AsyncSession) -> Tuple[str, bytes]:
+        """
+        Return (etag, json_body) of the beacon list.
+
+        The ETag is a digest of the body itself, so it changes exactly when
+        the list does.
+        """
+        await self.sync(db)
+        if self._serialized is None:
+            body = _beacon_list_adapter.dump_json(list(self._beacons.values()))
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            self._serialized = (etag, body)
+        return self._serialized
+
+    async def nearby(
+        self,
+        db: AsyncSession,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        limit: int
+    ) -> List[Tuple[BeaconSchema, float]]:
+        """Return up to limit (beacon, distance_m) within radius_m of a point, nearest first."""
+        await self.sync(db)
+        if self._grid is None:
+            self._grid = BeaconGridIndex(self._beacons.values(), settings.beacon_nearby_cell_meters)
+        return self._grid.nearby(lat, lon, radius_m, limit)
+
+    async def get(self, db: AsyncSession, beacon_id: str) -> Optional[BeaconSchema]:
+        await self.sync(db)
+        beacon = self._beacons.get(beacon_id)
+        if beacon is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return beacon
+
+    async def known_ids(self, db: AsyncSession, beacon_ids: Iterable[str]) -> Set[str]:
+        """Return the beacon_ids present in the snapshot."""
+        await self.sync(db)
+        beacon_ids = set(beacon_ids)
+        known = {beacon_id for beacon_id in beacon_ids if beacon_id in self._beacons}
+        self.hits += len(known)
+        self.misses += len(beacon_ids) - len(known)
+        return known
+
+    @staticmethod
+    async def _read_version(db: AsyncSession) -> Tuple[int, Any]:
+        row = (await db.execute(select(func.count(Beacon.id), func.max(Beacon.updated_at)))).one()
+        return row[0], row[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.beacon_registry_enabled,
+            "size": len(self._beacons),
+            "stale": self._stale,
+            "loaded_at": self.loaded_at,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "version_checks": self.version_checks
+        }
+
+
+beacon_registry = BeaconRegistry(check_interval_seconds=settings.beacon_registry_check_interval_seconds)
@@ -1,18 +1,31 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
 from app.models.beacon import Beacon
-from app.schemas.beacon import BeaconCreate, BeaconUpdate
+from app.schemas.beacon import Beacon as BeaconSchema, BeaconCreate, BeaconUpdate, BeaconNearby, BeaconBulkItemResult, BeaconBulkResponse
+from app.services.beacon_registry import beacon_registry
+from app.services.beacon_spatial import BeaconGridIndex, METERS_PER_DEGREE
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Columns replaced when a bulk upsert hits an existing beacon_id
+UPSERT_COLUMNS = ("location_name", "latitude", "longitude", "app_token")
 
 
 class BeaconService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_beacon(self, beacon_data: BeaconCreate) -> Beacon:
+    async def create_beacon(self, beacon_data: BeaconCreate) -> Beacon:
         """Create a new beacon."""
         # Check if beacon with this beacon_id already exists
-        existing_beacon = self.db.query(Beacon).filter(Beacon.beacon_id == beacon_data.beacon_id).first()
+        existing_beacon = await self.db.scalar(select(Beacon).where(Beacon.beacon_id == beacon_data.beacon_id))
         if existing_beacon:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -21,18 +34,55 @@ class BeaconService:
         
         db_beacon = Beacon(**beacon_data.dict())
         self.db.add(db_beacon)
-        self.db.commit()
-        self.db.refresh(db_beacon)
+        await self.db.commit()
+        beacon_registry.invalidate()
+        await self.db.refresh(db_beacon)
         
         return db_beacon
 
-    def get_all_beacons(self) -> List[Beacon]:
-        """Get all beacons."""
-        return self.db.query(Beacon).all()
+    async def get_all_beacons(self) -> List[Beacon]:
+        """Get all beacons, from the beacon registry when it is enabled."""
+        if settings.beacon_registry_enabled:
+            return await beacon_registry.get_all(self.db)
+        result = await self.db.scalars(select(Beacon))
+        return list(result.all())
+
+    async def get_all_beacons_serialized(self) -> Tuple[str, bytes]:
+        """Get (etag, json_body) of all beacons from the beacon registry."""
+        return await beacon_registry.get_all_serialized(self.db)
+
+    async def get_nearby_beacons(self, lat: float, lon: float, radius_m: float, limit: int) -> List[BeaconNearby]:
+        """
+        Get beacons within radius_m of a point, nearest first.
 
-    def get_beacon_by_beacon_id(self, beacon_id: str) -> Beacon:
+        Served by the spatial index of the beacon registry. With the registry
+        disabled, candidates are read with a bounding-box query and ranked
+        the same way.
+        """
+        if settings.beacon_registry_enabled:
+            matches = await beacon_registry.nearby(self.db, lat, lon, radius_m, limit)
+        else:
+            lat_delta = radius_m / METERS_PER_DEGREE
+            query = select(Beacon).where(Beacon.latitude.between(lat - lat_delta, lat + lat_delta))
+            candidates = [BeaconSchema.model_validate(beacon) for beacon in (await self.db.scalars(query)).all()]
+            matches = BeaconGridIndex(candidates, settings.beacon_nearby_cell_meters).nearby(lat, lon, radius_m, limit)
+
+        return [
+            BeaconNearby(**beacon.model_dump(), distance_m=round(distance, 1))
+            for beacon, distance in matches
+        ]
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """Whether an If-None-Match header matches the ETag (weak comparison, as for GET)."""
+        if not if_none_match:
+            return False
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+    async def get_beacon_by_beacon_id(self, beacon_id: str) -> Beacon:
         """Get beacon by beacon_id."""
-        beacon = self.db.query(Beacon).filter(Beacon.beacon_id == beacon_id).first()
+        beacon = await self.db.scalar(select(Beacon).where(Beacon.beacon_id == beacon_id))
         if not beacon:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -40,22 +90,167 @@ class BeaconService:
             )
         return beacon
 
-    def update_beacon(self, beacon_id: str, beacon_data: BeaconUpdate) -> Beacon:
+    async def update_beacon(self, beacon_id: str, beacon_data: BeaconUpdate) -> Beacon:
         """Update an existing beacon."""
-        beacon = self.get_beacon_by_beacon_id(beacon_id)
+        beacon = await self.get_beacon_by_beacon_id(beacon_id)
         
         # Update only provided fields
         update_data = beacon_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(beacon, field, value)
         
-        self.db.commit()
-        self.db.refresh(beacon)
+        await self.db.commit()
+        beacon_registry.invalidate()
+        await self.db.refresh(beacon)
         
         return beacon
 
-    def delete_beacon(self, beacon_id: str) -> None:
+    async def delete_beacon(self, beacon_id: str) -> None:
         """Delete a beacon."""
-        beacon = self.get_beacon_by_beacon_id(beacon_id)
-        self.db.delete(beacon)
-        self.db.commit()
+        beacon = await self.get_beacon_by_beacon_id(beacon_id)
+        await self.db.delete(beacon)
+        await self.db.commit()
+        beacon_registry.invalidate()
+
+    @staticmethod
+    def check_bulk_size(count: int) -> None:
+        """Raise 400 for an empty bulk request or one over beacon_bulk_max_items."""
+        if count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Request must contain at least one beacon"
+            )
+        if count > settings.beacon_bulk_max_items:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Request cannot contain more than {settings.beacon_bulk_max_items} beacons"
+            )
+
+    async def bulk_upsert_beacons(self, items: List[BeaconCreate], atomic: bool = False) -> BeaconBulkResponse:
+        """
+        Create or replace many beacons with one INSERT ... ON CONFLICT (beacon_id) DO UPDATE.
+
+        Existing beacons get every field of their item. A beacon_id repeated
+        in the request fails for all but its first item. With atomic, any
+        failing item rejects the whole request with nothing written.
+        Otherwise the valid items are written; if the statement fails, they
+        are retried one by one in savepoints so only the offending rows fail.
+        """
+        results: List[Optional[BeaconBulkItemResult]] = [None] * len(items)
+        rows: Dict[int, Dict[str, Any]] = {}
+        seen = set()
+        for index, item in enumerate(items):
+            if item.beacon_id in seen:
+                results[index] = BeaconBulkItemResult(
+                    index=index, beacon_id=item.beacon_id, success=False,
+                    error="Duplicate beacon_id in request"
+                )
+                continue
+            seen.add(item.beacon_id)
+            rows[index] = {"id": uuid.uuid4(), **item.dict()}
+
+        if atomic and len(rows) < len(items):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Duplicate beacon_id in request"
+            )
+
+        existing = set((await self.db.scalars(
+            select(Beacon.beacon_id).where(Beacon.beacon_id.in_(seen))
+        )).all())
+
+        written: Dict[str, uuid.UUID] = {}
+        try:
+            written = dict((await self.db.execute(self._upsert_statement(list(rows.values())))).all())
+            await self.db.commit()
+        except (IntegrityError, DataError) as e:
+            await self.db.rollback()
+            if atomic:
+                logger.warning(f"Atomic bulk upsert of {len(rows)} beacons rejected: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid beacon data, no beacons were written"
+                )
+            written = await self._upsert_rows_individually(list(rows.values()))
+        beacon_registry.invalidate()
+
+        for index, row in rows.items():
+            beacon_id = row["beacon_id"]
+            if beacon_id in written:
+                results[index] = BeaconBulkItemResult(
+                    index=index, beacon_id=beacon_id, success=True,
+                    status="updated" if beacon_id in existing else "created",
+                    id=written[beacon_id]
+                )
+            else:
+                results[index] = BeaconBulkItemResult(
+                    index=index, beacon_id=beacon_id, success=False,
+                    error="Invalid beacon data"
+                )
+        return self._bulk_response(results)
+
+    async def _upsert_rows_individually(self, rows: List[Dict[str, Any]]) -> Dict[str, uuid.UUID]:
+        """Upsert rows one by one, each in a savepoint. Returns the written beacon_id -> id."""
+        written = {}
+        for row in rows:
+            try:
+                async with self.db.begin_nested():
+                    written.update((await self.db.execute(self._upsert_statement([row]))).all())
+            except (IntegrityError, DataError) as e:
+                logger.warning(f"Upsert of beacon {row['beacon_id']} failed: {str(e)}")
+        await self.db.commit()
+        return written
+
+    def _upsert_statement(self, rows: List[Dict[str, Any]]):
+        dialect = self.db.bind.dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(Beacon).values(rows)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(Beacon).values(rows)
+        else:
+            raise RuntimeError(f"Beacon upserts are not supported on {dialect}")
+
+        return stmt.on_conflict_do_update(
+            index_elements=[Beacon.beacon_id],
+            set_={
+                **{column: getattr(stmt.excluded, column) for column in UPSERT_COLUMNS},
+                "updated_at": func.now()
+            }
+        ).returning(Beacon.beacon_id, Beacon.id)
+
+    async def bulk_delete_beacons(self, beacon_ids: List[str], atomic: bool = False) -> BeaconBulkResponse:
+        """
+        Delete many beacons by beacon_id with one DELETE ... RETURNING.
+
+        Unknown beacon_ids fail; with atomic they reject the whole request
+        (404) and nothing is deleted.
+        """
+        deleted = set((await self.db.scalars(
+            delete(Beacon).where(Beacon.beacon_id.in_(set(beacon_ids))).returning(Beacon.beacon_id)
+        )).all())
+        missing = [beacon_id for beacon_id in beacon_ids if beacon_id not in deleted]
+        if atomic and missing:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Beacons not found: {', '.join(dict.fromkeys(missing))}"
+            )
+        await self.db.commit()
+        beacon_registry.invalidate()
+
+        return self._bulk_response([
+            BeaconBulkItemResult(index=index, beacon_id=beacon_id, success=True, status="deleted")
+            if beacon_id in deleted else
+            BeaconBulkItemResult(index=index, beacon_id=beacon_id, success=False, error="Beacon not found")
+            for index, beacon_id in enumerate(beacon_ids)
+        ])
+
+    @staticmethod
+    def _bulk_response(results: List[BeaconBulkItemResult]) -> BeaconBulkResponse:
+        succeeded = sum(1 for result in results if result.success)
+        return BeaconBulkResponse(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            results=results
+        )
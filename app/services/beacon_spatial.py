@@ -0,0 +1,82 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+from app.schemas.beacon import Beacon as BeaconSchema
+
+# Mean earth radius (IUGG)
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class BeaconGridIndex:
+    """
+    Beacons bucketed into a latitude/longitude grid of cell_meters cells.
+
+    A query only visits the cells overlapping the bounding box of its
+    circle (or, for very large circles, only the occupied cells) and ranks
+    the beacons found there by haversine distance. Beacons without
+    coordinates are not indexed.
+    """
+
+    def __init__(self, beacons: Iterable[BeaconSchema], cell_meters: float):
+        self.cell_degrees = cell_meters / METERS_PER_DEGREE
+        self.lon_cells = math.ceil(360 / self.cell_degrees)
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, BeaconSchema]]] = defaultdict(list)
+        self.size = 0
+        for beacon in beacons:
+            if beacon.latitude is None or beacon.longitude is None:
+                continue
+            self._cells[self._cell(beacon.latitude, beacon.longitude)].append(
+                (beacon.latitude, beacon.longitude, beacon)
+            )
+            self.size += 1
+
+    def _row(self, lat: float) -> int:
+        return math.floor((lat + 90) / self.cell_degrees)
+
+    def _col(self, lon: float) -> int:
+        return math.floor((lon + 180) / self.cell_degrees) % self.lon_cells
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return self._row(lat), self._col(lon)
+
+    def nearby(self, lat: float, lon: float, radius_m: float, limit: int) -> List[Tuple[BeaconSchema, float]]:
+        """Return up to limit (beacon, distance_m) within radius_m, nearest first."""
+        lat_delta = radius_m / METERS_PER_DEGREE
+        rows = range(self._row(max(lat - lat_delta, -90)), self._row(min(lat + lat_delta, 90)) + 1)
+
+        # Longitude span at the widest latitude the circle reaches
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 90)))
+        lon_delta = lat_delta / cos_lat if cos_lat > 1e-9 else 360
+        if lon_delta >= 180:
+            cols = set(range(self.lon_cells))
+        else:
+            first = math.floor((lon - lon_delta + 180) / self.cell_degrees)
+            last = math.floor((lon + lon_delta + 180) / self.cell_degrees)
+            cols = {col % self.lon_cells for col in range(first, last + 1)}
+
+        if len(rows) * len(cols) <= len(self._cells):
+            cells = [self._cells.get((row, col), ()) for row in rows for col in cols]
+        else:
+            cells = [
+                entries for (row, col), entries in self._cells.items()
+                if row in rows and col in cols
+            ]
+
+        matches = []
+        for entries in cells:
+            for beacon_lat, beacon_lon, beacon in entries:
+                distance = haversine_m(lat, lon, beacon_lat, beacon_lon)
+                if distance <= radius_m:
+                    matches.append((beacon, distance))
+        matches.sort(key=lambda match: match[1])
+        return matches[:limit]
@@ -0,0 +1,54 @@
+import logging
+import time
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmployeeRosterService:
+    """
+    Keep the employee_roster materialized view (migration 0010) fresh.
+
+    The roster holds the employee, shift and store columns of
+    v_presence_tracking, whose "Last Detection" aggregates presence_logs. It
+    is refreshed from the view at most every employee_roster_refresh_minutes
+    per process, so roster changes (new employees, shifts or tokens) show up
+    within that window while absence checks in between read no presence_logs.
+    """
+
+    # Monotonic time of this process's last refresh attempt
+    _refreshed_at: Optional[float] = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def refresh_if_stale(self) -> bool:
+        """Refresh the roster if this process has not done so within the interval. Returns whether it ran."""
+        interval = settings.employee_roster_refresh_minutes
+        if interval <= 0 or self.db.bind.dialect.name != "postgresql":
+            return False
+        now = time.monotonic()
+        if EmployeeRosterService._refreshed_at is not None \
+                and now - EmployeeRosterService._refreshed_at < interval * 60:
+            return False
+
+        # Claimed before the refresh so concurrent requests do not all run it
+        EmployeeRosterService._refreshed_at = now
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Absence checks keep using the previous roster
+            logger.error(f"Refreshing employee_roster failed: {str(e)}")
+            await self.db.rollback()
+            return False
+        return True
+
+    async def refresh(self) -> None:
+        """Rebuild the roster from v_presence_tracking without blocking readers."""
+        started = time.monotonic()
+        await self.db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY employee_roster"))
+        await self.db.commit()
+        logger.info(f"Refreshed employee_roster in {time.monotonic() - started:.2f}s")
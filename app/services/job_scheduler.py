@@ -0,0 +1,208 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.core.config import settings
+from app.database.session import AsyncSessionLocal, async_engine
+from app.services.notification_service import NotificationService
+from app.services.partition_service import PartitionService
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessScheduler:
+    """
+    Run the scheduled jobs of scheduler/scheduler.py inside the API process.
+
+    The absence notification job calls NotificationService directly every
+    scheduler_threshold_minutes during weekday business hours, and partition
+    maintenance runs daily when enabled. No login or HTTP round trip is
+    involved.
+
+    When several workers or replicas run the scheduler, only the leader runs
+    jobs. The leader is the process holding a session-level Postgres advisory
+    lock (scheduler_lock_id) on a dedicated connection. If it dies, its
+    connection closes and another process takes the lock at its next tick.
+    On other databases every process is its own leader.
+
+    A session-level lock needs a server connection of its own, so the
+    scheduler refuses to start behind a transaction pooler
+    (db_transaction_pooling), which would hand the lock's server connection
+    to other clients.
+    """
+
+    def __init__(self, engine: AsyncEngine = async_engine, session_factory=AsyncSessionLocal):
+        self.engine = engine
+        self.session_factory = session_factory
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._lock_conn: Optional[AsyncConnection] = None
+
+        # Metrics
+        self.runs_total = 0
+        self.skipped_not_leader = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._scheduler is not None and self._scheduler.running
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_conn is not None
+
+    async def start(self) -> None:
+        """Schedule the jobs on the running event loop."""
+        if self.running:
+            return
+        if self.engine.dialect.name == "postgresql" and settings.db_transaction_pooling:
+            raise RuntimeError(
+                "The in-process scheduler needs a session-level advisory lock, which does not work "
+                "with DB_TRANSACTION_POOLING; connect without the pooler or run scheduler/scheduler.py"
+            )
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(
+            self.run_absence_job,
+            trigger=IntervalTrigger(minutes=settings.scheduler_threshold_minutes),
+            id="absence_notification_job",
+            name="Era Beacon Absence Notification",
+            misfire_grace_time=300,
+            coalesce=True,
+            max_instances=1
+        )
+        if settings.scheduler_partition_maintenance_enabled:
+            self._scheduler.add_job(
+                self.run_partition_maintenance,
+                trigger=CronTrigger(hour=settings.scheduler_partition_maintenance_hour, minute=0),
+                id="partition_maintenance_job",
+                name="Era Beacon Presence Partition Maintenance",
+                misfire_grace_time=3600,
+                coalesce=True,
+                max_instances=1
+            )
+        self._scheduler.start()
+        logger.info(
+            f"In-process scheduler started (every {settings.scheduler_threshold_minutes} minutes, "
+            f"{settings.scheduler_weekday_start_hour}:00-{settings.scheduler_weekday_end_hour}:00 weekdays)"
+        )
+
+    async def stop(self) -> None:
+        """Stop scheduling and give up leadership."""
+        if self._scheduler is not None and self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+        await self._release_lock()
+        logger.info("In-process scheduler stopped")
+
+    def is_business_hours(self, now: Optional[datetime] = None) -> bool:
+        """Weekdays between scheduler_weekday_start_hour and scheduler_weekday_end_hour."""
+        now = now or datetime.now()
+        if now.weekday() >= 5:
+            return False
+        return settings.scheduler_weekday_start_hour <= now.hour < settings.scheduler_weekday_end_hour
+
+    async def acquire_leadership(self) -> bool:
+        """Take or confirm the advisory lock. Returns whether this process may run jobs."""
+        if self.engine.dialect.name != "postgresql":
+            return True
+
+        if self._lock_conn is not None:
+            try:
+                # Session-level locks live as long as the connection
+                await self._lock_conn.execute(text("SELECT 1"))
+                await self._lock_conn.commit()
+                return True
+            except Exception as e:
+                logger.warning(f"Scheduler lock connection lost: {str(e)}")
+                await self._release_lock()
+
+        conn = await self.engine.connect()
+        try:
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": settings.scheduler_lock_id}
+            )).scalar()
+            # Keep the lock outside of any transaction
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+
+        self._lock_conn = conn
+        logger.info("This process is now the scheduler leader")
+        return True
+
+    async def _release_lock(self) -> None:
+        if self._lock_conn is None:
+            return
+        try:
+            await self._lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": settings.scheduler_lock_id}
+            )
+            await self._lock_conn.commit()
+            await self._lock_conn.close()
+        except Exception as e:
+            # Closing the connection releases the lock anyway
+            logger.warning(f"Could not release the scheduler lock cleanly: {str(e)}")
+            await self._lock_conn.invalidate()
+        self._lock_conn = None
+
+    async def run_absence_job(self) -> Optional[Dict[str, Any]]:
+        """Send absence notifications if in business hours and leader. Returns the summary or None."""
+        if not self.is_business_hours():
+            logger.debug("Absence job skipped (outside business hours)")
+            return None
+        if not await self.acquire_leadership():
+            self.skipped_not_leader += 1
+            return None
+
+        threshold = settings.scheduler_threshold_minutes
+        async with self.session_factory() as db:
+            notification_service = NotificationService(db)
+            if settings.notification_outbox_enabled:
+                job = await notification_service.enqueue_notify_absence(threshold)
+                result = {"success": True, "job_id": str(job.job_id), "queued": job.total}
+            else:
+                outcome = await notification_service.notify_absence(threshold, detail_level="none")
+                result = {
+                    key: outcome.get(key)
+                    for key in ("success", "message", "total_employees", "notifications_sent",
+                                "notifications_failed", "notifications_skipped")
+                }
+
+        self.runs_total += 1
+        self.last_run_at = datetime.now()
+        self.last_result = result
+        logger.info(f"Absence job finished: {result}")
+        return result
+
+    async def run_partition_maintenance(self) -> None:
+        """Pre-create and expire presence_logs partitions if leader."""
+        if not await self.acquire_leadership():
+            return
+        async with self.session_factory() as db:
+            result = await PartitionService(db).run_maintenance()
+        logger.info(
+            f"Partition maintenance: created {result.created}, "
+            f"detached {result.detached}, dropped {result.dropped}, failed {result.failed}, "
+            f"{result.default_partition_rows} rows in the default partition"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "leader": self.is_leader if self.engine.dialect.name == "postgresql" else True,
+            "runs_total": self.runs_total,
+            "skipped_not_leader": self.skipped_not_leader,
+            "last_run_at": self.last_run_at,
+            "last_result": self.last_result
+        }
+
+
+in_process_scheduler = InProcessScheduler()
@@ -0,0 +1,117 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.notification_cooldown import NotificationCooldown
+
+logger = logging.getLogger(__name__)
+
+
+class CooldownCache:
+    """
+    In-process LRU of recent sends, keyed by (kind, employee_id).
+
+    It only short-circuits employees known to be cooling down; a miss or an
+    expired entry always falls through to the database, which is shared by
+    every process.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], datetime]" = OrderedDict()
+
+    def get(self, kind: str, employee_id: str) -> Optional[datetime]:
+        key = (kind, employee_id)
+        last_sent_at = self._entries.get(key)
+        if last_sent_at is not None:
+            self._entries.move_to_end(key)
+        return last_sent_at
+
+    def put(self, kind: str, employee_id: str, last_sent_at: datetime) -> None:
+        if self.max_size <= 0:
+            return
+        key = (kind, employee_id)
+        self._entries[key] = last_sent_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+cooldown_cache = CooldownCache(max_size=settings.notification_cooldown_cache_size)
+
+
+class NotificationCooldownService:
+    """Per-(employee, notification type) cooldown window."""
+
+    def __init__(self, db: AsyncSession, cache: CooldownCache = cooldown_cache):
+        self.db = db
+        self.cache = cache
+        self.window = timedelta(minutes=settings.notification_cooldown_minutes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > timedelta(0)
+
+    async def cooling_down(self, kind: str, employee_ids: Iterable[str]) -> Set[str]:
+        """Return the employees notified with kind within the window, checked in one query."""
+        if not self.enabled:
+            return set()
+
+        since = datetime.utcnow() - self.window
+        cooling = set()
+        unknown = []
+        for employee_id in dict.fromkeys(employee_ids):
+            last_sent_at = self.cache.get(kind, employee_id)
+            if last_sent_at is not None and last_sent_at > since:
+                cooling.add(employee_id)
+            else:
+                unknown.append(employee_id)
+
+        if unknown:
+            rows = (await self.db.execute(
+                select(NotificationCooldown.employee_id, NotificationCooldown.last_sent_at).where(
+                    NotificationCooldown.kind == kind,
+                    NotificationCooldown.employee_id.in_(unknown),
+                    NotificationCooldown.last_sent_at > since
+                )
+            )).all()
+            for employee_id, last_sent_at in rows:
+                cooling.add(employee_id)
+                self.cache.put(kind, employee_id, last_sent_at)
+
+        return cooling
+
+    async def record_sent(self, kind: str, employee_ids: Iterable[str]) -> None:
+        """Start the cooldown of the given employees. The caller owns the transaction."""
+        employee_ids = list(dict.fromkeys(employee_ids))
+        if not self.enabled or not employee_ids:
+            return
+
+        now = datetime.utcnow()
+        await self.db.execute(self._upsert_statement([
+            {"employee_id": employee_id, "kind": kind, "last_sent_at": now}
+            for employee_id in employee_ids
+        ]))
+        for employee_id in employee_ids:
+            self.cache.put(kind, employee_id, now)
+
+    def _upsert_statement(self, rows):
+        dialect = self.db.bind.dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(NotificationCooldown).values(rows)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(NotificationCooldown).values(rows)
+        else:
+            raise RuntimeError(f"notification_cooldowns upserts are not supported on {dialect}")
+
+        return stmt.on_conflict_do_update(
+            index_elements=[NotificationCooldown.employee_id, NotificationCooldown.kind],
+            set_={"last_sent_at": stmt.excluded.last_sent_at}
+        )
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.database.session import AsyncSessionLocal
+from app.models.notification_outbox import NotificationJob, NotificationOutbox
+from app.schemas.notification import NotificationJobResponse, NotificationJobItem
+from app.services.notification_cooldown import NotificationCooldownService
+from app.services.notification_transport import CircuitBreakerOpen, notification_breaker, post_notification, truncate_response_body
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying; any other non-2xx response fails the item
+RETRYABLE_STATUS_CODES = {408, 429}
+
+
+class NotificationOutboxService:
+    """Enqueue notification jobs and report their progress."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # job_id -> kind, for the cooldowns started by delivered rows
+        self._job_kinds: Dict[uuid.UUID, str] = {}
+
+    async def enqueue(self, kind: str, items: List[Dict[str, Any]]) -> NotificationJob:
+        """
+        Add a job and one outbox row per item ({"payload", "employee_id"}).
+
+        The caller owns the transaction, so the rows are committed together
+        with whatever the caller queried or wrote to build them.
+        """
+        now = datetime.utcnow()
+        job = NotificationJob(id=uuid.uuid4(), kind=kind, total=len(items))
+        self.db.add(job)
+        self.db.add_all([
+            NotificationOutbox(
+                job_id=job.id,
+                position=position,
+                employee_id=item.get("employee_id"),
+                payload=item["payload"],
+                status="pending",
+                attempts=0,
+                next_attempt_at=now
+            )
+            for position, item in enumerate(items)
+        ])
+        await self.db.flush()
+        logger.info(f"Enqueued notification job {job.id} ({kind}) with {len(items)} items")
+        return job
+
+    async def in_flight(self, kind: str, employee_ids: Iterable[str]) -> Set[str]:
+        """Return the employees that already have a pending or sending row of kind."""
+        employee_ids = list(dict.fromkeys(employee_ids))
+        if not employee_ids:
+            return set()
+        return set((await self.db.scalars(
+            select(NotificationOutbox.employee_id)
+            .join(NotificationJob, NotificationJob.id == NotificationOutbox.job_id)
+            .where(
+                NotificationJob.kind == kind,
+                NotificationOutbox.status.in_(("pending", "sending")),
+                NotificationOutbox.employee_id.in_(employee_ids)
+            )
+            .distinct()
+        )).all())
+
+    async def get_job(self, job_id: uuid.UUID) -> NotificationJobResponse:
+        """Get a job with the delivery status of each of its items."""
+        job = await self.db.get(NotificationJob, job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Notification job not found"
+            )
+
+        items = (await self.db.scalars(
+            select(NotificationOutbox)
+            .where(NotificationOutbox.job_id == job_id)
+            .order_by(NotificationOutbox.position)
+        )).all()
+
+        sent = sum(1 for item in items if item.status == "sent")
+        failed = sum(1 for item in items if item.status == "failed")
+        pending = len(items) - sent - failed
+        if pending == 0:
+            job_status = "completed"
+        elif any(item.attempts > 0 for item in items):
+            job_status = "running"
+        else:
+            job_status = "pending"
+
+        return NotificationJobResponse(
+            job_id=job.id,
+            kind=job.kind,
+            status=job_status,
+            total=job.total,
+            pending=pending,
+            sent=sent,
+            failed=failed,
+            created_at=job.created_at,
+            items=[NotificationJobItem.model_validate(item) for item in items]
+        )
+
+    async def claim(self, limit: int, lease_seconds: float) -> List[NotificationOutbox]:
+        """
+        Claim up to limit due rows for delivery and commit the claim.
+
+        Rows are locked with FOR UPDATE SKIP LOCKED, so concurrent workers
+        (in this or other processes) never claim the same row. Claimed rows
+        are leased: if the worker dies, they become due again when the lease
+        ends.
+        """
+        now = datetime.utcnow()
+        ids = (await self.db.scalars(
+            select(NotificationOutbox.id)
+            .where(
+                NotificationOutbox.status.in_(("pending", "sending")),
+                NotificationOutbox.next_attempt_at <= now
+            )
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not ids:
+            await self.db.commit()
+            return []
+
+        await self.db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids))
+            .values(
+                status="sending",
+                attempts=NotificationOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease_seconds),
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await self.db.scalars(
+            select(NotificationOutbox).where(NotificationOutbox.id.in_(ids))
+        )).all()
+        await self.db.commit()
+        return list(rows)
+
+    async def release(self, row: NotificationOutbox) -> None:
+        """
+        Return a claimed row that was never posted to the outbox, undoing the
+        attempt the claim counted, so local rejections (the circuit breaker)
+        do not use up its attempts.
+        """
+        now = datetime.utcnow()
+        await self.db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row.id)
+            .values(
+                status="pending",
+                attempts=NotificationOutbox.attempts - 1,
+                next_attempt_at=now,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def record_result(
+        self,
+        row: NotificationOutbox,
+        success: bool,
+        retryable: bool,
+        response_code: Optional[int],
+        response_message: Optional[str]
+    ) -> str:
+        """
+        Mark a delivered row as sent, failed, or pending with exponential
+        backoff. A sent row with an employee starts that employee's cooldown,
+        so failed deliveries are not suppressed.
+        """
+        now = datetime.utcnow()
+        values = {
+            "response_code": response_code,
+            "response_message": response_message,
+            "updated_at": now
+        }
+        if success:
+            values["status"] = "sent"
+        elif retryable and row.attempts < settings.notification_outbox_max_attempts:
+            delay = min(
+                settings.notification_outbox_backoff_base_seconds * 2 ** (row.attempts - 1),
+                settings.notification_outbox_backoff_max_seconds
+            )
+            values["status"] = "pending"
+            values["next_attempt_at"] = now + timedelta(seconds=delay)
+        else:
+            values["status"] = "failed"
+
+        await self.db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if success and row.employee_id:
+            await NotificationCooldownService(self.db).record_sent(await self._job_kind(row.job_id), [row.employee_id])
+        return values["status"]
+
+    async def _job_kind(self, job_id: uuid.UUID) -> str:
+        if job_id not in self._job_kinds:
+            self._job_kinds[job_id] = await self.db.scalar(
+                select(NotificationJob.kind).where(NotificationJob.id == job_id)
+            )
+        return self._job_kinds[job_id]
+
+
+class NotificationOutboxWorker:
+    """
+    Background delivery of queued notifications.
+
+    Each of the worker tasks claims a batch of due outbox rows, posts them to
+    the notification service concurrently over the shared HTTP client and
+    records the outcome. Failed deliveries are retried with exponential
+    backoff up to notification_outbox_max_attempts. Workers sleep for the
+    poll interval whenever there is nothing to deliver.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        poll_interval_ms: int,
+        lease_seconds: float,
+        session_factory=AsyncSessionLocal
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_ms / 1000
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+
+        self._tasks: List[asyncio.Task] = []
+        self._stopping: Optional[asyncio.Event] = None
+
+        # Metrics
+        self.claimed_total = 0
+        self.sent_total = 0
+        self.retried_total = 0
+        self.failed_total = 0
+        self.released_total = 0
+        self.batch_count = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        if self._tasks:
+            return
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(index)) for index in range(self.workers)]
+        logger.info(
+            f"Notification outbox started ({self.workers} workers, batch_size={self.batch_size})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the workers after their current batch; undelivered rows stay in the outbox."""
+        if not self._tasks:
+            return
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Notification outbox stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": len(self._tasks),
+            "claimed_total": self.claimed_total,
+            "sent_total": self.sent_total,
+            "retried_total": self.retried_total,
+            "failed_total": self.failed_total,
+            "released_total": self.released_total,
+            "batch_count": self.batch_count
+        }
+
+    async def _run(self, index: int) -> None:
+        while not self._stopping.is_set():
+            try:
+                delivered = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Notification outbox worker {index} failed: {str(e)}")
+                delivered = 0
+            if delivered == 0:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def process_batch(self) -> int:
+        """Claim, deliver and record one batch. Returns the number of rows claimed."""
+        # Only claim what the breaker will let through (all of it when closed,
+        # the free probe slots when half-open, nothing when open); the rest
+        # stay in the outbox until the notification service recovers
+        limit = notification_breaker.available_calls(self.batch_size)
+        if limit == 0:
+            return 0
+
+        async with self.session_factory() as db:
+            rows = await NotificationOutboxService(db).claim(limit, self.lease_seconds)
+        if not rows:
+            return 0
+
+        self.claimed_total += len(rows)
+        self.batch_count += 1
+        results = await asyncio.gather(*(self._deliver(row) for row in rows))
+
+        async with self.session_factory() as db:
+            service = NotificationOutboxService(db)
+            for row, result in zip(rows, results):
+                if result is None:
+                    # Rejected by the breaker (e.g. it opened during the batch)
+                    await service.release(row)
+                    self.released_total += 1
+                    continue
+                outcome = await service.record_result(row, *result)
+                if outcome == "sent":
+                    self.sent_total += 1
+                elif outcome == "failed":
+                    self.failed_total += 1
+                else:
+                    self.retried_total += 1
+            await db.commit()
+        return len(rows)
+
+    async def _deliver(self, row: NotificationOutbox) -> Optional[Tuple[bool, bool, Optional[int], Optional[str]]]:
+        """
+        Post one notification. Returns (success, retryable, response_code,
+        response_message), or None when the circuit breaker rejected the call
+        without a request being made.
+        """
+        try:
+            response = await post_notification(row.payload)
+        except CircuitBreakerOpen:
+            return None
+        except httpx.HTTPError as e:
+            logger.warning(f"Delivery of notification {row.id} failed (attempt {row.attempts}): {str(e)}")
+            return False, True, None, f"Request failed: {str(e)}"
+
+        success = 200 <= response.status_code < 300
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES
+        if not success:
+            logger.warning(
+                f"Delivery of notification {row.id} failed (attempt {row.attempts}): "
+                f"{response.status_code} {truncate_response_body(response.text)}"
+            )
+        return success, retryable, response.status_code, truncate_response_body(response.text) if response.text else "No response body"
+
+
+notification_outbox_worker = NotificationOutboxWorker(
+    workers=settings.notification_outbox_workers,
+    batch_size=settings.notification_outbox_batch_size,
+    poll_interval_ms=settings.notification_outbox_poll_interval_ms,
+    lease_seconds=settings.notification_outbox_lease_seconds
+)
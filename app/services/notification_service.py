@@ -1,55 +1,137 @@
-import requests
-import json
+import asyncio
 import httpx
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List, Dict, Any
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from typing import List, Dict, Any, Optional
 from fastapi import HTTPException, status
+from app.core.config import settings
+from app.services.notification_transport import CircuitBreakerOpen, post_notification, truncate_response_body
 from app.models.beacon import Beacon
-from app.schemas.notification import NotifyToQleapRequest, NotifyToQleapResponse
+from app.schemas.notification import NotifyToQleapRequest, NotifyToQleapResponse, NotificationJobResponse
+from app.services.notification_outbox import NotificationOutboxService
+from app.services.notification_cooldown import NotificationCooldownService
+from app.services.employee_roster_service import EmployeeRosterService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# The view's duration_minutes is calculated incorrectly due to timezone issues,
+# and its "Last Detection" aggregates presence_logs on every call. Employees,
+# shifts and stores are read from employee_roster (the view's other columns,
+# materialized) and the last detection from presence_state (one row per user),
+# so no presence_logs are read. A detection before today's shift start counts
+# as the shift start, so employees with no presence logs today are absent for
+# the whole shift.
+# LOCALTIMESTAMP and CURRENT_DATE rely on the session timezone set on every
+# connection (DB_TIMEZONE), the zone presence timestamps are stored in.
+ABSENT_EMPLOYEES_QUERY = text("""
+    SELECT "Employee ID", "Employee Token",
+           EXTRACT(epoch FROM LOCALTIMESTAMP - last_detection) / 60 as calculated_minutes
+    FROM (
+        SELECT er."Employee ID", er."Employee Token",
+               GREATEST(ps.last_detected_at, (CURRENT_DATE || ' ' || er."Shift In")::timestamp) AS last_detection
+        FROM employee_roster er
+        LEFT JOIN presence_state ps ON ps.user_id = er."Employee ID"
+        WHERE CAST(:store_id AS text) IS NULL OR CAST(er."Store ID" AS text) = CAST(:store_id AS text)
+    ) tracking
+    WHERE EXTRACT(epoch FROM LOCALTIMESTAMP - last_detection) / 60 >= :threshold
+""")
+
 
 class NotificationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.notification_url = "https://even-trainer-464609-d1.et.r.appspot.com/send-notification"
+        self.notification_url = settings.notification_url
+
+    @staticmethod
+    def qleap_payload(app_token: str) -> Dict[str, Any]:
+        """Notification body for a member detected near a beacon."""
+        return {
+            "token": app_token,
+            "title": "Eraspace Member is Detected!",
+            "body": "Open Information",
+            "link": "https://erabeacon-7e08e.web.app/"
+        }
+
+    @staticmethod
+    def absence_payload(employee_token: str, employee_id: str) -> Dict[str, Any]:
+        """Notification body for an employee out of store range."""
+        return {
+            "token": employee_token,
+            "title": "No Presence Detected!",
+            "body": "Out of store range",
+            "data": {
+                "employee_id": employee_id
+            }
+        }
+
+    async def get_app_tokens(self, beacon_id: str) -> List[str]:
+        """Get the app_tokens registered for a beacon_id, 404 if there are none."""
+        result = await self.db.scalars(select(Beacon).where(
+            Beacon.beacon_id == beacon_id,
+            Beacon.app_token.isnot(None),
+            Beacon.app_token != ""
+        ))
+        app_tokens = [beacon.app_token for beacon in result.all() if beacon.app_token]
+
+        if not app_tokens:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No beacons found with beacon_id '{beacon_id}' or no app_tokens available"
+            )
+        return app_tokens
+
+    def _curl_command(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Equivalent curl command for a notification, built only when debugging."""
+        if not settings.debug:
+            return None
+        curl_command = f"curl -X POST '{self.notification_url}' \\\n"
+        curl_command += f"  -H 'Content-Type: application/json' \\\n"
+        curl_command += f"  -d '{json.dumps(payload)}'"
+        return curl_command
+
+    async def enqueue_notify_to_qleap(self, request_data: NotifyToQleapRequest) -> NotificationJobResponse:
+        """Queue push notifications to all app_tokens of a beacon in the outbox."""
+        app_tokens = await self.get_app_tokens(request_data.beacon_id)
+        outbox = NotificationOutboxService(self.db)
+        job = await outbox.enqueue("qleap", [{"payload": self.qleap_payload(token)} for token in app_tokens])
+        await self.db.commit()
+        return await outbox.get_job(job.id)
+
+    async def enqueue_notify_absence(self, threshold: int, store_id: Optional[str] = None) -> NotificationJobResponse:
+        """Queue absence notifications for employees exceeding the threshold in the outbox."""
+        employees = await self.get_employees_exceeding_threshold(threshold, store_id)
+
+        # Delivered notifications start the cooldown (see NotificationOutboxService.record_result);
+        # until then, employees with a queued notification are not queued again
+        employee_ids = [employee["employee_id"] for employee in employees]
+        outbox = NotificationOutboxService(self.db)
+        skipped = await NotificationCooldownService(self.db).cooling_down("absence", employee_ids)
+        skipped |= await outbox.in_flight("absence", employee_ids)
+        employees = [employee for employee in employees if employee["employee_id"] not in skipped]
+
+        job = await outbox.enqueue("absence", [
+            {
+                "employee_id": employee["employee_id"],
+                "payload": self.absence_payload(employee["employee_token"], employee["employee_id"])
+            }
+            for employee in employees
+        ])
+        await self.db.commit()
+        return await outbox.get_job(job.id)
 
-    def notify_to_qleap(self, request_data: NotifyToQleapRequest) -> NotifyToQleapResponse:
+    async def notify_to_qleap(self, request_data: NotifyToQleapRequest) -> NotifyToQleapResponse:
         """
         Send push notifications to all app_tokens associated with a beacon_id.
         """
         try:
             # Query the beacons table to get all app_tokens for the given beacon_id
-            beacons = self.db.query(Beacon).filter(
-                Beacon.beacon_id == request_data.beacon_id,
-                Beacon.app_token.isnot(None),
-                Beacon.app_token != ""
-            ).all()
-
-            if not beacons:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"No beacons found with beacon_id '{request_data.beacon_id}' or no app_tokens available"
-                )
-
-            notifications_sent = 0
-            failed_notifications = []
+            app_tokens = await self.get_app_tokens(request_data.beacon_id)
+            results = await self._send_push_notifications(app_tokens)
 
-            # Send notification for each app_token
-            for beacon in beacons:
-                if beacon.app_token:
-                    try:
-                        success = self._send_push_notification(beacon.app_token)
-                        if success:
-                            notifications_sent += 1
-                        else:
-                            failed_notifications.append(beacon.app_token)
-                    except Exception as e:
-                        logger.error(f"Failed to send notification to token {beacon.app_token}: {str(e)}")
-                        failed_notifications.append(beacon.app_token)
+            notifications_sent = sum(1 for success in results if success)
+            failed_notifications = [token for token, success in zip(app_tokens, results) if not success]
 
             if notifications_sent == 0:
                 raise HTTPException(
@@ -76,29 +158,48 @@ class NotificationService:
                 detail=f"Internal server error: {str(e)}"
             )
 
-    def _send_push_notification(self, app_token: str) -> bool:
+    async def _send_push_notifications(self, app_tokens: List[str]) -> List[bool]:
+        """
+        Send push notifications to all app_tokens concurrently.
+
+        The whole dispatch is bounded by notification_deadline_seconds; tokens
+        still pending at the deadline are cancelled and reported as failed.
+        Returns a success flag per token, in order.
+        """
+        tasks = [asyncio.create_task(self._send_push_notification(token)) for token in app_tokens]
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks, timeout=settings.notification_deadline_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                f"{len(pending)} push notifications did not finish within "
+                f"{settings.notification_deadline_seconds}s and were cancelled"
+            )
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for token, task in zip(app_tokens, tasks):
+            if task in done and task.exception() is None:
+                results.append(task.result())
+            else:
+                if task in done:
+                    logger.error(f"Failed to send notification to token {token}: {str(task.exception())}")
+                results.append(False)
+        return results
+
+    async def _send_push_notification(self, app_token: str) -> bool:
         """
         Send a push notification to a specific app_token.
         Returns True if successful, False otherwise.
         """
-        payload = {
-            "token": app_token,
-            "title": "Eraspace Member is Detected!",
-            "body": "Open Information",
-            "link": "https://erabeacon-7e08e.web.app/"
-        }
-
-        headers = {
-            "Content-Type": "application/json"
-        }
+        payload = self.qleap_payload(app_token)
 
         try:
-            response = requests.post(
-                self.notification_url,
-                data=json.dumps(payload),
-                headers=headers,
-                timeout=30  # 30 second timeout
-            )
+            # Rate limited and guarded by the notification circuit breaker
+            response = await post_notification(payload)
             
             # Log the response for debugging
             logger.info(f"Notification API response: {response.status_code} - {response.text}")
@@ -106,196 +207,43 @@ class NotificationService:
             # Consider success if status code is 2xx
             return 200 <= response.status_code < 300
 
-        except requests.exceptions.RequestException as e:
+        except CircuitBreakerOpen as e:
+            logger.warning(f"Skipped notification to token {app_token}: {str(e)}")
+            return False
+        except httpx.HTTPError as e:
             logger.error(f"Request failed for token {app_token}: {str(e)}")
             return False
         except Exception as e:
             logger.error(f"Unexpected error sending notification to {app_token}: {str(e)}")
             return False
 
-    async def get_employees_exceeding_threshold(self, threshold: int) -> List[Dict[str, Any]]:
+    async def get_employees_exceeding_threshold(self, threshold: int, store_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Query the v_presence_tracking view for employees exceeding the threshold.
+        Query employee_roster and presence_state for employees exceeding the threshold.
         
         Args:
             threshold: Duration in minutes to check against
+            store_id: Only employees of this store (all stores if None)
             
         Returns:
             List of dictionaries containing Employee ID and Employee Token
         """
         try:
-            # The view's duration_minutes is calculated incorrectly due to timezone issues
-            # Let's create our own calculation that properly handles:
-            # 1. Employees with no presence logs (Last Detection = shift start time)  
-            # 2. Employees with actual presence logs but haven't been seen for a while
-            query = text("""
-                SELECT "Employee ID", "Employee Token",
-                       CASE 
-                           WHEN "Last Detection" = (CURRENT_DATE || ' ' || "Shift In")::timestamp THEN 
-                               -- No actual presence logs, use full shift duration
-                               EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - (CURRENT_DATE || ' ' || "Shift In")::timestamp) / 60
-                           ELSE 
-                               -- Has presence logs, calculate time since last detection
-                               EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - "Last Detection") / 60
-                       END as calculated_minutes
-                FROM v_presence_tracking vpt 
-                WHERE (
-                    -- Employee with no presence logs (Last Detection = shift start)
-                    "Last Detection" = (CURRENT_DATE || ' ' || "Shift In")::timestamp
-                    AND EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - (CURRENT_DATE || ' ' || "Shift In")::timestamp) / 60 >= :threshold
-                ) OR (
-                    -- Employee with presence logs but absent for threshold time
-                    "Last Detection" > (CURRENT_DATE || ' ' || "Shift In")::timestamp
-                    AND EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - "Last Detection") / 60 >= :threshold
-                )
-            """)
-            
-            print(f"DEBUG: Executing query with threshold: {threshold}")
-            print(f"DEBUG: Query: {query}")
-            logger.info(f"Executing query with threshold: {threshold}")
-            logger.info(f"Query: {query}")
-            
-            # Test database connection and view existence first
-            try:
-                # Check database connection details
-                db_url_query = text("SELECT current_database(), current_user, inet_server_addr(), inet_server_port()")
-                db_info = self.db.execute(db_url_query).fetchone()
-                print(f"DEBUG: Database info - DB: {db_info[0]}, User: {db_info[1]}, Host: {db_info[2]}, Port: {db_info[3]}")
-                
-                # Check current timezone settings
-                import datetime
-                import time
-                print(f"DEBUG: Python local time: {datetime.datetime.now()}")
-                print(f"DEBUG: Python UTC time: {datetime.datetime.now(datetime.timezone.utc)}")
-                print(f"DEBUG: System timezone: {time.tzname}")
-                
-                # Check database timezone and set it correctly
-                db_time_query = text("SELECT now(), current_setting('timezone')")
-                db_time_info = self.db.execute(db_time_query).fetchone()
-                print(f"DEBUG: Database time: {db_time_info[0]}, Database timezone: {db_time_info[1]}")
-                
-                # Set database session timezone to match server
-                set_tz_query = text("SET timezone = 'Asia/Jakarta'")
-                self.db.execute(set_tz_query)
-                self.db.commit()
-                
-                # Check timezone after setting
-                db_time_query2 = text("SELECT now(), current_setting('timezone')")
-                db_time_info2 = self.db.execute(db_time_query2).fetchone()
-                print(f"DEBUG: Database time after timezone set: {db_time_info2[0]}, Database timezone: {db_time_info2[1]}")
-                
-                test_query = text("SELECT COUNT(*) FROM v_presence_tracking")
-                test_result = self.db.execute(test_query)
-                total_count = test_result.scalar()
-                print(f"DEBUG: Total rows in v_presence_tracking view: {total_count}")
-                logger.info(f"Total rows in v_presence_tracking view: {total_count}")
-                
-                # Check the actual column names and data
-                inspect_query = text("""
-                    SELECT column_name, data_type 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'v_presence_tracking'
-                    ORDER BY ordinal_position
-                """)
-                columns_result = self.db.execute(inspect_query)
-                columns = columns_result.fetchall()
-                print(f"DEBUG: View columns: {[(col[0], col[1]) for col in columns]}")
-                
-                # Check actual data in the view - show ALL rows since there are only 2
-                sample_query = text("SELECT * FROM v_presence_tracking ORDER BY duration_minutes DESC")
-                sample_result = self.db.execute(sample_query)
-                sample_rows = sample_result.fetchall()
-                print(f"DEBUG: ALL data from view (ordered by duration_minutes DESC):")
-                for i, row in enumerate(sample_rows):
-                    print(f"DEBUG: Row {i}: {dict(row._mapping)}")
-                
-                # Test the exact query with different thresholds
-                for test_threshold in [30, 0, -1000]:
-                    test_query = text("SELECT COUNT(*) FROM v_presence_tracking WHERE duration_minutes >= :threshold")
-                    test_result = self.db.execute(test_query, {"threshold": test_threshold})
-                    test_count = test_result.scalar()
-                    print(f"DEBUG: Rows with duration_minutes >= {test_threshold}: {test_count}")
-                    
-                # Test the new corrected query logic
-                test_query = text("""
-                    SELECT "Employee ID", "Employee Token", "Last Detection", "Shift In",
-                           (CURRENT_DATE || ' ' || "Shift In")::timestamp as shift_start_today,
-                           CASE 
-                               WHEN "Last Detection" = (CURRENT_DATE || ' ' || "Shift In")::timestamp THEN 'NO_PRESENCE_LOGS'
-                               ELSE 'HAS_PRESENCE_LOGS'
-                           END as presence_status,
-                           CASE 
-                               WHEN "Last Detection" = (CURRENT_DATE || ' ' || "Shift In")::timestamp THEN 
-                                   EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - (CURRENT_DATE || ' ' || "Shift In")::timestamp) / 60
-                               ELSE 
-                                   EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - "Last Detection") / 60
-                           END as calculated_minutes
-                    FROM v_presence_tracking 
-                    ORDER BY "Employee ID"
-                """)
-                test_result = self.db.execute(test_query)
-                test_rows = test_result.fetchall()
-                print(f"DEBUG: Corrected absence calculation for ALL employees:")
-                for i, row in enumerate(test_rows):
-                    print(f"DEBUG: Employee {i}: ID='{row[0]}', Last Detection='{row[2]}', Shift Start Today='{row[4]}', Status='{row[5]}', Minutes='{row[6]}'")
-                
-                # Test with different thresholds using new logic
-                for test_threshold in [30, 0]:
-                    threshold_query = text("""
-                        SELECT "Employee ID", "Employee Token",
-                               CASE 
-                                   WHEN "Last Detection" = (CURRENT_DATE || ' ' || "Shift In")::timestamp THEN 
-                                       EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - (CURRENT_DATE || ' ' || "Shift In")::timestamp) / 60
-                                   ELSE 
-                                       EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - "Last Detection") / 60
-                               END as calculated_minutes
-                        FROM v_presence_tracking vpt 
-                        WHERE (
-                            "Last Detection" = (CURRENT_DATE || ' ' || "Shift In")::timestamp
-                            AND EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - (CURRENT_DATE || ' ' || "Shift In")::timestamp) / 60 >= :threshold
-                        ) OR (
-                            "Last Detection" > (CURRENT_DATE || ' ' || "Shift In")::timestamp
-                            AND EXTRACT(epoch FROM (now() AT TIME ZONE 'Asia/Jakarta') - "Last Detection") / 60 >= :threshold
-                        )
-                    """)
-                    threshold_result = self.db.execute(threshold_query, {"threshold": test_threshold})
-                    threshold_rows = threshold_result.fetchall()
-                    print(f"DEBUG: New query with threshold {test_threshold}: {len(threshold_rows)} employees")
-                    for i, row in enumerate(threshold_rows):
-                        print(f"DEBUG: Threshold {test_threshold} - Employee {i}: ID='{row[0]}', Minutes='{row[2]}'")
-                
-            except Exception as test_e:
-                print(f"DEBUG: Failed to access v_presence_tracking view: {test_e}")
-                logger.error(f"Failed to access v_presence_tracking view: {test_e}")
-                raise
-            
-            result = self.db.execute(query, {"threshold": threshold})
-            employees = []
-            
-            # Debug: Log raw result
-            rows = result.fetchall()
-            print(f"DEBUG: Raw query result: {len(rows)} rows returned")
-            logger.info(f"Raw query result: {len(rows)} rows returned")
-            
-            for i, row in enumerate(rows):
-                print(f"DEBUG: Row {i}: Employee ID='{row[0]}', Employee Token='{row[1]}', Calculated Minutes='{row[2]}'")
-                logger.info(f"Row {i}: Employee ID='{row[0]}', Employee Token='{row[1]}', Calculated Minutes='{row[2]}'")
-                employees.append({
+            await EmployeeRosterService(self.db).refresh_if_stale()
+            result = await self.db.execute(ABSENT_EMPLOYEES_QUERY, {"threshold": threshold, "store_id": store_id})
+            employees = [
+                {
                     "employee_id": row[0],  # Employee ID
                     "employee_token": row[1]  # Employee Token
-                })
+                }
+                for row in result.fetchall()
+            ]
             
-            print(f"DEBUG: Found {len(employees)} employees exceeding threshold of {threshold} minutes")
             logger.info(f"Found {len(employees)} employees exceeding threshold of {threshold} minutes")
             return employees
             
         except Exception as e:
-            print(f"DEBUG: Error querying v_presence_tracking view: {str(e)}")
-            print(f"DEBUG: Exception type: {type(e).__name__}")
-            print(f"DEBUG: Exception details: {repr(e)}")
-            logger.error(f"Error querying v_presence_tracking view: {str(e)}")
-            logger.error(f"Exception type: {type(e).__name__}")
-            logger.error(f"Exception details: {repr(e)}")
+            logger.error(f"Error querying absent employees: {str(e)}")
             raise
 
     async def send_absence_notification(self, employee_token: str, employee_id: str) -> Dict[str, Any]:
@@ -307,90 +255,72 @@ class NotificationService:
             employee_id: Employee ID
             
         Returns:
-            Dictionary with detailed notification result including curl and response info
+            Dictionary with detailed notification result including response info
+            (and the curl command when debugging)
         """
+        notification_payload = self.absence_payload(employee_token, employee_id)
         try:
-            notification_payload = {
-                "token": employee_token,
-                "title": "No Presence Detected!",
-                "body": "Out of store range",
-                "data": {
-                    "employee_id": employee_id
-                }
-            }
+            # Shared pooled client, rate limited and guarded by the circuit breaker;
+            # while the breaker is open this fails fast with CircuitBreakerOpen
+            response = await post_notification(notification_payload)
             
-            headers = {
-                "Content-Type": "application/json"
+            response_message = truncate_response_body(response.text) if response.text else "No response body"
+            result = {
+                "employee_id": employee_id,
+                "request_curl": self._curl_command(notification_payload),
+                "response_code": response.status_code,
+                "response_message": response_message
             }
             
-            # Generate curl command for debugging
-            curl_command = f"curl -X POST '{self.notification_url}' \\\n"
-            curl_command += f"  -H 'Content-Type: application/json' \\\n"
-            curl_command += f"  -d '{json.dumps(notification_payload)}'"
+            if response.status_code == 200:
+                logger.info(f"Successfully sent absence notification to employee {employee_id}")
+                result["success"] = True
+            else:
+                logger.error(f"Failed to send absence notification to employee {employee_id}. Status: {response.status_code}, Response: {response_message}")
+                result["success"] = False
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.notification_url,
-                    json=notification_payload,
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                result = {
-                    "employee_id": employee_id,
-                    "request_curl": curl_command,
-                    "response_code": response.status_code,
-                    "response_message": response.text if response.text else "No response body"
-                }
-                
-                if response.status_code == 200:
-                    logger.info(f"Successfully sent absence notification to employee {employee_id}")
-                    result["success"] = True
-                else:
-                    logger.error(f"Failed to send absence notification to employee {employee_id}. Status: {response.status_code}, Response: {response.text}")
-                    result["success"] = False
-                
-                return result
+            return result
                     
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Error sending absence notification to employee {employee_id}: {error_msg}")
             
-            # Generate curl command even for failed requests
-            curl_command = f"curl -X POST '{self.notification_url}' \\\n"
-            curl_command += f"  -H 'Content-Type: application/json' \\\n"
-            curl_command += f"  -d '{json.dumps(notification_payload) if 'notification_payload' in locals() else '{}'}'"
-            
             return {
                 "employee_id": employee_id,
-                "request_curl": curl_command,
+                "request_curl": self._curl_command(notification_payload),
                 "response_code": 0,
                 "response_message": f"Request failed: {error_msg}",
                 "success": False
             }
 
-    async def notify_absence(self, threshold: int) -> Dict[str, Any]:
+    async def notify_absence(
+        self,
+        threshold: int,
+        detail_level: str = "full",
+        store_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Main method to handle absence notifications.
         
         Args:
             threshold: Duration threshold in minutes
+            store_id: Only notify employees of this store (all stores if None)
+            detail_level: What notifications_detail contains: "none", "summary"
+                (employee and status code only), "failures" (failed notifications
+                only) or "full"
             
         Returns:
-            Dictionary with detailed notification results including curl requests and responses
+            Dictionary with notification results and the requested per-employee detail
         """
         try:
-            print(f"DEBUG: Starting notify_absence with threshold: {threshold}")
             logger.info(f"Starting notify_absence with threshold: {threshold}")
             
             # Get employees exceeding threshold
-            employees = await self.get_employees_exceeding_threshold(threshold)
+            employees = await self.get_employees_exceeding_threshold(threshold, store_id)
             
-            print(f"DEBUG: notify_absence: Retrieved {len(employees)} employees")
             logger.info(f"notify_absence: Retrieved {len(employees)} employees")
             
             if not employees:
-                print(f"DEBUG: No employees found exceeding threshold of {threshold} minutes")
                 logger.warning(f"No employees found exceeding threshold of {threshold} minutes")
                 return {
                     "success": True,
@@ -399,35 +329,66 @@ class NotificationService:
                     "total_employees": 0,
                     "notifications_sent": 0,
                     "notifications_failed": 0,
+                    "notifications_skipped": 0,
                     "notifications_detail": []
                 }
             
+            # Skip employees already notified within the cooldown window
+            cooldown = NotificationCooldownService(self.db)
+            cooling_down = await cooldown.cooling_down("absence", [employee["employee_id"] for employee in employees])
+            skipped_employee_ids = [employee["employee_id"] for employee in employees if employee["employee_id"] in cooling_down]
+            employees_to_notify = [employee for employee in employees if employee["employee_id"] not in cooling_down]
+            if skipped_employee_ids:
+                logger.info(f"Skipping {len(skipped_employee_ids)} employees in notification cooldown")
+            
             # Send notifications and collect detailed results
             successful_notifications = 0
             failed_notifications = 0
             notifications_detail = []
             
-            logger.info(f"Starting to send notifications to {len(employees)} employees")
+            logger.info(f"Starting to send notifications to {len(employees_to_notify)} employees")
             
-            for employee in employees:
-                notification_result = await self.send_absence_notification(
-                    employee["employee_token"], 
-                    employee["employee_id"]
-                )
-                
-                # Add to details list
-                notifications_detail.append({
-                    "employee_id": notification_result["employee_id"],
-                    "request_curl": notification_result["request_curl"],
-                    "response_code": notification_result["response_code"],
-                    "response_message": notification_result["response_message"]
-                })
+            # Send concurrently, at most notification_concurrency requests in flight
+            semaphore = asyncio.Semaphore(max(settings.notification_concurrency, 1))
+            
+            async def send(employee: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.send_absence_notification(
+                        employee["employee_token"],
+                        employee["employee_id"]
+                    )
+            
+            # gather keeps the results in employee order
+            notification_results = await asyncio.gather(*(send(employee) for employee in employees_to_notify))
+            
+            for notification_result in notification_results:
+                # Add to details list, as much as detail_level asks for
+                if detail_level == "summary":
+                    notifications_detail.append({
+                        "employee_id": notification_result["employee_id"],
+                        "response_code": notification_result["response_code"]
+                    })
+                elif detail_level == "full" or (detail_level == "failures" and not notification_result["success"]):
+                    notifications_detail.append({
+                        "employee_id": notification_result["employee_id"],
+                        "request_curl": notification_result["request_curl"],
+                        "response_code": notification_result["response_code"],
+                        "response_message": notification_result["response_message"]
+                    })
                 
                 if notification_result["success"]:
                     successful_notifications += 1
                 else:
                     failed_notifications += 1
             
+            # Only delivered notifications start a cooldown; failures are retried next run
+            if cooldown.enabled:
+                await cooldown.record_sent(
+                    "absence",
+                    [notification_result["employee_id"] for notification_result in notification_results if notification_result["success"]]
+                )
+                await self.db.commit()
+            
             result = {
                 "success": True,
                 "threshold_minutes": threshold,
@@ -435,10 +396,15 @@ class NotificationService:
                 "total_employees": len(employees),
                 "notifications_sent": successful_notifications,
                 "notifications_failed": failed_notifications,
+                "notifications_skipped": len(skipped_employee_ids),
+                "skipped_employee_ids": skipped_employee_ids,
                 "notifications_detail": notifications_detail
             }
             
-            logger.info(f"notify_absence completed: {result}")
+            logger.info(
+                f"notify_absence completed: {successful_notifications} sent, "
+                f"{failed_notifications} failed, {len(skipped_employee_ids)} skipped"
+            )
             return result
             
         except Exception as e:
@@ -452,5 +418,6 @@ class NotificationService:
                 "total_employees": 0,
                 "notifications_sent": 0,
                 "notifications_failed": 0,
+                "notifications_skipped": 0,
                 "notifications_detail": []
             }
@@ -0,0 +1,85 @@
+import json
+import logging
+from typing import Any, Dict
+import httpx
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.core.resilience import AdaptiveRateLimiter, CircuitBreaker, CircuitBreakerOpen
+
+logger = logging.getLogger(__name__)
+
+# Responses that signal an overloaded or failing notification service
+THROTTLE_STATUS_CODES = {429}
+
+notification_breaker = CircuitBreaker(
+    name="notification-service",
+    failure_rate_threshold=settings.notification_breaker_failure_rate,
+    window_size=settings.notification_breaker_window_size,
+    min_calls=settings.notification_breaker_min_calls,
+    open_seconds=settings.notification_breaker_open_seconds,
+    half_open_max_calls=settings.notification_breaker_half_open_calls
+)
+
+notification_rate_limiter = AdaptiveRateLimiter(
+    rate=settings.notification_rate_limit_per_second,
+    min_rate=settings.notification_rate_limit_min_per_second,
+    max_rate=settings.notification_rate_limit_max_per_second,
+    burst=settings.notification_rate_limit_burst
+)
+
+
+async def post_notification(payload: Dict[str, Any]) -> httpx.Response:
+    """
+    Post one notification to the notification service.
+
+    Calls are paced by the adaptive rate limiter and guarded by the circuit
+    breaker: while it is open this raises CircuitBreakerOpen without making
+    a request. Transport errors (httpx.HTTPError) are raised to the caller.
+    """
+    call = notification_breaker.before_call()
+    recorded = False
+    try:
+        await notification_rate_limiter.acquire()
+
+        try:
+            response = await get_http_client().post(
+                settings.notification_url,
+                content=json.dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=settings.notification_timeout_seconds
+            )
+        except httpx.HTTPError:
+            recorded = True
+            notification_breaker.record_failure(call)
+            raise
+
+        recorded = True
+        if response.status_code in THROTTLE_STATUS_CODES or response.status_code >= 500:
+            notification_breaker.record_failure(call)
+            notification_rate_limiter.on_throttle()
+        else:
+            # 4xx other than 429 is a problem with the request, not the service
+            notification_breaker.record_success(call)
+            notification_rate_limiter.on_success()
+        return response
+    finally:
+        if not recorded:
+            # Cancelled (e.g. by the notify-to-qleap deadline) or failed unexpectedly;
+            # also covers CancelledError, which is not an Exception
+            notification_breaker.record_abandoned(call)
+
+
+def truncate_response_body(text: str) -> str:
+    """Bound a response body kept in results, logs or the outbox."""
+    limit = settings.notification_response_max_chars
+    if limit > 0 and len(text) > limit:
+        return text[:limit] + f"... [truncated {len(text) - limit} chars]"
+    return text
+
+
+def get_transport_stats() -> Dict[str, Any]:
+    """Circuit breaker state and rate limiter metrics."""
+    return {
+        "circuit_breaker": notification_breaker.stats(),
+        "rate_limiter": notification_rate_limiter.stats()
+    }
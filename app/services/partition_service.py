@@ -0,0 +1,220 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from fastapi import HTTPException, status
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+from app.core.config import settings
+from app.schemas.maintenance import PartitionMaintenanceResponse
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "presence_logs"
+DEFAULT_PARTITION = "presence_logs_default"
+PARTITION_NAME = re.compile(r"^presence_logs_p(\d{6}|\d{8})$")
+
+
+class PartitionService:
+    """
+    Manage the range partitions of presence_logs.
+
+    Partitions are named presence_logs_pYYYYMM (monthly) or
+    presence_logs_pYYYYMMDD (daily) and cover [start, next start) of
+    "timestamp". Upcoming partitions are created ahead of time so inserts
+    never fall into the default partition, and partitions whose whole range
+    is older than the retention window are detached or dropped.
+
+    Every partition is created or expired in its own savepoint, so one
+    failure does not undo the others. Rows that devices stamped with a
+    future time land in the default partition; they are moved into the new
+    partition when its range is created.
+    """
+
+    def __init__(self, db: AsyncSession, interval: Optional[str] = None):
+        self.db = db
+        self.interval = (interval or settings.presence_partition_interval).lower()
+        if self.interval not in ("month", "day"):
+            raise ValueError("Partition interval must be 'month' or 'day'")
+
+    def period_start(self, day: date) -> date:
+        """First day of the partition period containing day."""
+        return day if self.interval == "day" else day.replace(day=1)
+
+    def next_period(self, start: date) -> date:
+        if self.interval == "day":
+            return start + timedelta(days=1)
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def partition_name(self, start: date) -> str:
+        if self.interval == "day":
+            return f"{PARENT_TABLE}_p{start:%Y%m%d}"
+        return f"{PARENT_TABLE}_p{start:%Y%m}"
+
+    def partition_range(self, name: str) -> Optional[Tuple[date, date]]:
+        """Parse the [start, end) range from a partition name, if it is one of ours."""
+        match = PARTITION_NAME.match(name)
+        if not match:
+            return None
+        digits = match.group(1)
+        daily = len(digits) == 8
+        start = date(int(digits[:4]), int(digits[4:6]), int(digits[6:8]) if daily else 1)
+        end = start + timedelta(days=1) if daily else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start, end
+
+    def upcoming_partitions(self, today: date) -> List[Tuple[str, date, date]]:
+        """The current partition and the configured number of future ones."""
+        start = self.period_start(today)
+        partitions = []
+        for _ in range(settings.presence_partition_premake + 1):
+            end = self.next_period(start)
+            partitions.append((self.partition_name(start), start, end))
+            start = end
+        return partitions
+
+    async def ensure_partitioned(self) -> None:
+        """Raise 409 unless presence_logs is a partitioned PostgreSQL table."""
+        if self.db.bind.dialect.name != "postgresql":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Partition maintenance requires PostgreSQL"
+            )
+        partitioned = await self.db.scalar(text(
+            "SELECT count(*) FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+        ), {"table": PARENT_TABLE})
+        if not partitioned:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="presence_logs is not partitioned; run alembic upgrade head first"
+            )
+
+    async def list_partitions(self) -> List[str]:
+        result = await self.db.scalars(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table) "
+            "ORDER BY c.relname"
+        ), {"table": PARENT_TABLE})
+        return list(result.all())
+
+    async def default_partition_rows(self, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """Count the rows in the default partition, optionally only those in [start, end)."""
+        if await self.db.scalar(text("SELECT to_regclass(:table)"), {"table": DEFAULT_PARTITION}) is None:
+            return 0
+        query = f"SELECT count(*) FROM {DEFAULT_PARTITION}"
+        params = {}
+        if start is not None:
+            query += ' WHERE "timestamp" >= :start AND "timestamp" < :end'
+            params = {"start": start, "end": end}
+        return await self.db.scalar(text(query), params)
+
+    async def create_partition(self, name: str, start: date, end: date) -> None:
+        """
+        Create one partition, moving its rows out of the default partition.
+
+        PostgreSQL refuses to create a partition while the default partition
+        holds rows in its range, so the default partition is detached, the
+        partition created, the rows moved and the default partition attached
+        again. Inserts wait on the parent's lock until the caller commits.
+        """
+        bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        misplaced = await self.default_partition_rows(start, end)
+        if not misplaced:
+            await self.db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+            return
+
+        in_range = '"timestamp" >= :start AND "timestamp" < :end'
+        params = {"start": start, "end": end}
+        await self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        await self.db.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        await self.db.execute(text(
+            f"INSERT INTO {PARENT_TABLE} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"
+        ), params)
+        await self.db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), params)
+        await self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        logger.info(f"Moved {misplaced} rows from {DEFAULT_PARTITION} into {name}")
+
+    async def create_upcoming_partitions(self, today: date) -> Tuple[List[str], List[str]]:
+        """Create missing upcoming partitions; returns the created and the failed names."""
+        existing = set(await self.list_partitions())
+        created, failed = [], []
+        for name, start, end in self.upcoming_partitions(today):
+            if name in existing:
+                continue
+            try:
+                async with self.db.begin_nested():
+                    await self.create_partition(name, start, end)
+            except Exception as e:
+                failed.append(name)
+                logger.error(f"Could not create partition {name} for [{start}, {end}): {str(e)}")
+                continue
+            created.append(name)
+            logger.info(f"Created partition {name} for [{start}, {end})")
+        return created, failed
+
+    async def expire_partitions(self, today: date) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Detach (and optionally drop) partitions entirely before the retention cutoff.
+
+        Returns the detached, dropped and failed partition names.
+        """
+        if settings.presence_retention_days <= 0:
+            return [], [], []
+
+        cutoff = today - timedelta(days=settings.presence_retention_days)
+        detached, dropped, failed = [], [], []
+        for name in await self.list_partitions():
+            partition_range = self.partition_range(name)
+            if partition_range is None or partition_range[1] > cutoff:
+                continue
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                    if settings.presence_retention_drop:
+                        await self.db.execute(text(f"DROP TABLE {name}"))
+            except Exception as e:
+                failed.append(name)
+                logger.error(f"Could not expire partition {name}: {str(e)}")
+                continue
+            detached.append(name)
+            logger.info(f"Detached expired partition {name}")
+            if settings.presence_retention_drop:
+                dropped.append(name)
+                logger.info(f"Dropped expired partition {name}")
+        return detached, dropped, failed
+
+    async def run_maintenance(self, today: Optional[date] = None) -> PartitionMaintenanceResponse:
+        """
+        Pre-create upcoming partitions and expire old ones.
+
+        Partitions that fail are reported in failed and retried on the next
+        run; the others are committed.
+        """
+        await self.ensure_partitioned()
+        today = today or date.today()
+
+        try:
+            created, failed = await self.create_upcoming_partitions(today)
+            detached, dropped, failed_expiry = await self.expire_partitions(today)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Partition maintenance failed: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Partition maintenance failed: {str(e)}"
+            )
+
+        default_rows = await self.default_partition_rows()
+        if default_rows:
+            logger.warning(f"{default_rows} presence logs are outside every partition range ({DEFAULT_PARTITION})")
+
+        return PartitionMaintenanceResponse(
+            interval=self.interval,
+            created=created,
+            detached=detached,
+            dropped=dropped,
+            failed=failed + failed_expiry,
+            default_partition_rows=default_rows,
+            partitions=await self.list_partitions()
+        )
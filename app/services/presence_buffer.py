@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.database.session import AsyncSessionLocal
+from app.services.presence_service import PresenceService
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the queue when the buffer is stopped
+_STOP = object()
+
+
+class PresenceWriteBuffer:
+    """
+    Write-behind buffer for presence log ingestion.
+
+    Validated rows are pushed onto a bounded in-process queue and acknowledged
+    immediately. A background flusher writes them in groups, either when
+    flush_size rows are waiting or flush_interval_ms after the first row of a
+    group arrived, using one multi-row INSERT and one commit per group.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        flush_size: int,
+        flush_interval_ms: int,
+        flush_retries: int = 2,
+        drain_timeout_seconds: float = 30
+    ):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_retries = flush_retries
+        self.drain_timeout_seconds = drain_timeout_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._accepting = False
+
+        # Metrics
+        self.enqueued_total = 0
+        self.rejected_total = 0
+        self.flushed_rows_total = 0
+        self.failed_rows_total = 0
+        self.flush_count = 0
+        self.last_flush_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        """True while the buffer accepts new rows."""
+        return self._accepting
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Create the queue and start the background flusher."""
+        if self._flusher is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._accepting = True
+        self._flusher = asyncio.create_task(self._run())
+        logger.info(
+            f"Presence write buffer started (capacity={self.max_size}, "
+            f"flush_size={self.flush_size}, flush_interval={self.flush_interval * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Stop accepting rows and drain everything already queued."""
+        if self._flusher is None:
+            return
+        self._accepting = False
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._flusher, timeout=self.drain_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Presence write buffer drain timed out, {self.queue_depth} rows were not written"
+            )
+            self._flusher.cancel()
+        self._flusher = None
+        logger.info("Presence write buffer stopped")
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue a prepared presence row for writing.
+
+        Returns False when the buffer is full so the caller can apply
+        back-pressure.
+        """
+        if not self._accepting:
+            raise RuntimeError("Presence write buffer is not running")
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rejected_total += 1
+            return False
+        self.enqueued_total += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and flush metrics."""
+        return {
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "capacity": self.max_size,
+            "enqueued_total": self.enqueued_total,
+            "rejected_total": self.rejected_total,
+            "flushed_rows_total": self.flushed_rows_total,
+            "failed_rows_total": self.failed_rows_total,
+            "flush_count": self.flush_count,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3)
+        }
+
+    async def _run(self) -> None:
+        """Flusher loop: collect a group of rows, write it, repeat until stopped."""
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    async def _collect(self):
+        """Wait for the first row, then gather more until the group is full or the interval ends."""
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.flush_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Write one group of rows, retrying transient failures.
+
+        When the group still fails after its retries it is split in halves
+        and written again, so only the rows that fail on their own are lost.
+        """
+        started = time.perf_counter()
+        written = len(batch)
+        for attempt in range(self.flush_retries + 1):
+            try:
+                await self._write_rows(batch)
+                break
+            except Exception as e:
+                if attempt == self.flush_retries:
+                    logger.warning(f"Flush of {len(batch)} buffered presence logs failed, isolating bad rows: {str(e)}")
+                    rejected = await self._write_isolating(batch)
+                    written = len(batch) - len(rejected)
+                    if rejected:
+                        self.failed_rows_total += len(rejected)
+                        logger.error(
+                            f"Dropping {len(rejected)} buffered presence logs that could not be written: "
+                            f"{', '.join(str(row.get('id')) for row in rejected)}"
+                        )
+                    break
+                logger.warning(f"Flush of {len(batch)} buffered presence logs failed (attempt {attempt + 1}): {str(e)}")
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushed_rows_total += written
+        self.flush_count += 1
+        self.last_flush_size = written
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _write_isolating(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write rows by halving the group on failure; return the rows that failed alone."""
+        if len(rows) == 1:
+            try:
+                await self._write_rows(rows)
+                return []
+            except Exception as e:
+                logger.error(f"Buffered presence log {rows[0].get('id')} could not be written: {str(e)}")
+                return rows
+
+        middle = len(rows) // 2
+        rejected = []
+        for half in (rows[:middle], rows[middle:]):
+            try:
+                await self._write_rows(half)
+            except Exception:
+                rejected.extend(await self._write_isolating(half))
+        return rejected
+
+    async def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert a group of rows with one statement and one commit."""
+        async with AsyncSessionLocal() as db:
+            try:
+                await PresenceService(db).insert_presence_rows(rows)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+
+presence_buffer = PresenceWriteBuffer(
+    max_size=settings.presence_buffer_max_size,
+    flush_size=settings.presence_buffer_flush_size,
+    flush_interval_ms=settings.presence_buffer_flush_interval_ms,
+    flush_retries=settings.presence_buffer_flush_retries,
+    drain_timeout_seconds=settings.presence_buffer_drain_timeout_seconds
+)
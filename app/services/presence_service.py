@@ -1,27 +1,31 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, tuple_, literal, Select
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from datetime import datetime
 from app.models.presence_log import PresenceLog
+from app.core.config import settings
+from app.core.local_time import to_local_naive
 from app.models.beacon import Beacon
-from app.schemas.presence_log import PresenceLogCreate
+from app.services.beacon_registry import beacon_registry
+from app.services.presence_state_service import PresenceStateService
+from app.schemas.presence_log import PresenceLogCreate, PresenceLogBatchResponse, PresenceLogBatchItemResult
+import base64
+import json
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 class PresenceService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_presence_log(self, presence_data: PresenceLogCreate) -> PresenceLog:
+    async def create_presence_log(self, presence_data: PresenceLogCreate) -> PresenceLog:
         """Create a new presence log entry."""
         # Verify that the beacon exists if beacon_id is provided
-        if presence_data.beacon_id:
-            beacon = self.db.query(Beacon).filter(Beacon.beacon_id == presence_data.beacon_id).first()
-            if not beacon:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Beacon with provided beacon_id not found"
-                )
+        await self.ensure_beacon_exists(presence_data.beacon_id)
         
         # Create presence log with current timestamp if not provided
         presence_dict = presence_data.dict()
@@ -31,54 +35,225 @@ class PresenceService:
         
         db_presence_log = PresenceLog(**presence_dict)
         self.db.add(db_presence_log)
-        self.db.commit()
-        self.db.refresh(db_presence_log)
+        await PresenceStateService(self.db).record_detections([presence_dict])
+        await self.db.commit()
+        await self.db.refresh(db_presence_log)
         
         return db_presence_log
 
-    def get_all_presence_logs(
+    async def ensure_beacon_exists(self, beacon_id: Optional[str]) -> None:
+        """Raise 404 if a beacon_id is given but no such beacon exists."""
+        if beacon_id:
+            if not await self.get_existing_beacon_ids({beacon_id}):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Beacon with provided beacon_id not found"
+                )
+
+    async def prepare_presence_row(self, presence_data: PresenceLogCreate) -> Dict[str, Any]:
+        """Validate a presence log and build its insertable row without writing it."""
+        await self.ensure_beacon_exists(presence_data.beacon_id)
+        return self._build_presence_row(presence_data, datetime.now())
+
+    async def create_presence_logs_batch(self, items: List[PresenceLogCreate]) -> PresenceLogBatchResponse:
+        """
+        Create many presence log entries in one transaction.
+
+        All beacon_ids are validated with a single set-based lookup and every
+        valid row is written with one multi-row INSERT ... RETURNING.
+        Items referencing unknown beacons are reported as failed without
+        affecting the rest of the batch.
+        """
+        beacon_ids = {item.beacon_id for item in items if item.beacon_id}
+        known_beacon_ids = await self.get_existing_beacon_ids(beacon_ids)
+
+        results: List[PresenceLogBatchItemResult] = []
+        rows: List[Dict[str, Any]] = []
+        now = datetime.now()
+
+        for index, item in enumerate(items):
+            if item.beacon_id and item.beacon_id not in known_beacon_ids:
+                results.append(PresenceLogBatchItemResult(
+                    index=index,
+                    success=False,
+                    error="Beacon with provided beacon_id not found"
+                ))
+                continue
+
+            row = self._build_presence_row(item, now)
+            rows.append(row)
+            results.append(PresenceLogBatchItemResult(index=index, success=True, id=row["id"]))
+
+        if rows:
+            try:
+                await self.insert_presence_rows(rows)
+                await self.db.commit()
+            except Exception as e:
+                await self.db.rollback()
+                logger.error(f"Batch insert of {len(rows)} presence logs failed: {str(e)}")
+                for result in results:
+                    if result.success:
+                        result.success = False
+                        result.id = None
+                        result.error = "Failed to store presence log"
+
+        created = sum(1 for result in results if result.success)
+        return PresenceLogBatchResponse(
+            total=len(items),
+            created=created,
+            failed=len(items) - created,
+            results=results
+        )
+
+    async def get_existing_beacon_ids(self, beacon_ids: set) -> set:
+        """
+        Return the subset of beacon_ids that exist.
+
+        Known beacons are answered by the beacon registry without a query;
+        the rest are looked up with one query, so beacons created by another
+        process are found before the registry notices them.
+        """
+        if not beacon_ids:
+            return set()
+        known = set()
+        if settings.beacon_registry_enabled:
+            known = await beacon_registry.known_ids(self.db, beacon_ids)
+        unknown = set(beacon_ids) - known
+        if unknown:
+            result = await self.db.scalars(
+                select(Beacon.beacon_id).where(Beacon.beacon_id.in_(unknown))
+            )
+            known |= set(result.all())
+        return known
+
+    async def insert_presence_rows(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Insert prepared presence log rows with a single multi-row INSERT.
+
+        presence_state is upserted in the same transaction. The caller owns
+        the transaction. Returns the (id, created_at) rows reported by
+        RETURNING. Offset timestamps are stored as naive local time.
+        """
+        for row in rows:
+            row["timestamp"] = to_local_naive(row.get("timestamp"))
+        stmt = insert(PresenceLog).values(rows).returning(PresenceLog.id, PresenceLog.created_at)
+        result = await self.db.execute(stmt)
+        inserted = result.all()
+        await PresenceStateService(self.db).record_detections(rows)
+        return inserted
+
+    @staticmethod
+    def _build_presence_row(presence_data: PresenceLogCreate, now: datetime) -> Dict[str, Any]:
+        """Build an insertable row, assigning the id client-side so results can be correlated."""
+        row = presence_data.dict()
+        if row.get("timestamp") is None:
+            # Use naive datetime to match database schema (no timezone)
+            row["timestamp"] = now
+        row["id"] = uuid.uuid4()
+        return row
+
+    async def get_all_presence_logs(
         self,
         user_id: Optional[str] = None,
         beacon_id: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[PresenceLog]:
-        """Get presence logs with optional filtering."""
-        query = self.db.query(PresenceLog)
+        """
+        Get presence logs with optional filtering.
+
+        Pass the cursor of the previous page to continue after its last row
+        with a keyset predicate instead of an offset.
+        """
+        query = self.build_presence_logs_query(
+            user_id=user_id,
+            beacon_id=beacon_id,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            offset=offset,
+            cursor_key=self.decode_cursor(cursor) if cursor else None
+        )
+        result = await self.db.scalars(query)
+        return list(result.all())
+
+    @classmethod
+    def build_presence_logs_query(
+        cls,
+        user_id: Optional[str] = None,
+        beacon_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100,
+        offset: int = 0,
+        cursor_key: Optional[Dict[str, Any]] = None
+    ) -> Select:
+        """Build the statement behind get_all_presence_logs (also used by the index benchmark)."""
+        query = select(PresenceLog)
         
         # Apply filters
         if user_id:
-            query = query.filter(PresenceLog.user_id == user_id)
+            query = query.where(PresenceLog.user_id == user_id)
         if beacon_id:
-            query = query.filter(PresenceLog.beacon_id == beacon_id)
+            query = query.where(PresenceLog.beacon_id == beacon_id)
+        start_date = to_local_naive(start_date)
+        end_date = to_local_naive(end_date)
         if start_date:
-            # Handle NULL timestamps by treating them as very old dates or excluding them
-            query = query.filter(
-                (PresenceLog.timestamp >= start_date) | 
-                (PresenceLog.timestamp.is_(None))
-            )
+            query = query.where(PresenceLog.timestamp >= start_date)
         if end_date:
-            # Handle NULL timestamps by treating them as very old dates or excluding them
-            query = query.filter(
-                (PresenceLog.timestamp < end_date) | 
-                (PresenceLog.timestamp.is_(None))
-            )
+            query = query.where(PresenceLog.timestamp < end_date)
         
-        # Order by timestamp (NULL values last) and created_at
-        # Use coalesce to handle NULL timestamps gracefully
-        query = query.order_by(
-            PresenceLog.timestamp.desc().nullslast(),
-            PresenceLog.created_at.desc()
-        )
+        if cursor_key:
+            query = query.where(cls._after_cursor(cursor_key))
         
-        # Apply pagination
-        query = query.offset(offset).limit(limit)
+        # Order by (timestamp, id) so that every row has a unique position for
+        # cursor pagination; the key matches the (user_id, timestamp DESC, id DESC)
+        # and (beacon_id, timestamp DESC, id DESC) indexes
+        query = query.order_by(PresenceLog.timestamp.desc(), PresenceLog.id.desc())
         
-        return query.all()
+        # Apply pagination
+        return query.offset(offset).limit(limit)
+
+    @staticmethod
+    def encode_cursor(presence_log: PresenceLog) -> str:
+        """Encode the sort key of a presence log as an opaque cursor."""
+        key = {
+            "t": presence_log.timestamp.isoformat(),
+            "id": str(presence_log.id)
+        }
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Dict[str, Any]:
+        """Decode a cursor produced by encode_cursor."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return {
+                "timestamp": datetime.fromisoformat(key["t"]),
+                "id": uuid.UUID(key["id"])
+            }
+        except (ValueError, TypeError, KeyError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    @staticmethod
+    def _after_cursor(key: Dict[str, Any]):
+        """
+        Build the row-value predicate for rows that sort after the cursor key
+        in (timestamp DESC, id DESC) order, which an index range scan can serve.
+        """
+        return tuple_(PresenceLog.timestamp, PresenceLog.id) < tuple_(
+            literal(key["timestamp"], PresenceLog.timestamp.type),
+            literal(key["id"], PresenceLog.id.type)
+        )
 
-    def get_presence_log_by_id(self, log_id: str) -> PresenceLog:
+    async def get_presence_log_by_id(self, log_id: str) -> PresenceLog:
         """Get presence log by ID."""
         try:
             log_uuid = uuid.UUID(log_id)
@@ -88,7 +263,7 @@ class PresenceService:
                 detail="Invalid UUID format"
             )
         
-        presence_log = self.db.query(PresenceLog).filter(PresenceLog.id == log_uuid).first()
+        presence_log = await self.db.scalar(select(PresenceLog).where(PresenceLog.id == log_uuid))
         if not presence_log:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -96,8 +271,11 @@ class PresenceService:
             )
         return presence_log
 
-    def delete_presence_log(self, log_id: str) -> None:
+    async def delete_presence_log(self, log_id: str) -> None:
         """Delete a presence log."""
-        presence_log = self.get_presence_log_by_id(log_id)
-        self.db.delete(presence_log)
-        self.db.commit()
+        presence_log = await self.get_presence_log_by_id(log_id)
+        await self.db.delete(presence_log)
+        await self.db.flush()
+        # The deleted log may have been the user's latest detection
+        await PresenceStateService(self.db).refresh_user(presence_log.user_id)
+        await self.db.commit()
@@ -0,0 +1,117 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Dict, Any
+from app.models.presence_log import PresenceLog
+from app.models.presence_state import PresenceState
+from app.core.local_time import to_local_naive
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Recompute every user's latest detection from presence_logs
+REBUILD_PRESENCE_STATE_SQL = """
+INSERT INTO presence_state (user_id, last_detected_at, beacon_id, updated_at)
+SELECT user_id, "timestamp", beacon_id, CURRENT_TIMESTAMP
+FROM (
+    SELECT user_id, "timestamp", beacon_id,
+           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY "timestamp" DESC, created_at DESC) AS position
+    FROM presence_logs
+    WHERE "timestamp" IS NOT NULL
+) AS latest
+WHERE position = 1
+"""
+
+
+class PresenceStateService:
+    """
+    Maintain presence_state, the latest detection of every user.
+
+    The absence queries read this table (one row per user) instead of
+    aggregating presence_logs. It is upserted in the same transaction as
+    every presence-log insert and only ever moves forward in time, so late
+    or out-of-order sightings never overwrite a newer detection.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def latest_by_user(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Reduce presence log rows to the newest one per user.
+
+        Timestamps are compared as naive local time, so rows with and
+        without an offset can be mixed.
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            timestamp = to_local_naive(row.get("timestamp"))
+            if timestamp is None:
+                continue
+            current = latest.get(row["user_id"])
+            if current is None or timestamp > current["last_detected_at"]:
+                latest[row["user_id"]] = {
+                    "user_id": row["user_id"],
+                    "last_detected_at": timestamp,
+                    "beacon_id": row.get("beacon_id")
+                }
+        return list(latest.values())
+
+    async def record_detections(self, rows: List[Dict[str, Any]]) -> None:
+        """Upsert the state of every user in rows. The caller owns the transaction."""
+        states = self.latest_by_user(rows)
+        if states:
+            await self.db.execute(self._upsert_statement(states, only_newer=True))
+
+    async def refresh_user(self, user_id: str) -> None:
+        """Recompute one user's state from presence_logs, e.g. after a delete."""
+        latest = (await self.db.execute(
+            select(PresenceLog.timestamp, PresenceLog.beacon_id)
+            .where(PresenceLog.user_id == user_id, PresenceLog.timestamp.is_not(None))
+            .order_by(PresenceLog.timestamp.desc())
+            .limit(1)
+        )).first()
+
+        if latest is None:
+            await self.db.execute(delete(PresenceState).where(PresenceState.user_id == user_id))
+            return
+
+        await self.db.execute(self._upsert_statement(
+            [{"user_id": user_id, "last_detected_at": latest[0], "beacon_id": latest[1]}],
+            only_newer=False
+        ))
+
+    def _upsert_statement(self, states: List[Dict[str, Any]], only_newer: bool):
+        dialect = self.db.bind.dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(PresenceState).values(states)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(PresenceState).values(states)
+        else:
+            raise RuntimeError(f"presence_state upserts are not supported on {dialect}")
+
+        return stmt.on_conflict_do_update(
+            index_elements=[PresenceState.user_id],
+            set_={
+                "last_detected_at": stmt.excluded.last_detected_at,
+                "beacon_id": stmt.excluded.beacon_id,
+                "updated_at": func.now()
+            },
+            where=(PresenceState.last_detected_at < stmt.excluded.last_detected_at) if only_newer else None
+        )
+
+
+def rebuild_presence_state(connection) -> int:
+    """
+    Rebuild presence_state from presence_logs on a sync connection.
+
+    On PostgreSQL the table is locked against concurrent upserts for the
+    duration of the rebuild; inserts wait and then apply on top of it.
+    Returns the number of users in the rebuilt table.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("LOCK TABLE presence_state IN EXCLUSIVE MODE"))
+    connection.execute(text("DELETE FROM presence_state"))
+    connection.execute(text(REBUILD_PRESENCE_STATE_SQL))
+    return connection.execute(text("SELECT count(*) FROM presence_state")).scalar()
@@ -0,0 +1,178 @@
+"""
+Benchmark for the presence-log indexes.
+
+Generates synthetic presence logs in a temporary copy of the presence_logs
+table, then prints EXPLAIN ANALYZE plans of the hot queries before and after
+creating the indexes added by alembic revisions 0002_presence_log_indexes and
+0008_presence_log_keyset_indexes. The history queries are the statements
+GET /v1/presence-logs emits (PresenceService.build_presence_logs_query), for
+the first page and for a page continued with a cursor. The TEMP table is
+named presence_logs, which shadows the real table for the session and is
+dropped with it, so the benchmark can be pointed at any PostgreSQL database
+without touching data.
+
+Usage:
+    python -m app.tools.benchmark_presence_indexes
+    python -m app.tools.benchmark_presence_indexes --rows 2000000 --users 5000
+"""
+
+import argparse
+import logging
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from app.database.session import engine
+from app.services.presence_service import PresenceService
+
+logger = logging.getLogger(__name__)
+
+# Temporary tables come first in the search path, so the unqualified
+# presence_logs of the API's statements resolves to the benchmark table
+BENCH_TABLE = "pg_temp.presence_logs"
+
+GENERATE_SQL = f"""
+INSERT INTO {BENCH_TABLE} (id, user_id, beacon_id, "timestamp", created_at)
+SELECT
+    gen_random_uuid(),
+    'user-' || (random() * :users)::int,
+    'beacon-' || (random() * :beacons)::int,
+    ts - (random() * interval '5 minutes'),
+    ts
+FROM (
+    SELECT now() - (:rows - g) * interval '1 second' AS ts
+    FROM generate_series(1, :rows) AS g
+) AS series
+"""
+
+INDEX_SQL = (
+    f'CREATE INDEX ON {BENCH_TABLE} (user_id, "timestamp" DESC, id DESC)',
+    f'CREATE INDEX ON {BENCH_TABLE} (beacon_id, "timestamp" DESC, id DESC)',
+    f"CREATE INDEX ON {BENCH_TABLE} USING brin (created_at)",
+)
+
+# Sort key of the row a cursor continues after, `depth` rows into the history
+CURSOR_KEY_SQL = f"""
+SELECT "timestamp", id FROM {BENCH_TABLE}
+WHERE {{column}} = :value
+ORDER BY "timestamp" DESC, id DESC
+OFFSET :depth LIMIT 1
+"""
+
+PAGE_SIZE = 100
+CURSOR_DEPTH = 100
+
+RECENT_INGESTION_SQL = f"""
+    SELECT count(*) FROM {BENCH_TABLE}
+    WHERE created_at >= now() - interval '1 hour'
+"""
+
+
+def cursor_key(connection, column: str, value: str) -> Optional[Dict[str, Any]]:
+    row = connection.execute(
+        text(CURSOR_KEY_SQL.format(column=column)),
+        {"value": value, "depth": CURSOR_DEPTH}
+    ).first()
+    return {"timestamp": row[0], "id": uuid.UUID(str(row[1]))} if row else None
+
+
+def render(connection, query) -> str:
+    """Render an API statement with its parameters inlined for EXPLAIN."""
+    return str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def build_queries(connection) -> Dict[str, str]:
+    """The hot queries, rendered exactly as the API builds them."""
+    now = datetime.now()
+    user_filters = {"user_id": "user-42", "start_date": now - timedelta(days=7), "end_date": now, "limit": PAGE_SIZE}
+    beacon_filters = {"beacon_id": "beacon-7", "start_date": now - timedelta(days=1), "end_date": now, "limit": PAGE_SIZE}
+    return {
+        "user history": render(connection, PresenceService.build_presence_logs_query(**user_filters)),
+        "user history cursor": render(connection, PresenceService.build_presence_logs_query(
+            **user_filters, cursor_key=cursor_key(connection, "user_id", "user-42")
+        )),
+        "beacon history": render(connection, PresenceService.build_presence_logs_query(**beacon_filters)),
+        "beacon history cursor": render(connection, PresenceService.build_presence_logs_query(
+            **beacon_filters, cursor_key=cursor_key(connection, "beacon_id", "beacon-7")
+        )),
+        "recent ingestion": RECENT_INGESTION_SQL,
+    }
+
+EXECUTION_TIME = re.compile(r"Execution Time: ([\d.]+) ms")
+
+
+def explain(connection, query: str) -> List[str]:
+    """Run EXPLAIN ANALYZE for a query and return the plan lines."""
+    # Sent verbatim; the inlined timestamps would otherwise be read as :binds
+    result = connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {query}")
+    return [row[0] for row in result]
+
+
+def execution_ms(plan: List[str]) -> Optional[float]:
+    for line in plan:
+        match = EXECUTION_TIME.search(line)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def run_queries(connection, queries: Dict[str, str], label: str) -> Dict[str, Optional[float]]:
+    timings = {}
+    for name, query in queries.items():
+        plan = explain(connection, query)
+        timings[name] = execution_ms(plan)
+        print(f"\n=== {name} ({label}) ===")
+        print("\n".join(plan))
+    return timings
+
+
+def run_benchmark(rows: int, users: int, beacons: int) -> None:
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("The index benchmark requires a PostgreSQL database")
+
+    with engine.connect() as connection:
+        connection.execute(text(
+            f"CREATE TEMP TABLE {BENCH_TABLE} "
+            f"(LIKE presence_logs INCLUDING DEFAULTS)"
+        ))
+        logger.info(f"Generating {rows} presence logs for {users} users and {beacons} beacons")
+        connection.execute(text(GENERATE_SQL), {"rows": rows, "users": users, "beacons": beacons})
+        connection.execute(text(f"ANALYZE {BENCH_TABLE}"))
+
+        queries = build_queries(connection)
+        before = run_queries(connection, queries, "without indexes")
+
+        logger.info("Creating composite and BRIN indexes")
+        for statement in INDEX_SQL:
+            connection.execute(text(statement))
+        connection.execute(text(f"ANALYZE {BENCH_TABLE}"))
+
+        after = run_queries(connection, queries, "with indexes")
+        connection.rollback()
+
+    print("\n=== Summary (execution time, ms) ===")
+    for name in queries:
+        print(f"{name:<22} before: {before[name]!s:>10}  after: {after[name]!s:>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare presence-log query plans before and after indexing.")
+    parser.add_argument("--rows", type=int, default=500000, help="Generated presence logs (default: 500000)")
+    parser.add_argument("--users", type=int, default=2000, help="Distinct user ids (default: 2000)")
+    parser.add_argument("--beacons", type=int, default=200, help="Distinct beacon ids (default: 200)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        run_benchmark(max(args.rows, 1), max(args.users, 1), max(args.beacons, 1))
+    except Exception as e:
+        logger.error(f"Benchmark failed: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
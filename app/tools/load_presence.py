@@ -0,0 +1,248 @@
+"""
+Bulk loader for historical presence logs.
+
+Streams a CSV or NDJSON device dump into the presence_logs table using
+PostgreSQL COPY FROM STDIN. The file is read and written in fixed-size
+chunks, so memory use does not depend on the size of the file. Every row is
+validated before it is copied; beacon_ids are checked against the set of
+known beacons, which is loaded once at startup.
+
+Expected fields (CSV header or NDJSON keys):
+    user_id, beacon_id, timestamp, latitude, longitude, signal_strength
+
+Usage:
+    python -m app.tools.load_presence dump.csv
+    python -m app.tools.load_presence dump.ndjson --chunk-size 50000
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Union
+from zoneinfo import ZoneInfo
+from app.core.local_time import LOCAL_TIMEZONE
+from app.database.session import engine
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("user_id", "beacon_id", "timestamp", "latitude", "longitude", "signal_strength")
+COPY_SQL = f"COPY presence_logs ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Rows copied in this transaction share created_at = now() (the transaction
+# start), so presence_state can be brought up to date from them alone
+UPDATE_STATE_SQL = """
+INSERT INTO presence_state (user_id, last_detected_at, beacon_id, updated_at)
+SELECT DISTINCT ON (user_id) user_id, "timestamp", beacon_id, now()
+FROM presence_logs
+WHERE created_at >= now()::timestamp
+ORDER BY user_id, "timestamp" DESC
+ON CONFLICT (user_id) DO UPDATE
+SET last_detected_at = EXCLUDED.last_detected_at, beacon_id = EXCLUDED.beacon_id, updated_at = now()
+WHERE presence_state.last_detected_at < EXCLUDED.last_detected_at
+"""
+
+
+@dataclass
+class LoadStats:
+    read: int = 0
+    loaded: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.loaded / self.seconds if self.seconds > 0 else 0.0
+
+
+def detect_format(path: str) -> str:
+    """Guess the input format from the file extension."""
+    if path.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def iter_records(handle, fmt: str) -> Iterator[Union[Dict[str, Any], str]]:
+    """
+    Yield one input record per row (CSV) or non-empty line (NDJSON) without
+    reading the whole file. NDJSON lines are yielded unparsed, so a malformed
+    line is rejected by parse_record like any other invalid record.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+    else:
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def parse_record(raw: Union[Dict[str, Any], str]) -> Dict[str, Any]:
+    """Turn a record from iter_records into a dict; raises ValueError for invalid JSON or non-objects."""
+    if isinstance(raw, dict):
+        return raw
+    record = json.loads(raw)
+    if not isinstance(record, dict):
+        raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+    return record
+
+
+def _optional(value: Any) -> Optional[Any]:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return value
+
+
+def normalize_record(
+    record: Dict[str, Any],
+    known_beacon_ids: Set[str],
+    timezone: ZoneInfo
+) -> Tuple:
+    """
+    Validate one input record and convert it to a COPY row.
+
+    Raises ValueError with the rejection reason for invalid records.
+    """
+    user_id = _optional(record.get("user_id"))
+    if user_id is None:
+        raise ValueError("missing user_id")
+
+    beacon_id = _optional(record.get("beacon_id"))
+    if beacon_id is not None and str(beacon_id) not in known_beacon_ids:
+        raise ValueError(f"unknown beacon_id '{beacon_id}'")
+
+    raw_timestamp = _optional(record.get("timestamp"))
+    if raw_timestamp is None:
+        raise ValueError("missing timestamp")
+    timestamp = datetime.fromisoformat(str(raw_timestamp).replace("Z", "+00:00"))
+    if timestamp.tzinfo is not None:
+        # presence_logs.timestamp has no time zone; store local wall-clock time
+        timestamp = timestamp.astimezone(timezone).replace(tzinfo=None)
+
+    latitude = _optional(record.get("latitude"))
+    longitude = _optional(record.get("longitude"))
+    signal_strength = _optional(record.get("signal_strength"))
+
+    return (
+        str(user_id),
+        str(beacon_id) if beacon_id is not None else None,
+        timestamp.isoformat(sep=" "),
+        float(latitude) if latitude is not None else None,
+        float(longitude) if longitude is not None else None,
+        int(signal_strength) if signal_strength is not None else None,
+    )
+
+
+def load_beacon_ids(cursor) -> Set[str]:
+    """Load the ids of all known beacons once."""
+    cursor.execute("SELECT beacon_id FROM beacons")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def copy_chunk(cursor, buffer: io.StringIO) -> None:
+    """Send one chunk of CSV rows to the server with COPY FROM STDIN."""
+    buffer.seek(0)
+    cursor.copy_expert(COPY_SQL, buffer)
+
+
+def load_presence(path: str, fmt: str, chunk_size: int, timezone: ZoneInfo) -> LoadStats:
+    """
+    Load a dump file into presence_logs in a single transaction.
+
+    Rows are copied chunk by chunk; presence_state is updated from the loaded
+    rows and the transaction is committed once at the end, so a failed load
+    leaves both tables unchanged.
+    """
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("The presence loader requires a PostgreSQL database (COPY FROM STDIN)")
+
+    stats = LoadStats()
+    started = time.perf_counter()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        known_beacon_ids = load_beacon_ids(cursor)
+        logger.info(f"Loaded {len(known_beacon_ids)} known beacon ids")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+
+        with open(path, newline="", encoding="utf-8") as handle:
+            for raw in iter_records(handle, fmt):
+                stats.read += 1
+                try:
+                    writer.writerow(normalize_record(parse_record(raw), known_beacon_ids, timezone))
+                except (ValueError, TypeError) as e:
+                    stats.rejected += 1
+                    logger.warning(f"Rejected record {stats.read}: {str(e)}")
+                    continue
+
+                pending += 1
+                if pending >= chunk_size:
+                    copy_chunk(cursor, buffer)
+                    stats.loaded += pending
+                    pending = 0
+                    buffer.seek(0)
+                    buffer.truncate()
+                    stats.seconds = time.perf_counter() - started
+                    logger.info(f"Copied {stats.loaded} rows ({stats.rows_per_second:,.0f} rows/s)")
+
+        if pending:
+            copy_chunk(cursor, buffer)
+            stats.loaded += pending
+
+        if stats.loaded:
+            cursor.execute(UPDATE_STATE_SQL)
+            logger.info(f"Updated presence_state for {cursor.rowcount} users")
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk load historical presence logs with COPY.")
+    parser.add_argument("path", help="CSV or NDJSON file to load")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Input format (default: from file extension)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per COPY chunk (default: 10000)")
+    parser.add_argument(
+        "--timezone",
+        default=LOCAL_TIMEZONE.key,
+        help=f"Zone used to store timestamps that carry an offset (default: DB_TIMEZONE, {LOCAL_TIMEZONE.key})"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        stats = load_presence(
+            args.path,
+            args.format or detect_format(args.path),
+            max(args.chunk_size, 1),
+            ZoneInfo(args.timezone)
+        )
+    except Exception as e:
+        logger.error(f"Load failed, no rows were committed: {str(e)}")
+        return 1
+
+    logger.info(
+        f"Done: {stats.read} read, {stats.loaded} loaded, {stats.rejected} rejected "
+        f"in {stats.seconds:.1f}s ({stats.rows_per_second:,.0f} rows/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
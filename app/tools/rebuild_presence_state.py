@@ -0,0 +1,43 @@
+"""
+Rebuild the presence_state table from presence_logs.
+
+presence_state holds the latest detection per user and is normally kept up
+to date by the API on every insert. Run this after restoring presence_logs,
+after bulk loads that bypassed the API, or whenever the table is suspected
+to be out of sync. The rebuild runs in one transaction; on PostgreSQL
+concurrent presence-log inserts wait for it to finish.
+
+Usage:
+    python -m app.tools.rebuild_presence_state
+"""
+
+import argparse
+import logging
+import sys
+import time
+from app.database.session import engine
+from app.services.presence_state_service import rebuild_presence_state
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild presence_state from presence_logs.")
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    started = time.perf_counter()
+    try:
+        with engine.begin() as connection:
+            users = rebuild_presence_state(connection)
+    except Exception as e:
+        logger.error(f"Rebuild failed, presence_state is unchanged: {str(e)}")
+        return 1
+
+    logger.info(f"Rebuilt presence_state for {users} users in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
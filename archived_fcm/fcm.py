@@ -1,5 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, Depends, HTTPException, status
 from app.schemas.fcm import (
     SendNotificationRequest,
     SendMultipleNotificationRequest,
@@ -11,21 +10,13 @@ from app.schemas.fcm import (
     TokenValidationResponse
 )
 from app.services.fcm_service import FCMService
-from app.core.security import verify_token
+from app.api.deps import get_current_user
 from app.models.user import User
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/fcm", tags=["FCM Notifications"])
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Security(security)
-):
-    """Dependency to get current authenticated user."""
-    return verify_token(credentials.credentials)
 
 
 @router.post("/send-notification", response_model=FCMResponse)
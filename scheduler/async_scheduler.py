@@ -0,0 +1,432 @@
+"""
+Era Beacon API Notification Scheduler (asyncio)
+
+Asynchronous variant of scheduler.py built on APScheduler's AsyncIOScheduler
+and one persistent httpx.AsyncClient, so every tick reuses kept-alive
+connections instead of opening a new TCP/TLS connection.
+
+Features:
+- Several absence jobs in one process (different thresholds, stores or
+  timezones), running concurrently: a slow API call only delays its own job
+- One login/refresh shared by all jobs
+- Per-job jitter and overlap protection (max one running instance per job)
+- Same authentication, business hours and partition maintenance behaviour
+  as scheduler.py
+
+Dependencies:
+- apscheduler>=3.10.0
+- httpx>=0.25.0
+
+Usage:
+    python async_scheduler.py
+
+Configuration:
+    Edit config.ini. Without [job:<name>] sections a single job is built from
+    the [scheduler] section. Each [job:<name>] section defines one job:
+
+        [job:jakarta]
+        threshold_minutes = 10
+        # Optional, default threshold_minutes
+        interval_minutes = 10
+        # Optional, all stores if omitted
+        store_id = ST001
+        # Optional, default local time
+        timezone = Asia/Jakarta
+        weekday_start_hour = 9
+        weekday_end_hour = 18
+        jitter_seconds = 30
+"""
+
+import asyncio
+import signal
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from zoneinfo import ZoneInfo
+import httpx
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+
+from scheduler import EraBeaconScheduler
+
+
+class AbsenceJob:
+    """One scheduled notify-absence call."""
+
+    def __init__(
+        self,
+        name: str,
+        threshold_minutes: int,
+        interval_minutes: int,
+        start_hour: int,
+        end_hour: int,
+        store_id: Optional[str] = None,
+        timezone: Optional[str] = None,
+        jitter_seconds: int = 0
+    ):
+        self.name = name
+        self.threshold_minutes = threshold_minutes
+        self.interval_minutes = interval_minutes
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.store_id = store_id
+        self.timezone = ZoneInfo(timezone) if timezone else None
+        self.jitter_seconds = jitter_seconds
+
+    def is_business_hours(self, now: Optional[datetime] = None) -> bool:
+        """Weekdays between start_hour and end_hour in the job's timezone."""
+        now = now or datetime.now(self.timezone)
+        if now.weekday() >= 5:  # Saturday=5, Sunday=6
+            return False
+        return self.start_hour <= now.hour < self.end_hour
+
+
+class AsyncEraBeaconScheduler(EraBeaconScheduler):
+    """
+    asyncio job scheduler for Era Beacon API absence notifications.
+
+    Uses the configuration, logging and token handling of
+    EraBeaconScheduler; the methods that do I/O are coroutines here.
+    """
+
+    def __init__(self, config_file: str = "config.ini"):
+        super().__init__(config_file)
+        self.scheduler = AsyncIOScheduler()
+        self.scheduler.add_listener(self._job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+        self.client: Optional[httpx.AsyncClient] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self.jobs = self._load_jobs()
+
+    def _load_jobs(self) -> List[AbsenceJob]:
+        """Build the absence jobs from [job:<name>] sections, or from [scheduler]."""
+        jobs = []
+        for section in self.config.sections():
+            if not section.startswith('job:'):
+                continue
+            threshold = self.config.getint(section, 'threshold_minutes')
+            jobs.append(AbsenceJob(
+                name=section[len('job:'):],
+                threshold_minutes=threshold,
+                interval_minutes=self.config.getint(section, 'interval_minutes', fallback=threshold),
+                start_hour=self.config.getint(section, 'weekday_start_hour', fallback=self.start_hour),
+                end_hour=self.config.getint(section, 'weekday_end_hour', fallback=self.end_hour),
+                store_id=self.config.get(section, 'store_id', fallback=None),
+                timezone=self.config.get(section, 'timezone', fallback=None),
+                jitter_seconds=self.config.getint(section, 'jitter_seconds', fallback=0)
+            ))
+
+        if not jobs:
+            jobs.append(AbsenceJob(
+                name='default',
+                threshold_minutes=self.threshold_minutes,
+                interval_minutes=self.threshold_minutes,
+                start_hour=self.start_hour,
+                end_hour=self.end_hour,
+                timezone=self.config.get('scheduler', 'timezone', fallback=None),
+                jitter_seconds=self.config.getint('scheduler', 'jitter_seconds', fallback=0)
+            ))
+        return jobs
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the persistent HTTP client (connections are kept alive between ticks)."""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(60, connect=10),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=600),
+                headers={"Content-Type": "application/json"}
+            )
+        return self.client
+
+    async def authenticate(self) -> bool:
+        """
+        Authenticate with the Era Beacon API and obtain access token.
+
+        Returns:
+            True if authentication successful, False otherwise
+        """
+        auth_msg = "Attempting to authenticate with Era Beacon API"
+        self.logger.info(auth_msg)
+        self._log_to_server(auth_msg)
+
+        try:
+            response = await self._get_client().post(
+                self.auth_url,
+                json={"username": self.username, "password": self.password},
+                timeout=30
+            )
+        except httpx.HTTPError as e:
+            error_msg = f"Authentication request failed: {e}"
+            self.logger.error(error_msg)
+            self._log_to_server(error_msg, 'ERROR')
+            return False
+
+        if response.status_code != 200 or not response.json().get("token"):
+            error_msg = f"Authentication failed: {response.status_code} - {response.text}"
+            self.logger.error(error_msg)
+            self._log_to_server(error_msg, 'ERROR')
+            return False
+
+        self._store_tokens(response.json())
+        success_msg = f"Authentication successful, token expires at {self.token_expires_at}"
+        self.logger.info(success_msg)
+        self._log_to_server(success_msg)
+        return True
+
+    async def refresh_access_token(self) -> bool:
+        """
+        Obtain a new access token with the refresh token.
+
+        Returns:
+            True if the token was refreshed, False otherwise
+        """
+        if not self.refresh_token:
+            return False
+
+        try:
+            response = await self._get_client().post(
+                self.refresh_url,
+                json={"refresh_token": self.refresh_token},
+                timeout=30
+            )
+        except httpx.HTTPError as e:
+            self.logger.warning(f"Token refresh request failed: {e}")
+            return False
+
+        if response.status_code != 200 or not response.json().get("token"):
+            # Refresh tokens are single use; fall back to a full login
+            self.logger.warning(f"Token refresh failed: {response.status_code}")
+            self.refresh_token = None
+            return False
+
+        self._store_tokens(response.json())
+        self.logger.info(f"Access token refreshed, expires at {self.token_expires_at}")
+        return True
+
+    async def ensure_token(self) -> bool:
+        """
+        Make sure a valid access token is available: keep the current one,
+        else refresh it, else log in again. Concurrent jobs share one attempt.
+
+        Returns:
+            True if a valid access token is available, False otherwise
+        """
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if self._is_token_valid():
+                return True
+            return await self.refresh_access_token() or await self.authenticate()
+
+    async def send_absence_notification(self, job: Optional[AbsenceJob] = None) -> Dict[str, Any]:
+        """
+        Send absence notification request to the API for one job.
+
+        Returns:
+            Dictionary containing the API response and status information
+        """
+        job = job or self.jobs[0]
+        if not job.is_business_hours():
+            self.logger.info(f"Job {job.name}: outside business hours, skipping notification")
+            return {
+                "success": False,
+                "message": "Outside business hours",
+                "skipped": True
+            }
+
+        if not await self.ensure_token():
+            return {
+                "success": False,
+                "message": "Authentication failed",
+                "error": "Could not obtain valid access token"
+            }
+
+        payload = {"threshold": job.threshold_minutes, "detail_level": "summary"}
+        if job.store_id:
+            payload["store_id"] = job.store_id
+
+        try:
+            self.logger.info(f"Job {job.name}: sending absence notification with payload {payload}")
+            response = await self._get_client().post(
+                self.notify_url,
+                json=payload,
+                headers={"Authorization": f"Bearer {self.access_token}"}
+            )
+        except httpx.HTTPError as e:
+            error_msg = f"Job {job.name}: notification request failed: {e}"
+            self.logger.error(error_msg)
+            self._log_to_server(error_msg, 'ERROR')
+            return {
+                "success": False,
+                "message": "Network request failed",
+                "error": str(e)
+            }
+
+        # 202 when the API queues the notifications in its outbox
+        if response.status_code in (200, 202):
+            data = response.json()
+            success_msg = (f"Job {job.name}: notification request completed - "
+                           f"sent {data.get('notifications_sent', data.get('total', 0))}, "
+                           f"failed {data.get('notifications_failed', 0)}")
+            self.logger.info(success_msg)
+            self._log_to_server(success_msg)
+            return {
+                "success": True,
+                "message": "Notification sent successfully",
+                "data": data
+            }
+
+        error_msg = f"Job {job.name}: notification request failed: {response.status_code} - {response.text}"
+        self.logger.error(error_msg)
+        self._log_to_server(error_msg, 'ERROR')
+        if response.status_code == 401:
+            self.access_token = None
+            self.token_expires_at = None
+        return {
+            "success": False,
+            "message": f"API request failed with status {response.status_code}",
+            "error": response.text
+        }
+
+    async def scheduled_job(self, job: AbsenceJob):
+        """Run one absence job; errors are logged and never stop the scheduler."""
+        try:
+            result = await self.send_absence_notification(job)
+            if not result.get("success") and not result.get("skipped"):
+                self.logger.warning(f"Job {job.name} failed: {result.get('message')}")
+        except Exception as e:
+            self.logger.error(f"Unexpected error in job {job.name}: {e}")
+
+    async def run_partition_maintenance(self) -> Dict[str, Any]:
+        """
+        Ask the API to pre-create upcoming presence_logs partitions and
+        detach or drop expired ones.
+
+        Returns:
+            Dictionary containing the API response and status information
+        """
+        if not await self.ensure_token():
+            return {
+                "success": False,
+                "message": "Authentication failed",
+                "error": "Could not obtain valid access token"
+            }
+
+        try:
+            response = await self._get_client().post(
+                self.partition_maintenance_url,
+                headers={
+                    "Authorization": f"Bearer {self.access_token}",
+                    "X-Maintenance-Key": self.maintenance_api_key
+                },
+                timeout=120
+            )
+        except httpx.HTTPError as e:
+            self.logger.error(f"Partition maintenance request failed: {e}")
+            return {
+                "success": False,
+                "message": "Network request failed",
+                "error": str(e)
+            }
+
+        if response.status_code == 200:
+            data = response.json()
+            self.logger.info(f"Partition maintenance: created {data.get('created', [])}, "
+                             f"detached {data.get('detached', [])}, dropped {data.get('dropped', [])}, "
+                             f"failed {data.get('failed', [])}, "
+                             f"{data.get('default_partition_rows', 0)} rows in the default partition")
+            return {"success": True, "message": "Partition maintenance completed", "data": data}
+
+        self.logger.error(f"Partition maintenance failed: {response.status_code} - {response.text}")
+        if response.status_code == 401:
+            self.access_token = None
+            self.token_expires_at = None
+        return {
+            "success": False,
+            "message": f"API request failed with status {response.status_code}",
+            "error": response.text
+        }
+
+    async def start(self):
+        """Schedule every job on the running event loop."""
+        self.logger.info(f"Starting Era Beacon Notification Scheduler (asyncio) with {len(self.jobs)} job(s)")
+
+        if not await self.ensure_token():
+            self.logger.error("Initial authentication failed, scheduler may not work properly")
+
+        for job in self.jobs:
+            self.scheduler.add_job(
+                func=self.scheduled_job,
+                args=[job],
+                trigger=IntervalTrigger(
+                    minutes=job.interval_minutes,
+                    timezone=job.timezone,
+                    jitter=job.jitter_seconds or None
+                ),
+                id=f'absence_notification_job:{job.name}',
+                name=f'Era Beacon Absence Notification ({job.name})',
+                misfire_grace_time=300,  # 5 minutes grace time for missed jobs
+                coalesce=True,  # Combine multiple missed jobs into one
+                max_instances=1  # Only one instance of the job can run at a time
+            )
+            self.logger.info(f"Job {job.name}: every {job.interval_minutes} minutes, threshold "
+                             f"{job.threshold_minutes} minutes, store {job.store_id or 'all'}, "
+                             f"{job.start_hour}:00-{job.end_hour}:00 weekdays")
+
+        if self.partition_maintenance_enabled:
+            self.scheduler.add_job(
+                func=self.run_partition_maintenance,
+                trigger=CronTrigger(hour=self.partition_maintenance_hour, minute=0),
+                id='partition_maintenance_job',
+                name='Era Beacon Presence Partition Maintenance',
+                misfire_grace_time=3600,
+                coalesce=True,
+                max_instances=1
+            )
+            self.logger.info(f"Partition maintenance scheduled daily at {self.partition_maintenance_hour}:00")
+
+        self.scheduler.start()
+
+    async def stop(self):
+        """Stop the scheduler and close pooled connections."""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self.client is not None:
+            await self.client.aclose()
+        self.logger.info("Scheduler stopped successfully")
+
+    async def run_once(self) -> List[Dict[str, Any]]:
+        """
+        Run every absence job once, concurrently (for testing purposes).
+
+        Returns:
+            The result of each job, in configuration order
+        """
+        try:
+            return await asyncio.gather(*(self.send_absence_notification(job) for job in self.jobs))
+        finally:
+            await self.stop()
+
+
+async def run():
+    """Run the scheduler until SIGINT or SIGTERM."""
+    scheduler = AsyncEraBeaconScheduler()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await scheduler.start()
+    try:
+        await stopping.wait()
+    finally:
+        await scheduler.stop()
+
+
+def main():
+    """Main entry point for the asyncio scheduler application."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
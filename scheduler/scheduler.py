@@ -32,6 +32,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 
 
@@ -55,11 +56,14 @@ class EraBeaconScheduler:
         self.logger = self._setup_logging()
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
+        self.refresh_token: Optional[str] = None
         
         # API endpoints
         self.base_url = self.config.get('scheduler', 'api_base_url')
         self.auth_url = f"{self.base_url}/auth/login"
+        self.refresh_url = f"{self.base_url}/auth/refresh"
         self.notify_url = f"{self.base_url}/notifications/notify-absence"
+        self.partition_maintenance_url = f"{self.base_url}/maintenance/presence-partitions"
         
         # Authentication credentials
         self.username = self.config.get('scheduler', 'auth_username')
@@ -70,6 +74,14 @@ class EraBeaconScheduler:
         self.start_hour = self.config.getint('scheduler', 'weekday_start_hour')
         self.end_hour = self.config.getint('scheduler', 'weekday_end_hour')
         
+        # Daily presence_logs partition maintenance (pre-create / expire partitions)
+        self.partition_maintenance_enabled = self.config.getboolean(
+            'scheduler', 'partition_maintenance_enabled', fallback=False
+        )
+        self.partition_maintenance_hour = self.config.getint('scheduler', 'partition_maintenance_hour', fallback=1)
+        # Sent as X-Maintenance-Key; must match the API's MAINTENANCE_API_KEY
+        self.maintenance_api_key = self.config.get('scheduler', 'maintenance_api_key', fallback='')
+        
         # Setup scheduler event listeners
         self.scheduler.add_listener(self._job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
         
@@ -245,9 +257,7 @@ class EraBeaconScheduler:
                     self._log_to_server(error_msg, 'ERROR')
                     return False
                 
-                # Set token expiration (assume 1 hour if not provided)
-                expires_in = auth_data.get("expires_in", 3600)  # Default 1 hour
-                self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+                self._store_tokens(auth_data)
                 
                 # Log partial token for debugging (first 10 and last 4 characters)
                 token_preview = f"{self.access_token[:10]}...{self.access_token[-4:]}" if len(self.access_token) > 14 else "***"
@@ -272,6 +282,58 @@ class EraBeaconScheduler:
             self._log_to_server(error_msg, 'ERROR')
             return False
             
+    def _store_tokens(self, auth_data: Dict[str, Any]):
+        """Keep the access token, its expiry and the rotated refresh token."""
+        self.access_token = auth_data.get("token")
+        # Set token expiration (assume 1 hour if not provided)
+        expires_in = auth_data.get("expires_in", 3600)  # Default 1 hour
+        self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+        self.refresh_token = auth_data.get("refresh_token")
+        
+    def refresh_access_token(self) -> bool:
+        """
+        Obtain a new access token with the refresh token, without sending
+        the password (the API does no bcrypt check on refresh).
+        
+        Returns:
+            True if the token was refreshed, False otherwise
+        """
+        if not self.refresh_token:
+            return False
+            
+        try:
+            response = requests.post(
+                self.refresh_url,
+                json={"refresh_token": self.refresh_token},
+                headers={"Content-Type": "application/json"},
+                timeout=30
+            )
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"Token refresh request failed: {e}")
+            return False
+            
+        if response.status_code != 200 or not response.json().get("token"):
+            # Refresh tokens are single use; fall back to a full login
+            self.logger.warning(f"Token refresh failed: {response.status_code}")
+            self.refresh_token = None
+            return False
+            
+        self._store_tokens(response.json())
+        self.logger.info(f"Access token refreshed, expires at {self.token_expires_at}")
+        return True
+        
+    def ensure_token(self) -> bool:
+        """
+        Make sure a valid access token is available: keep the current one,
+        else refresh it, else log in again.
+        
+        Returns:
+            True if a valid access token is available, False otherwise
+        """
+        if self._is_token_valid():
+            return True
+        return self.refresh_access_token() or self.authenticate()
+        
     def _is_token_valid(self) -> bool:
         """
         Check if the current access token is valid and not expired.
@@ -308,10 +370,10 @@ class EraBeaconScheduler:
             
         # Ensure we have a valid token
         if not self._is_token_valid():
-            reauth_msg = "Token invalid or expired, attempting to re-authenticate"
+            reauth_msg = "Token invalid or expired, attempting to refresh or re-authenticate"
             self.logger.info(reauth_msg)
             self._log_to_server(reauth_msg)
-            if not self.authenticate():
+            if not self.ensure_token():
                 return {
                     "success": False,
                     "message": "Authentication failed",
@@ -366,7 +428,7 @@ class EraBeaconScheduler:
                     for detail in notifications_detail:
                         employee_id = detail.get('employee_id', 'Unknown')
                         response_code = detail.get('response_code', 'Unknown')
-                        response_msg = detail.get('response_message', 'No message')
+                        response_msg = detail.get('response_message') or 'No message'
                         
                         detail_msg = f"Employee {employee_id}: HTTP {response_code} - {response_msg[:100]}{'...' if len(response_msg) > 100 else ''}"
                         self.logger.debug(detail_msg)
@@ -435,6 +497,61 @@ class EraBeaconScheduler:
         except Exception as e:
             self.logger.error(f"Unexpected error in scheduled job: {e}")
             
+    def run_partition_maintenance(self) -> Dict[str, Any]:
+        """
+        Ask the API to pre-create upcoming presence_logs partitions and
+        detach or drop expired ones.
+        
+        Returns:
+            Dictionary containing the API response and status information
+        """
+        if not self.ensure_token():
+            return {
+                "success": False,
+                "message": "Authentication failed",
+                "error": "Could not obtain valid access token"
+            }
+            
+        try:
+            response = requests.post(
+                self.partition_maintenance_url,
+                headers={
+                    "Authorization": f"Bearer {self.access_token}",
+                    "X-Maintenance-Key": self.maintenance_api_key
+                },
+                timeout=120
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                summary_msg = (f"Partition maintenance: created {data.get('created', [])}, "
+                               f"detached {data.get('detached', [])}, dropped {data.get('dropped', [])}, "
+                               f"failed {data.get('failed', [])}, "
+                               f"{data.get('default_partition_rows', 0)} rows in the default partition")
+                self.logger.info(summary_msg)
+                self._log_to_server(summary_msg)
+                return {"success": True, "message": "Partition maintenance completed", "data": data}
+                
+            error_msg = f"Partition maintenance failed: {response.status_code} - {response.text}"
+            self.logger.error(error_msg)
+            self._log_to_server(error_msg, 'ERROR')
+            if response.status_code == 401:
+                self.access_token = None
+                self.token_expires_at = None
+            return {
+                "success": False,
+                "message": f"API request failed with status {response.status_code}",
+                "error": response.text
+            }
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Partition maintenance request failed: {e}")
+            return {
+                "success": False,
+                "message": "Network request failed",
+                "error": str(e)
+            }
+            
     def start(self):
         """
         Start the scheduler with the configured job.
@@ -462,6 +579,18 @@ class EraBeaconScheduler:
             )
             
             self.logger.info(f"Job scheduled to run every {self.threshold_minutes} minutes")
+            
+            if self.partition_maintenance_enabled:
+                self.scheduler.add_job(
+                    func=self.run_partition_maintenance,
+                    trigger=CronTrigger(hour=self.partition_maintenance_hour, minute=0),
+                    id='partition_maintenance_job',
+                    name='Era Beacon Presence Partition Maintenance',
+                    misfire_grace_time=3600,
+                    coalesce=True,
+                    max_instances=1
+                )
+                self.logger.info(f"Partition maintenance scheduled daily at {self.partition_maintenance_hour}:00")
             self.logger.info("Scheduler started. Press Ctrl+C to stop.")
             
             # Start the scheduler (this will block)
@@ -7,7 +7,7 @@ including authentication, notification sending, and business hours validation.
 
 import unittest
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
 
@@ -146,6 +146,30 @@ file = test_scheduler.log
             self.assertTrue(result['success'])
             self.assertEqual(result['message'], 'Notification sent successfully')
             
+    @patch('scheduler.requests.post')
+    def test_partition_maintenance_success(self, mock_post):
+        """Test the daily partition maintenance request."""
+        self.scheduler.access_token = 'valid_token'
+        self.scheduler.token_expires_at = datetime.now() + timedelta(hours=1)
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'interval': 'month',
+            'created': ['presence_logs_p202701'],
+            'detached': [],
+            'dropped': [],
+            'partitions': ['presence_logs_p202701']
+        }
+        mock_post.return_value = mock_response
+        
+        result = self.scheduler.run_partition_maintenance()
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(mock_post.call_args[0][0], self.scheduler.partition_maintenance_url)
+        self.assertIn('X-Maintenance-Key', mock_post.call_args[1]['headers'])
+        self.assertFalse(self.scheduler.partition_maintenance_enabled)
+        
     def test_notification_outside_business_hours(self):
         """Test notification skipping outside business hours."""
         with patch.object(self.scheduler, '_is_business_hours', return_value=False):
@@ -175,6 +199,124 @@ file = test_scheduler.log
             self.assertIsNone(self.scheduler.access_token)  # Token should be cleared
 
 
+    @patch('scheduler.requests.post')
+    def test_expired_token_uses_refresh(self, mock_post):
+        """Test an expired access token is refreshed instead of logging in again."""
+        self.scheduler.access_token = 'expired_token'
+        self.scheduler.token_expires_at = datetime.now() - timedelta(minutes=1)
+        self.scheduler.refresh_token = 'refresh_token_1'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'token': 'new_token',
+            'refresh_token': 'refresh_token_2',
+            'expires_in': 1800
+        }
+        mock_post.return_value = mock_response
+        
+        self.assertTrue(self.scheduler.ensure_token())
+        self.assertEqual(mock_post.call_args[0][0], self.scheduler.refresh_url)
+        self.assertEqual(mock_post.call_args[1]['json'], {'refresh_token': 'refresh_token_1'})
+        self.assertEqual(self.scheduler.access_token, 'new_token')
+        self.assertEqual(self.scheduler.refresh_token, 'refresh_token_2')
+
+
+class TestAsyncEraBeaconScheduler(unittest.TestCase):
+    """Test cases for the asyncio AsyncEraBeaconScheduler class."""
+    
+    def setUp(self):
+        """Set up a config with two jobs."""
+        self.test_config = """
+[scheduler]
+threshold_minutes = 15
+api_base_url = https://era-beacon-api.onrender.com/v1
+auth_username = test_user
+auth_password = test_pass
+weekday_start_hour = 9
+weekday_end_hour = 17
+
+[job:slow-store]
+threshold_minutes = 10
+store_id = ST001
+timezone = Asia/Jakarta
+jitter_seconds = 30
+
+[job:fast-store]
+threshold_minutes = 20
+interval_minutes = 5
+store_id = ST002
+
+[logging]
+level = DEBUG
+format = %(asctime)s - %(name)s - %(levelname)s - %(message)s
+file = test_scheduler.log
+"""
+        
+        with open('test_async_config.ini', 'w') as f:
+            f.write(self.test_config)
+            
+        from async_scheduler import AsyncEraBeaconScheduler
+        self.scheduler = AsyncEraBeaconScheduler('test_async_config.ini')
+        
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists('test_async_config.ini'):
+            os.remove('test_async_config.ini')
+        if os.path.exists('test_scheduler.log'):
+            os.remove('test_scheduler.log')
+            
+    def test_jobs_loading(self):
+        """Test that each [job:<name>] section becomes a job."""
+        slow, fast = self.scheduler.jobs
+        self.assertEqual((slow.name, slow.threshold_minutes, slow.interval_minutes), ('slow-store', 10, 10))
+        self.assertEqual((slow.store_id, str(slow.timezone), slow.jitter_seconds), ('ST001', 'Asia/Jakarta', 30))
+        self.assertEqual((fast.name, fast.threshold_minutes, fast.interval_minutes), ('fast-store', 20, 5))
+        self.assertIsNone(fast.timezone)
+        self.assertEqual((fast.start_hour, fast.end_hour), (9, 17))
+        
+    def test_jobs_run_concurrently_with_one_login(self):
+        """Test that a slow job does not delay the other and both share one login."""
+        import asyncio
+        import json
+        import time
+        import httpx
+        
+        calls = []
+        
+        async def handler(request):
+            calls.append(request.url.path)
+            if request.url.path.endswith('/auth/login'):
+                return httpx.Response(200, json={'token': 'token_1', 'refresh_token': 'r1', 'expires_in': 1800})
+            body = json.loads(request.content)
+            if body['store_id'] == 'ST001':
+                await asyncio.sleep(0.3)
+            return httpx.Response(200, json={'success': True, 'notifications_sent': 1, 'notifications_failed': 0})
+            
+        self.scheduler.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        for job in self.scheduler.jobs:
+            job.is_business_hours = lambda now=None: True
+            
+        async def run_both():
+            finished = {}
+            
+            async def run(job):
+                await self.scheduler.send_absence_notification(job)
+                finished[job.name] = time.monotonic()
+                
+            start = time.monotonic()
+            await asyncio.gather(*(run(job) for job in self.scheduler.jobs))
+            await self.scheduler.stop()
+            return start, finished
+            
+        start, finished = asyncio.run(run_both())
+        
+        self.assertLess(finished['fast-store'] - start, 0.2)
+        self.assertGreaterEqual(finished['slow-store'] - start, 0.3)
+        self.assertEqual(calls.count('/v1/auth/login'), 1)
+        self.assertEqual(calls.count('/v1/notifications/notify-absence'), 2)
+
+
 class TestSchedulerIntegration:
     """
     Integration test class for manual testing with the actual API.
@@ -23,16 +23,27 @@ cleanup() {
 # Set up signal handlers for graceful shutdown
 trap cleanup SIGTERM SIGINT
 
-# Start the scheduler in the background
-echo "Starting Era Beacon API Scheduler in background..."
-cd scheduler
-python scheduler.py &
-SCHEDULER_PID=$!
-echo "Scheduler started with PID: $SCHEDULER_PID"
-cd ..
-
-# Give scheduler a moment to initialize
-sleep 5
+# Start the scheduler in the background, unless the API runs the jobs itself.
+# The flag is read through the API's settings, so a value in .env counts too.
+SCHEDULER_IN_PROCESS_ENABLED=$(python -c "from app.core.config import settings; print(str(settings.scheduler_in_process).lower())")
+if [ "$SCHEDULER_IN_PROCESS_ENABLED" = "true" ]; then
+    echo "SCHEDULER_IN_PROCESS is enabled - jobs run inside the API, not starting scheduler.py"
+else
+    echo "Starting Era Beacon API Scheduler in background..."
+    cd scheduler
+    # SCHEDULER_ASYNC=true runs the asyncio scheduler (several jobs, persistent connections)
+    if [ "${SCHEDULER_ASYNC,,}" = "true" ]; then
+        python async_scheduler.py &
+    else
+        python scheduler.py &
+    fi
+    SCHEDULER_PID=$!
+    echo "Scheduler started with PID: $SCHEDULER_PID"
+    cd ..
+
+    # Give scheduler a moment to initialize
+    sleep 5
+fi
 
 # Start the FastAPI application in the foreground
 echo "Starting FastAPI application..."
@@ -52,3 +52,125 @@ def test_login_invalid_credentials(test_client):
         json={"username": "nonexistent", "password": "wrongpassword"}
     )
     assert response.status_code == 401
+
+
+def test_token_cache_hits_and_expiry():
+    """Verified tokens are served from the cache until the TTL or the token's exp."""
+    import asyncio
+    import time
+    from datetime import timedelta
+    from unittest.mock import patch
+    from app.core.security import create_access_token, verify_token_cached
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_size=2, ttl_seconds=300)
+    token = create_access_token({"sub": "cached-user"}, expires_delta=timedelta(minutes=5))
+
+    def verify(token):
+        return asyncio.run(verify_token_cached(token, db=None))
+
+    with patch("app.core.security.token_cache", cache):
+        assert verify(token) == {"user_id": "cached-user"}
+        with patch("app.core.security.jwt.decode", side_effect=AssertionError("decoded again")):
+            assert verify(token) == {"user_id": "cached-user"}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+        # Never served past the token's own exp
+        with patch("app.core.token_cache.time.time", return_value=time.time() + 301):
+            assert cache.get(token) is None
+
+        for user_id in ("user-1", "user-2", "user-3"):
+            verify(create_access_token({"sub": user_id}))
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 2
+
+
+def test_token_cache_invalidation():
+    """Revoked tokens and users are dropped from the cache."""
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_size=10, ttl_seconds=300)
+    cache.put("token-a", {"user_id": "alice"})
+    cache.put("token-b", {"user_id": "alice"})
+    cache.put("token-c", {"user_id": "bob"})
+
+    cache.invalidate("token-c")
+    assert cache.get("token-c") is None
+    cache.invalidate_user("alice")
+    assert cache.get("token-a") is None
+    assert cache.get("token-b") is None
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_password_hasher_runs_off_loop_and_rejects_when_saturated():
+    """bcrypt runs on the hashing pool; beyond max_pending callers get 503 with Retry-After."""
+    import asyncio
+    import threading
+    from fastapi import HTTPException
+    from app.core.password_hasher import PasswordHasher
+
+    hasher = PasswordHasher(workers=1, max_pending=1, retry_after_seconds=7)
+
+    async def run():
+        hashed = await hasher.hash("secret-password")
+        assert await hasher.verify("secret-password", hashed)
+        assert not await hasher.verify("other-password", hashed)
+
+        release = threading.Event()
+        blocked = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await hasher.verify("secret-password", hashed)
+        release.set()
+        await blocked
+        return exc.value
+
+    try:
+        error = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "7"
+    stats = hasher.stats()
+    assert stats["rejected_total"] == 1
+    assert stats["pending"] == 0
+    assert stats["completed_total"] == 4
+
+
+def test_refresh_token_rotation_and_reuse(test_client):
+    """Refresh rotates tokens without bcrypt; reusing a rotated token revokes the family."""
+    from unittest.mock import patch
+
+    credentials = {"username": "refreshtest", "password": "testpassword123"}
+    response = test_client.post("/v1/auth/register", json=credentials)
+    if response.status_code == 409:
+        response = test_client.post("/v1/auth/login", json=credentials)
+    first = response.json()
+    assert first["refresh_token"]
+    assert first["expires_in"] == 30 * 60
+
+    with patch("app.services.auth_service.password_hasher.verify", side_effect=AssertionError("bcrypt used")):
+        response = test_client.post("/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == 200
+    second = response.json()
+    assert second["token"]
+    assert second["refresh_token"] != first["refresh_token"]
+
+    access_headers = {"Authorization": f"Bearer {second['token']}"}
+    assert test_client.get("/v1/beacons", headers=access_headers).status_code == 200
+
+    # The first token was rotated: reusing it fails and revokes the second one too
+    response = test_client.post("/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == 401
+    response = test_client.post("/v1/auth/refresh", json={"refresh_token": second["refresh_token"]})
+    assert response.status_code == 401
+
+    # Access tokens issued so far are revoked as well, not just dropped from the cache
+    response = test_client.get("/v1/beacons", headers=access_headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+    response = test_client.post("/v1/auth/refresh", json={"refresh_token": "not-a-token"})
+    assert response.status_code == 401
@@ -4,11 +4,11 @@ from tests.conftest import test_client
 
 def get_auth_headers(test_client):
     """Helper function to get authentication headers."""
-    # Register and login to get token
-    response = test_client.post(
-        "/v1/auth/register",
-        json={"username": "beacontest", "password": "testpassword123"}
-    )
+    # Register (or log in when already registered) to get token
+    credentials = {"username": "beacontest", "password": "testpassword123"}
+    response = test_client.post("/v1/auth/register", json=credentials)
+    if response.status_code == 409:
+        response = test_client.post("/v1/auth/login", json=credentials)
     token = response.json()["token"]
     return {"Authorization": f"Bearer {token}"}
 
@@ -144,3 +144,180 @@ def test_create_beacon_without_app_token(test_client):
     data = response.json()
     assert data["beacon_id"] == "TEST-BEACON-NO-TOKEN"
     assert data["app_token"] is None
+
+
+def test_beacon_registry_serves_reads_and_follows_writes(test_client):
+    """Beacon reads and ingest checks come from the registry; writes invalidate it."""
+    import asyncio
+    from unittest.mock import patch
+    from app.main import app
+    from app.database.session import get_db
+    from app.services.beacon_registry import BeaconRegistry
+    from app.services.presence_service import PresenceService
+
+    headers = get_auth_headers(test_client)
+    registry = BeaconRegistry(check_interval_seconds=3600)
+
+    with patch("app.services.beacon_service.beacon_registry", registry), \
+            patch("app.services.presence_service.beacon_registry", registry):
+        test_client.post(
+            "/v1/beacons",
+            json={"beacon_id": "TEST-BEACON-REGISTRY", "location_name": "Registry"},
+            headers=headers
+        )
+        response = test_client.get("/v1/beacons", headers=headers)
+        assert response.status_code == 200
+        assert "TEST-BEACON-REGISTRY" in [beacon["beacon_id"] for beacon in response.json()]
+        assert registry.stats()["reloads"] == 1
+
+        async def check_known_beacon():
+            async for db in app.dependency_overrides.get(get_db, get_db)():
+                with patch.object(db, "scalars", side_effect=AssertionError("queried")), \
+                        patch.object(db, "execute", side_effect=AssertionError("queried")):
+                    await PresenceService(db).ensure_beacon_exists("TEST-BEACON-REGISTRY")
+
+        asyncio.run(check_known_beacon())
+
+        response = test_client.put(
+            "/v1/beacons/TEST-BEACON-REGISTRY",
+            json={"location_name": "Registry Moved"},
+            headers=headers
+        )
+        assert response.status_code == 200
+        response = test_client.get("/v1/beacons", headers=headers)
+        locations = {beacon["beacon_id"]: beacon["location_name"] for beacon in response.json()}
+        assert locations["TEST-BEACON-REGISTRY"] == "Registry Moved"
+        assert registry.stats()["reloads"] == 2
+
+
+
+def test_get_all_beacons_etag(test_client):
+    """GET /v1/beacons answers 304 for a current ETag and a new ETag after a write."""
+    headers = get_auth_headers(test_client)
+    test_client.post(
+        "/v1/beacons",
+        json={"beacon_id": "TEST-BEACON-ETAG", "location_name": "ETag"},
+        headers=headers
+    )
+
+    response = test_client.get("/v1/beacons", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "TEST-BEACON-ETAG" in [beacon["beacon_id"] for beacon in response.json()]
+
+    response = test_client.get("/v1/beacons", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    test_client.put("/v1/beacons/TEST-BEACON-ETAG", json={"location_name": "ETag Moved"}, headers=headers)
+    response = test_client.get("/v1/beacons", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_bulk_upsert_beacons(test_client):
+    """PUT /v1/beacons:bulk creates new beacons, replaces existing ones and reports duplicates."""
+    headers = get_auth_headers(test_client)
+    test_client.post(
+        "/v1/beacons",
+        json={"beacon_id": "TEST-BULK-1", "location_name": "Old", "app_token": "old_token"},
+        headers=headers
+    )
+
+    response = test_client.put(
+        "/v1/beacons:bulk",
+        json=[
+            {"beacon_id": "TEST-BULK-1", "location_name": "New"},
+            {"beacon_id": "TEST-BULK-2", "location_name": "Second"},
+            {"beacon_id": "TEST-BULK-2", "location_name": "Second again"}
+        ],
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total"], data["succeeded"], data["failed"]) == (3, 2, 1)
+    assert [result["status"] for result in data["results"]] == ["updated", "created", None]
+    assert data["results"][2]["error"] == "Duplicate beacon_id in request"
+
+    beacon = test_client.get("/v1/beacons/TEST-BULK-1", headers=headers).json()
+    assert beacon["location_name"] == "New"
+    assert beacon["app_token"] is None
+    assert beacon["id"] == data["results"][0]["id"]
+
+    # Atomic requests with an invalid item write nothing
+    response = test_client.put(
+        "/v1/beacons:bulk?atomic=true",
+        json=[{"beacon_id": "TEST-BULK-3"}, {"beacon_id": "TEST-BULK-3"}],
+        headers=headers
+    )
+    assert response.status_code == 400
+    assert test_client.get("/v1/beacons/TEST-BULK-3", headers=headers).status_code == 404
+
+    response = test_client.put("/v1/beacons:bulk", json=[], headers=headers)
+    assert response.status_code == 400
+
+
+def test_bulk_delete_beacons(test_client):
+    """POST /v1/beacons:bulk-delete deletes known beacons; atomic requests fail on unknown ones."""
+    headers = get_auth_headers(test_client)
+    test_client.put(
+        "/v1/beacons:bulk",
+        json=[{"beacon_id": "TEST-BULK-DEL-1"}, {"beacon_id": "TEST-BULK-DEL-2"}],
+        headers=headers
+    )
+
+    response = test_client.post(
+        "/v1/beacons:bulk-delete?atomic=true",
+        json=["TEST-BULK-DEL-1", "TEST-BULK-DEL-UNKNOWN"],
+        headers=headers
+    )
+    assert response.status_code == 404
+    assert test_client.get("/v1/beacons/TEST-BULK-DEL-1", headers=headers).status_code == 200
+
+    response = test_client.post(
+        "/v1/beacons:bulk-delete",
+        json=["TEST-BULK-DEL-1", "TEST-BULK-DEL-2", "TEST-BULK-DEL-UNKNOWN"],
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["succeeded"], data["failed"]) == (2, 1)
+    assert [result["status"] for result in data["results"]] == ["deleted", "deleted", None]
+    assert test_client.get("/v1/beacons/TEST-BULK-DEL-2", headers=headers).status_code == 404
+
+
+def test_get_nearby_beacons(test_client):
+    """GET /v1/beacons/nearby returns beacons within the radius, nearest first."""
+    headers = get_auth_headers(test_client)
+    test_client.put(
+        "/v1/beacons:bulk",
+        json=[
+            {"beacon_id": "TEST-NEARBY-FAR", "latitude": -6.2100, "longitude": 106.8456},
+            {"beacon_id": "TEST-NEARBY-NEAR", "latitude": -6.2001, "longitude": 106.8456},
+            {"beacon_id": "TEST-NEARBY-OUT", "latitude": -6.3000, "longitude": 106.8456},
+            {"beacon_id": "TEST-NEARBY-NO-COORDS"}
+        ],
+        headers=headers
+    )
+
+    response = test_client.get(
+        "/v1/beacons/nearby",
+        params={"lat": -6.2, "lon": 106.8456, "radius_m": 2000},
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [beacon["beacon_id"] for beacon in data] == ["TEST-NEARBY-NEAR", "TEST-NEARBY-FAR"]
+    assert 10 < data[0]["distance_m"] < 12
+    assert 1100 < data[1]["distance_m"] < 1120
+
+    response = test_client.get(
+        "/v1/beacons/nearby",
+        params={"lat": -6.2, "lon": 106.8456, "radius_m": 2000, "limit": 1},
+        headers=headers
+    )
+    assert [beacon["beacon_id"] for beacon in response.json()] == ["TEST-NEARBY-NEAR"]
+
+    response = test_client.get("/v1/beacons/nearby", params={"lat": 91, "lon": 0}, headers=headers)
+    assert response.status_code == 422
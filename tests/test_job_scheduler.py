@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.job_scheduler import InProcessScheduler
+
+
+def fake_engine(dialect: str, lock_acquired: bool = True):
+    """Engine whose connections answer pg_try_advisory_lock with lock_acquired."""
+    conn = MagicMock()
+    conn.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=lock_acquired)))
+    conn.commit = AsyncMock()
+    conn.close = AsyncMock()
+    engine = MagicMock()
+    engine.dialect.name = dialect
+    engine.connect = AsyncMock(return_value=conn)
+    return engine, conn
+
+
+@asynccontextmanager
+async def fake_session():
+    yield MagicMock()
+
+
+def test_business_hours():
+    """Jobs only run on weekdays within the configured hours."""
+    scheduler = InProcessScheduler(engine=fake_engine("sqlite")[0])
+    assert scheduler.is_business_hours(datetime(2026, 10, 14, 10, 0))
+    assert not scheduler.is_business_hours(datetime(2026, 10, 14, 18, 0))
+    assert not scheduler.is_business_hours(datetime(2026, 10, 17, 10, 0))
+
+
+def test_absence_job_calls_service_directly():
+    """The absence job calls NotificationService without HTTP and records a summary."""
+    scheduler = InProcessScheduler(engine=fake_engine("sqlite")[0], session_factory=fake_session)
+    outcome = {
+        "success": True, "message": "Processed 2 employees", "total_employees": 2,
+        "notifications_sent": 2, "notifications_failed": 0, "notifications_skipped": 0,
+        "details": []
+    }
+
+    with patch.object(scheduler, "is_business_hours", return_value=True), \
+            patch("app.services.job_scheduler.NotificationService.notify_absence",
+                  AsyncMock(return_value=outcome)) as notify:
+        result = asyncio.run(scheduler.run_absence_job())
+
+    notify.assert_awaited_once_with(5, detail_level="none")
+    assert result["notifications_sent"] == 2
+    assert "details" not in result
+    assert scheduler.stats()["runs_total"] == 1
+
+
+def test_only_the_lock_holder_runs_jobs():
+    """On Postgres a process runs jobs only while it holds the advisory lock."""
+    engine, conn = fake_engine("postgresql", lock_acquired=False)
+    follower = InProcessScheduler(engine=engine, session_factory=fake_session)
+    with patch.object(follower, "is_business_hours", return_value=True), \
+            patch("app.services.job_scheduler.NotificationService.notify_absence", AsyncMock()) as notify:
+        assert asyncio.run(follower.run_absence_job()) is None
+    notify.assert_not_awaited()
+    conn.close.assert_awaited_once()
+    assert follower.skipped_not_leader == 1
+
+    engine, conn = fake_engine("postgresql", lock_acquired=True)
+    leader = InProcessScheduler(engine=engine)
+
+    async def elect():
+        assert await leader.acquire_leadership()
+        # Later ticks only check the lock connection is alive
+        assert await leader.acquire_leadership()
+        assert leader.is_leader
+        await leader.stop()
+
+    asyncio.run(elect())
+    assert engine.connect.await_count == 1
+    assert "pg_advisory_unlock" in str(conn.execute.await_args_list[-1].args[0])
+    conn.close.assert_awaited_once()
+    assert not leader.is_leader
+
+
+def test_refuses_to_start_behind_transaction_pooler():
+    """A session-level advisory lock cannot be held through a transaction pooler."""
+    import pytest
+    from app.core.config import settings
+
+    scheduler = InProcessScheduler(engine=fake_engine("postgresql")[0], session_factory=fake_session)
+    with patch.object(settings, "db_transaction_pooling", True):
+        with pytest.raises(RuntimeError):
+            asyncio.run(scheduler.start())
+    assert not scheduler.running
@@ -0,0 +1,109 @@
+from datetime import date
+from app.services.partition_service import PartitionService
+from tests.conftest import test_client
+
+
+def get_auth_headers(test_client):
+    """Helper function to get authentication headers."""
+    credentials = {"username": "maintenancetest", "password": "testpassword123"}
+    response = test_client.post("/v1/auth/register", json=credentials)
+    if response.status_code == 409:
+        response = test_client.post("/v1/auth/login", json=credentials)
+    token = response.json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_monthly_partition_ranges():
+    """Test monthly partition names and bounds, including the year boundary."""
+    service = PartitionService(db=None, interval="month")
+    partitions = service.upcoming_partitions(date(2026, 11, 17))
+
+    assert partitions[0] == ("presence_logs_p202611", date(2026, 11, 1), date(2026, 12, 1))
+    assert partitions[1] == ("presence_logs_p202612", date(2026, 12, 1), date(2027, 1, 1))
+    assert partitions[2][0] == "presence_logs_p202701"
+    assert service.partition_range("presence_logs_p202612") == (date(2026, 12, 1), date(2027, 1, 1))
+
+
+def test_daily_partition_ranges():
+    """Test daily partition names and bounds."""
+    service = PartitionService(db=None, interval="day")
+    name, start, end = service.upcoming_partitions(date(2026, 2, 28))[0]
+
+    assert name == "presence_logs_p20260228"
+    assert (start, end) == (date(2026, 2, 28), date(2026, 3, 1))
+    assert service.partition_range("presence_logs_p20260228") == (start, end)
+    assert service.partition_range("presence_logs_default") is None
+
+
+def test_partition_maintenance_requires_partitioned_table(test_client):
+    """Test that maintenance is refused when presence_logs is not partitioned."""
+    from unittest.mock import patch
+    from app.core.config import settings
+    headers = get_auth_headers(test_client)
+
+    with patch.object(settings, "maintenance_api_key", "maintenance-secret"):
+        response = test_client.post(
+            "/v1/maintenance/presence-partitions",
+            headers={**headers, "X-Maintenance-Key": "maintenance-secret"}
+        )
+    assert response.status_code == 409
+
+
+def test_partition_maintenance_requires_maintenance_key(test_client):
+    """Test that a user token alone cannot run partition maintenance."""
+    from unittest.mock import patch
+    from app.core.config import settings
+    headers = get_auth_headers(test_client)
+
+    with patch.object(settings, "maintenance_api_key", None):
+        response = test_client.post("/v1/maintenance/presence-partitions", headers=headers)
+    assert response.status_code == 404
+
+    with patch.object(settings, "maintenance_api_key", "maintenance-secret"):
+        response = test_client.post("/v1/maintenance/presence-partitions", headers=headers)
+        assert response.status_code == 403
+        response = test_client.post(
+            "/v1/maintenance/presence-partitions",
+            headers={**headers, "X-Maintenance-Key": "wrong"}
+        )
+        assert response.status_code == 403
+
+
+def test_partition_maintenance_unauthorized(test_client):
+    """Test partition maintenance without authentication."""
+    response = test_client.post("/v1/maintenance/presence-partitions")
+    assert response.status_code in (401, 403)
+
+
+def test_failed_partition_does_not_undo_the_others():
+    """Test that each partition is created in its own savepoint."""
+    import asyncio
+    from contextlib import asynccontextmanager
+
+    class FakeSession:
+        def __init__(self):
+            self.rolled_back = 0
+
+        @asynccontextmanager
+        async def begin_nested(self):
+            try:
+                yield
+            except Exception:
+                self.rolled_back += 1
+                raise
+
+    class FailingPartitionService(PartitionService):
+        async def list_partitions(self):
+            return []
+
+        async def create_partition(self, name, start, end):
+            if name == "presence_logs_p202612":
+                raise RuntimeError("updated partition constraint for default partition would be violated")
+
+    db = FakeSession()
+    service = FailingPartitionService(db=db, interval="month")
+    created, failed = asyncio.run(service.create_upcoming_partitions(date(2026, 11, 17)))
+
+    assert failed == ["presence_logs_p202612"]
+    assert "presence_logs_p202611" in created and "presence_logs_p202701" in created
+    assert db.rolled_back == 1
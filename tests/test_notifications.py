@@ -1,15 +1,32 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock, AsyncMock
 from tests.conftest import test_client
 
 
+@contextmanager
+def patch_notification_post():
+    """Patch the shared HTTP client used for push notifications; yields its post mock."""
+    from app.core.resilience import AdaptiveRateLimiter, CircuitBreaker
+    client = MagicMock()
+    client.post = AsyncMock()
+    # Fresh breaker and limiter so failures in one test do not trip the next
+    breaker = CircuitBreaker(name="test")
+    limiter = AdaptiveRateLimiter(rate=1000, min_rate=1, max_rate=1000, burst=1000)
+    with patch('app.services.notification_transport.get_http_client', return_value=client), \
+            patch('app.services.notification_transport.notification_breaker', breaker), \
+            patch('app.services.notification_outbox.notification_breaker', breaker), \
+            patch('app.services.notification_transport.notification_rate_limiter', limiter):
+        yield client.post
+
+
 def get_auth_headers(test_client):
     """Helper function to get authentication headers."""
-    # Register and login to get token
-    response = test_client.post(
-        "/v1/auth/register",
-        json={"username": "notifytest", "password": "testpassword123"}
-    )
+    # Register (or log in when already registered) to get token
+    credentials = {"username": "notifytest", "password": "testpassword123"}
+    response = test_client.post("/v1/auth/register", json=credentials)
+    if response.status_code == 409:
+        response = test_client.post("/v1/auth/login", json=credentials)
     token = response.json()["token"]
     return {"Authorization": f"Bearer {token}"}
 
@@ -29,8 +46,8 @@ def test_notify_to_qleap_success(test_client):
         headers=headers
     )
     
-    # Mock the requests.post call
-    with patch('app.services.notification_service.requests.post') as mock_post:
+    # Mock the async HTTP client call
+    with patch_notification_post() as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = "Success"
@@ -59,7 +76,7 @@ def test_notify_to_qleap_success(test_client):
         
         # Check the payload
         import json
-        payload = json.loads(call_args[1]["data"])
+        payload = json.loads(call_args[1]["content"])
         assert payload["token"] == "test_fcm_token_123"
         assert payload["title"] == "Eraspace Member is Detected!"
         assert payload["body"] == "Open Information"
@@ -129,8 +146,8 @@ def test_notify_to_qleap_multiple_tokens(test_client):
         headers=headers
     )
     
-    # Mock the requests.post call
-    with patch('app.services.notification_service.requests.post') as mock_post:
+    # Mock the async HTTP client call
+    with patch_notification_post() as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = "Success"
@@ -166,8 +183,8 @@ def test_notify_to_qleap_external_api_failure(test_client):
         headers=headers
     )
     
-    # Mock the requests.post call to fail
-    with patch('app.services.notification_service.requests.post') as mock_post:
+    # Mock the async HTTP client call to fail
+    with patch_notification_post() as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 500
         mock_response.text = "Internal Server Error"
@@ -199,3 +216,407 @@ def test_notify_to_qleap_unauthorized(test_client):
     )
     
     assert response.status_code == 401
+
+
+def test_notify_absence_sends_concurrently_in_order():
+    """Absence notifications run in parallel up to the limit and keep employee order."""
+    import asyncio
+    from app.services.notification_service import NotificationService
+    from app.core.config import settings
+
+    employees = [{"employee_id": f"EMP{i:03d}", "employee_token": f"token-{i}"} for i in range(6)]
+    in_flight = {"current": 0, "peak": 0}
+
+    async def fake_send(employee_token, employee_id):
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        # Later employees finish first
+        await asyncio.sleep(0.01 * (10 - int(employee_id[3:])))
+        in_flight["current"] -= 1
+        return {
+            "employee_id": employee_id,
+            "request_curl": f"curl {employee_token}",
+            "response_code": 200 if employee_id != "EMP002" else 500,
+            "response_message": "ok",
+            "success": employee_id != "EMP002"
+        }
+
+    async def fake_employees(threshold, store_id=None):
+        return employees
+
+    service = NotificationService(db=None)
+    with patch.object(settings, "notification_concurrency", 3), \
+            patch.object(settings, "notification_cooldown_minutes", 0), \
+            patch.object(service, "get_employees_exceeding_threshold", fake_employees), \
+            patch.object(service, "send_absence_notification", fake_send):
+        result = asyncio.run(service.notify_absence(30))
+
+    assert in_flight["peak"] == 3
+    assert [item["employee_id"] for item in result["notifications_detail"]] == [e["employee_id"] for e in employees]
+    assert result["notifications_sent"] == 5
+    assert result["notifications_failed"] == 1
+    assert result["notifications_detail"][2] == {
+        "employee_id": "EMP002",
+        "request_curl": "curl token-2",
+        "response_code": 500,
+        "response_message": "ok"
+    }
+
+
+def test_push_notifications_past_deadline_fail():
+    """Tokens still pending at the deadline are reported as failed without waiting for them."""
+    import asyncio
+    import json
+    import time
+    from app.services.notification_service import NotificationService
+    from app.core.config import settings
+
+    async def fake_post(url, content, headers, timeout):
+        token = json.loads(content)["token"]
+        if token == "slow":
+            await asyncio.sleep(5)
+        response = MagicMock()
+        response.status_code = 500 if token == "bad" else 200
+        response.text = "done"
+        return response
+
+    service = NotificationService(db=None)
+    with patch_notification_post() as mock_post, \
+            patch.object(settings, "notification_deadline_seconds", 0.2):
+        mock_post.side_effect = fake_post
+        started = time.monotonic()
+        results = asyncio.run(service._send_push_notifications(["fast", "slow", "bad", "fast"]))
+
+    assert results == [True, False, False, True]
+    assert time.monotonic() - started < 2
+
+
+def test_notification_outbox_enqueue_deliver_and_poll(test_client):
+    """Outbox mode queues a job (202), workers deliver it with retries and the job can be polled."""
+    import asyncio
+    from contextlib import asynccontextmanager
+    from app.main import app
+    from app.core.config import settings
+    from app.database.session import get_db
+    from app.services.notification_outbox import NotificationOutboxWorker
+
+    headers = get_auth_headers(test_client)
+    test_client.post(
+        "/v1/beacons",
+        json={
+            "beacon_id": "OUTBOX-BEACON",
+            "location_name": "Outbox Location",
+            "app_token": "outbox_token"
+        },
+        headers=headers
+    )
+
+    with patch.object(settings, "notification_outbox_enabled", True), patch_notification_post() as mock_post:
+        response = test_client.post(
+            "/v1/notifications/notify-to-qleap",
+            json={"email": "test@example.com", "phone": "+1234567890", "beacon_id": "OUTBOX-BEACON"},
+            headers=headers
+        )
+        # Nothing is delivered inside the request
+        mock_post.assert_not_called()
+
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "qleap"
+    assert job["status"] == "pending"
+    assert job["total"] == 1
+    assert job["items"][0]["attempts"] == 0
+
+    @asynccontextmanager
+    async def api_session():
+        async for db in app.dependency_overrides.get(get_db, get_db)():
+            yield db
+
+    unavailable = MagicMock(status_code=503, text="Service Unavailable")
+    delivered = MagicMock(status_code=200, text="Success")
+    worker = NotificationOutboxWorker(
+        workers=1, batch_size=10, poll_interval_ms=10, lease_seconds=60, session_factory=api_session
+    )
+
+    with patch_notification_post() as mock_post, \
+            patch.object(settings, "notification_outbox_backoff_base_seconds", 0):
+        mock_post.side_effect = [unavailable, delivered]
+        assert asyncio.run(worker.process_batch()) == 1
+        retry = test_client.get(f"/v1/notifications/jobs/{job['job_id']}", headers=headers).json()
+        assert asyncio.run(worker.process_batch()) == 1
+        assert asyncio.run(worker.process_batch()) == 0
+
+    assert retry["status"] == "running"
+    assert retry["items"][0]["status"] == "pending"
+    assert retry["items"][0]["response_code"] == 503
+
+    done = test_client.get(f"/v1/notifications/jobs/{job['job_id']}", headers=headers).json()
+    assert done["status"] == "completed"
+    assert done["sent"] == 1
+    assert done["items"][0]["attempts"] == 2
+    assert worker.stats()["retried_total"] == 1
+    assert worker.stats()["sent_total"] == 1
+
+
+def test_notification_outbox_breaker_rejections_keep_attempts(test_client):
+    """A half-open breaker limits the claim to its probe slots, and breaker-rejected rows keep their attempts."""
+    import asyncio
+    from contextlib import asynccontextmanager
+    from app.main import app
+    from app.database.session import get_db
+    from app.core.resilience import CircuitBreakerOpen
+    from app.services import notification_outbox
+    from app.services.notification_outbox import NotificationOutboxService, NotificationOutboxWorker
+
+    headers = get_auth_headers(test_client)
+
+    @asynccontextmanager
+    async def api_session():
+        async for db in app.dependency_overrides.get(get_db, get_db)():
+            yield db
+
+    async def enqueue():
+        async with api_session() as db:
+            job = await NotificationOutboxService(db).enqueue(
+                "qleap", [{"payload": {"to": f"token-{i}"}} for i in range(3)]
+            )
+            await db.commit()
+            return job.id
+
+    job_id = asyncio.run(enqueue())
+    worker = NotificationOutboxWorker(
+        workers=1, batch_size=10, poll_interval_ms=10, lease_seconds=60, session_factory=api_session
+    )
+    delivered = MagicMock(status_code=200, text="Success")
+
+    with patch_notification_post() as mock_post:
+        breaker = notification_outbox.notification_breaker
+        breaker._open()
+        # Open: nothing is claimed
+        assert asyncio.run(worker.process_batch()) == 0
+
+        # Half-open with one probe slot: only one row is claimed
+        breaker.open_seconds = 0
+        mock_post.return_value = delivered
+        assert asyncio.run(worker.process_batch()) == 1
+        assert breaker.state == breaker.CLOSED
+
+        # The breaker rejects the rest of the batch without a request being sent
+        with patch.object(notification_outbox, "post_notification", AsyncMock(side_effect=CircuitBreakerOpen("open"))):
+            assert asyncio.run(worker.process_batch()) == 2
+
+    job = test_client.get(f"/v1/notifications/jobs/{job_id}", headers=headers).json()
+    assert job["sent"] == 1
+    assert job["pending"] == 2
+    assert sorted(item["attempts"] for item in job["items"]) == [0, 0, 1]
+    assert worker.stats()["released_total"] == 2
+    assert worker.stats()["failed_total"] == 0
+
+    # Released rows are due again right away
+    with patch_notification_post() as mock_post:
+        mock_post.return_value = delivered
+        assert asyncio.run(worker.process_batch()) == 2
+    job = test_client.get(f"/v1/notifications/jobs/{job_id}", headers=headers).json()
+    assert job["status"] == "completed"
+    assert [item["attempts"] for item in job["items"]] == [1, 1, 1]
+
+
+def test_outbox_absence_cooldown_starts_on_delivery(test_client):
+    """Queued absence notifications are not queued twice, and only delivered ones start the cooldown."""
+    import asyncio
+    from contextlib import asynccontextmanager
+    from app.main import app
+    from app.database.session import get_db
+    from app.services.notification_service import NotificationService
+    from app.services.notification_cooldown import cooldown_cache
+    from app.services.notification_outbox import NotificationOutboxWorker
+
+    employees = [{"employee_id": f"QCOOL{i:03d}", "employee_token": f"token-{i}"} for i in range(2)]
+
+    @asynccontextmanager
+    async def api_session():
+        async for db in app.dependency_overrides.get(get_db, get_db)():
+            yield db
+
+    async def fake_employees(threshold, store_id=None):
+        return employees
+
+    async def enqueue():
+        async with api_session() as db:
+            service = NotificationService(db)
+            with patch.object(service, "get_employees_exceeding_threshold", fake_employees):
+                return await service.enqueue_notify_absence(5)
+
+    first = asyncio.run(enqueue())
+    # Both are still queued, so nothing is queued again
+    assert first.total == 2
+    assert asyncio.run(enqueue()).total == 0
+
+    worker = NotificationOutboxWorker(
+        workers=1, batch_size=10, poll_interval_ms=10, lease_seconds=60, session_factory=api_session
+    )
+    delivered = MagicMock(status_code=200, text="Success")
+    rejected = MagicMock(status_code=400, text="Bad token")
+
+    async def post(url, content, **kwargs):
+        return rejected if "QCOOL001" in content else delivered
+
+    with patch_notification_post() as mock_post:
+        mock_post.side_effect = post
+        assert asyncio.run(worker.process_batch()) == 2
+    assert worker.stats()["sent_total"] == 1
+    assert worker.stats()["failed_total"] == 1
+
+    # Cold in-process cache: the cooldown must come from the table
+    cooldown_cache.clear()
+    third = asyncio.run(enqueue())
+    assert [item.employee_id for item in third.items] == ["QCOOL001"]
+
+
+def test_notification_job_not_found(test_client):
+    """Test polling an unknown notification job."""
+    import uuid
+    headers = get_auth_headers(test_client)
+    response = test_client.get(f"/v1/notifications/jobs/{uuid.uuid4()}", headers=headers)
+    assert response.status_code == 404
+
+
+def test_notify_absence_skips_employees_in_cooldown():
+    """Employees notified within the cooldown window are skipped and reported separately."""
+    import asyncio
+    from app.main import app
+    from app.database.session import get_db
+    from app.services.notification_service import NotificationService
+    from app.services.notification_cooldown import cooldown_cache
+
+    employees = [{"employee_id": f"COOL{i:03d}", "employee_token": f"token-{i}"} for i in range(3)]
+
+    async def fake_employees(threshold, store_id=None):
+        return employees
+
+    async def fake_send(employee_token, employee_id):
+        success = employee_id != "COOL002"
+        return {
+            "employee_id": employee_id,
+            "request_curl": "curl",
+            "response_code": 200 if success else 500,
+            "response_message": "done",
+            "success": success
+        }
+
+    async def run():
+        async for db in app.dependency_overrides.get(get_db, get_db)():
+            service = NotificationService(db)
+            with patch.object(service, "get_employees_exceeding_threshold", fake_employees), \
+                    patch.object(service, "send_absence_notification", AsyncMock(side_effect=fake_send)) as mock_send:
+                first = await service.notify_absence(5)
+                # Cold in-process cache: the cooldown must come from the table
+                cooldown_cache.clear()
+                second = await service.notify_absence(5)
+                return first, second, mock_send.await_count
+
+    first, second, sends = asyncio.run(run())
+
+    assert first["notifications_sent"] == 2
+    assert first["notifications_skipped"] == 0
+    # Only the failed notification is retried
+    assert second["total_employees"] == 3
+    assert second["notifications_skipped"] == 2
+    assert second["skipped_employee_ids"] == ["COOL000", "COOL001"]
+    assert [item["employee_id"] for item in second["notifications_detail"]] == ["COOL002"]
+    assert sends == 4
+
+
+def test_push_notifications_fail_fast_when_breaker_open():
+    """No request is made while the notification circuit breaker is open."""
+    import asyncio
+    from app.services.notification_service import NotificationService
+    from app.services import notification_transport
+
+    service = NotificationService(db=None)
+    with patch_notification_post() as mock_post:
+        notification_transport.notification_breaker._open()
+        results = asyncio.run(service._send_push_notifications(["token-a", "token-b"]))
+        stats = notification_transport.get_transport_stats()
+
+    assert results == [False, False]
+    mock_post.assert_not_called()
+    assert stats["circuit_breaker"]["state"] == "open"
+    assert stats["circuit_breaker"]["rejected_total"] == 2
+
+
+def test_notify_absence_detail_levels():
+    """detail_level controls notifications_detail; curl is only built when debugging."""
+    import asyncio
+    from app.services.notification_service import NotificationService
+    from app.core.config import settings
+
+    employees = [{"employee_id": f"LVL{i:03d}", "employee_token": f"token-{i}"} for i in range(3)]
+
+    async def fake_employees(threshold, store_id=None):
+        return employees
+
+    def fake_post(url, content, headers, timeout):
+        failed = "token-1" in content
+        return MagicMock(status_code=500 if failed else 200, text="x" * 50 if failed else "ok")
+
+    service = NotificationService(db=None)
+    results = {}
+    with patch.object(settings, "notification_cooldown_minutes", 0), \
+            patch.object(settings, "notification_response_max_chars", 10), \
+            patch.object(service, "get_employees_exceeding_threshold", fake_employees), \
+            patch_notification_post() as mock_post:
+        mock_post.side_effect = fake_post
+        for level in ("none", "summary", "failures", "full"):
+            results[level] = asyncio.run(service.notify_absence(30, level))
+        with patch.object(settings, "debug", True):
+            debug = asyncio.run(service.notify_absence(30, "failures"))
+
+    for result in results.values():
+        assert result["notifications_sent"] == 2
+        assert result["notifications_failed"] == 1
+    assert results["none"]["notifications_detail"] == []
+    assert results["summary"]["notifications_detail"] == [
+        {"employee_id": f"LVL{i:03d}", "response_code": 500 if i == 1 else 200} for i in range(3)
+    ]
+    assert results["failures"]["notifications_detail"] == [{
+        "employee_id": "LVL001",
+        "request_curl": None,
+        "response_code": 500,
+        "response_message": "xxxxxxxxxx... [truncated 40 chars]"
+    }]
+    assert len(results["full"]["notifications_detail"]) == 3
+    assert debug["notifications_detail"][0]["request_curl"].startswith("curl -X POST")
+
+
+def test_absence_query_reads_roster_refreshed_at_most_once_per_interval():
+    """The absence query reads no presence logs; the roster behind it is refreshed at most once per interval."""
+    import asyncio
+    from types import SimpleNamespace
+    from app.core.config import settings
+    from app.services.notification_service import ABSENT_EMPLOYEES_QUERY
+    from app.services.employee_roster_service import EmployeeRosterService
+
+    assert "employee_roster" in ABSENT_EMPLOYEES_QUERY.text
+    assert "presence_logs" not in ABSENT_EMPLOYEES_QUERY.text
+    assert "v_presence_tracking" not in ABSENT_EMPLOYEES_QUERY.text
+
+    db = MagicMock()
+    db.bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+
+    async def run():
+        service = EmployeeRosterService(db)
+        return [await service.refresh_if_stale() for _ in range(3)]
+
+    with patch.object(EmployeeRosterService, "_refreshed_at", None), \
+            patch.object(settings, "employee_roster_refresh_minutes", 60):
+        assert asyncio.run(run()) == [True, False, False]
+    assert db.execute.await_count == 1
+    assert "REFRESH MATERIALIZED VIEW CONCURRENTLY employee_roster" in str(db.execute.await_args.args[0])
+
+    with patch.object(EmployeeRosterService, "_refreshed_at", None), \
+            patch.object(settings, "employee_roster_refresh_minutes", 0):
+        assert asyncio.run(run()) == [False, False, False]
+    assert db.execute.await_count == 1
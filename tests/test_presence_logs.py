@@ -0,0 +1,345 @@
+import pytest
+import uuid
+from datetime import datetime
+from app.main import app
+from app.database.session import get_db
+from app.models.presence_log import PresenceLog
+from app.models.presence_state import PresenceState
+from tests.conftest import test_client
+
+
+def get_auth_headers(test_client):
+    """Helper function to get authentication headers."""
+    credentials = {"username": "presencetest", "password": "testpassword123"}
+    response = test_client.post("/v1/auth/register", json=credentials)
+    if response.status_code == 409:
+        response = test_client.post("/v1/auth/login", json=credentials)
+    token = response.json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_beacon(test_client, headers, beacon_id):
+    """Helper function to make sure a beacon exists."""
+    test_client.post(
+        "/v1/beacons",
+        json={"beacon_id": beacon_id, "location_name": "Presence Test Location"},
+        headers=headers
+    )
+
+
+def test_create_presence_logs_batch(test_client):
+    """Test creating a batch of presence logs with one unknown beacon."""
+    headers = get_auth_headers(test_client)
+    create_beacon(test_client, headers, "TEST-BEACON-BATCH")
+
+    response = test_client.post(
+        "/v1/presence-logs/batch",
+        json=[
+            {"user_id": "batch-user", "beacon_id": "TEST-BEACON-BATCH", "signal_strength": -70},
+            {"user_id": "batch-user", "beacon_id": "UNKNOWN-BEACON-BATCH"},
+            {"user_id": "batch-user", "beacon_id": "TEST-BEACON-BATCH", "timestamp": "2024-01-15T14:30:00"}
+        ],
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert [result["success"] for result in data["results"]] == [True, False, True]
+    assert data["results"][1]["error"] == "Beacon with provided beacon_id not found"
+
+    created_id = data["results"][0]["id"]
+    response = test_client.get(f"/v1/presence-logs/{created_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["beacon_id"] == "TEST-BEACON-BATCH"
+
+
+def test_create_presence_log_with_utc_timestamp(test_client):
+    """Test that offset timestamps are stored as naive Asia/Jakarta time (DB_TIMEZONE)."""
+    from app.core.config import settings
+    from app.core.local_time import LOCAL_TIMEZONE
+
+    assert LOCAL_TIMEZONE.key == settings.db_timezone == "Asia/Jakarta"
+    headers = get_auth_headers(test_client)
+    create_beacon(test_client, headers, "TEST-BEACON-UTC")
+
+    response = test_client.post(
+        "/v1/presence-logs",
+        json={"user_id": "utc-user", "beacon_id": "TEST-BEACON-UTC", "timestamp": "2024-01-15T14:30:00Z"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    assert response.json()["timestamp"] == "2024-01-15T21:30:00"
+
+    response = test_client.get(
+        "/v1/presence-logs",
+        params={"user_id": "utc-user", "start_date": "2024-01-15T14:00:00Z", "end_date": "2024-01-15T15:00:00Z"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert [log["timestamp"] for log in response.json()] == ["2024-01-15T21:30:00"]
+
+
+def test_create_presence_logs_batch_empty(test_client):
+    """Test that an empty batch is rejected."""
+    headers = get_auth_headers(test_client)
+
+    response = test_client.post("/v1/presence-logs/batch", json=[], headers=headers)
+    assert response.status_code == 400
+
+
+def test_create_presence_logs_batch_unauthorized(test_client):
+    """Test batch endpoint without authentication."""
+    response = test_client.post(
+        "/v1/presence-logs/batch",
+        json=[{"user_id": "batch-user"}]
+    )
+    assert response.status_code in (401, 403)
+
+
+def test_create_presence_log_buffered_disabled(test_client):
+    """Test that buffered ingestion is rejected when the buffer is not running."""
+    headers = get_auth_headers(test_client)
+
+    response = test_client.post(
+        "/v1/presence-logs/buffered",
+        json={"user_id": "buffered-user"},
+        headers=headers
+    )
+    assert response.status_code == 503
+
+
+def test_presence_write_buffer_groups_and_drains():
+    """Test that the write buffer flushes rows in groups and drains on stop."""
+    import asyncio
+    from app.services.presence_buffer import PresenceWriteBuffer
+
+    class RecordingBuffer(PresenceWriteBuffer):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.groups = []
+
+        async def _write_rows(self, rows):
+            self.groups.append(list(rows))
+
+    async def run():
+        buffer = RecordingBuffer(max_size=3, flush_size=2, flush_interval_ms=10_000)
+        await buffer.start()
+        accepted = [buffer.enqueue({"user_id": f"user-{i}"}) for i in range(4)]
+        await buffer.stop()
+        return buffer, accepted
+
+    buffer, accepted = asyncio.run(run())
+    assert accepted == [True, True, True, False]
+    assert [len(group) for group in buffer.groups] == [2, 1]
+    stats = buffer.stats()
+    assert stats["rejected_total"] == 1
+    assert stats["flushed_rows_total"] == 3
+    assert stats["queue_depth"] == 0
+
+
+def test_presence_write_buffer_drops_only_bad_rows():
+    """Test that a failing flush is retried in smaller groups so only bad rows are lost."""
+    import asyncio
+    from app.services.presence_buffer import PresenceWriteBuffer
+
+    class FailingBuffer(PresenceWriteBuffer):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.written = []
+
+        async def _write_rows(self, rows):
+            if any(row["user_id"] == "bad" for row in rows):
+                raise ValueError("bad row")
+            self.written.extend(rows)
+
+    async def run():
+        buffer = FailingBuffer(max_size=10, flush_size=5, flush_interval_ms=10_000, flush_retries=0)
+        await buffer.start()
+        for user_id in ["user-0", "user-1", "bad", "user-3", "user-4"]:
+            buffer.enqueue({"id": user_id, "user_id": user_id})
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert sorted(row["user_id"] for row in buffer.written) == ["user-0", "user-1", "user-3", "user-4"]
+    stats = buffer.stats()
+    assert stats["failed_rows_total"] == 1
+    assert stats["flushed_rows_total"] == 4
+
+
+def add_presence_logs(presence_logs):
+    """Helper function to store logs through the session the API uses."""
+    import asyncio
+
+    async def run():
+        async for db in app.dependency_overrides.get(get_db, get_db)():
+            db.add_all(presence_logs)
+            await db.commit()
+
+    asyncio.run(run())
+
+
+def get_presence_state(user_id):
+    """Helper function to read a user's presence_state row through the API's session."""
+    import asyncio
+
+    async def run():
+        async for db in app.dependency_overrides.get(get_db, get_db)():
+            return await db.get(PresenceState, user_id)
+
+    return asyncio.run(run())
+
+
+def test_presence_state_tracks_latest_detection(test_client):
+    """Test that single and batch inserts keep the newest detection per user."""
+    headers = get_auth_headers(test_client)
+    create_beacon(test_client, headers, "TEST-BEACON-STATE-1")
+    create_beacon(test_client, headers, "TEST-BEACON-STATE-2")
+
+    response = test_client.post(
+        "/v1/presence-logs",
+        json={"user_id": "state-user", "beacon_id": "TEST-BEACON-STATE-1", "timestamp": "2024-03-01T10:00:00"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    latest_id = response.json()["id"]
+
+    state = get_presence_state("state-user")
+    assert state.last_detected_at == datetime(2024, 3, 1, 10, 0, 0)
+    assert state.beacon_id == "TEST-BEACON-STATE-1"
+
+    # An older sighting arriving late must not move the state back
+    response = test_client.post(
+        "/v1/presence-logs/batch",
+        json=[
+            {"user_id": "state-user", "beacon_id": "TEST-BEACON-STATE-2", "timestamp": "2024-03-01T09:00:00"},
+            {"user_id": "state-user-2", "beacon_id": "TEST-BEACON-STATE-2", "timestamp": "2024-03-01T08:00:00"},
+            {"user_id": "state-user-2", "beacon_id": "TEST-BEACON-STATE-1", "timestamp": "2024-03-01T08:30:00"}
+        ],
+        headers=headers
+    )
+    assert response.json()["created"] == 3
+
+    state = get_presence_state("state-user")
+    assert state.last_detected_at == datetime(2024, 3, 1, 10, 0, 0)
+    state = get_presence_state("state-user-2")
+    assert state.last_detected_at == datetime(2024, 3, 1, 8, 30, 0)
+    assert state.beacon_id == "TEST-BEACON-STATE-1"
+
+    # Deleting the latest log falls back to the previous detection
+    response = test_client.delete(f"/v1/presence-logs/{latest_id}", headers=headers)
+    assert response.status_code == 204
+    state = get_presence_state("state-user")
+    assert state.last_detected_at == datetime(2024, 3, 1, 9, 0, 0)
+    assert state.beacon_id == "TEST-BEACON-STATE-2"
+
+
+def test_presence_state_mixed_offset_batch(test_client):
+    """Test that one batch may mix offset and naive timestamps for the same user."""
+    from app.services.presence_state_service import PresenceStateService
+    from datetime import timezone
+
+    states = PresenceStateService.latest_by_user([
+        {"user_id": "mixed-user", "timestamp": datetime(2024, 3, 1, 20, 0, 0), "beacon_id": "A"},
+        {"user_id": "mixed-user", "timestamp": datetime(2024, 3, 1, 14, 0, 0, tzinfo=timezone.utc), "beacon_id": "B"}
+    ])
+    assert states == [{"user_id": "mixed-user", "last_detected_at": datetime(2024, 3, 1, 21, 0, 0), "beacon_id": "B"}]
+
+    headers = get_auth_headers(test_client)
+    create_beacon(test_client, headers, "TEST-BEACON-MIXED")
+    response = test_client.post(
+        "/v1/presence-logs/batch",
+        json=[
+            {"user_id": "mixed-user", "beacon_id": "TEST-BEACON-MIXED", "timestamp": "2024-03-01T20:00:00"},
+            {"user_id": "mixed-user", "beacon_id": "TEST-BEACON-MIXED", "timestamp": "2024-03-01T14:00:00Z"}
+        ],
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+    assert get_presence_state("mixed-user").last_detected_at == datetime(2024, 3, 1, 21, 0, 0)
+
+
+def test_get_presence_logs_cursor_pagination(test_client):
+    """Test that following X-Next-Cursor walks every log exactly once."""
+    headers = get_auth_headers(test_client)
+    # Two logs share a timestamp and are ordered by id
+    add_presence_logs([
+        PresenceLog(
+            id=uuid.uuid4(),
+            user_id="cursor-user",
+            timestamp=datetime(2024, 1, 15, hour, 0, 0)
+        )
+        for hour in (8, 9, 9, 10, 11)
+    ])
+
+    response = test_client.get("/v1/presence-logs?user_id=cursor-user&limit=100", headers=headers)
+    expected_ids = [log["id"] for log in response.json()]
+    assert len(expected_ids) == 5
+
+    seen_ids = []
+    params = {"user_id": "cursor-user", "limit": 2}
+    for _ in range(len(expected_ids) + 1):
+        response = test_client.get("/v1/presence-logs", params=params, headers=headers)
+        assert response.status_code == 200
+        seen_ids.extend(log["id"] for log in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+
+    assert seen_ids == expected_ids
+
+
+def test_get_presence_logs_invalid_cursor(test_client):
+    """Test that malformed cursors and cursor with offset are rejected."""
+    headers = get_auth_headers(test_client)
+
+    response = test_client.get("/v1/presence-logs?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
+
+    response = test_client.get("/v1/presence-logs?cursor=abc&offset=10", headers=headers)
+    assert response.status_code == 400
+
+
+def test_load_presence_rejects_bad_ndjson_lines(tmp_path):
+    """Test that a malformed or non-object NDJSON line is rejected without aborting the load."""
+    from types import SimpleNamespace
+    from unittest.mock import patch
+    from zoneinfo import ZoneInfo
+    from app.tools import load_presence
+
+    dump = tmp_path / "dump.ndjson"
+    dump.write_text("\n".join([
+        '{"user_id": "load-user", "timestamp": "2024-01-15T08:00:00"}',
+        '{"user_id": "load-user", "timestamp": ',
+        '["not", "an", "object"]',
+        '{"user_id": "load-user", "timestamp": "2024-01-15T09:00:00"}'
+    ]) + "\n")
+
+    class FakeCursor:
+        rowcount = 1
+
+        def __init__(self):
+            self.copied = []
+
+        def execute(self, sql):
+            pass
+
+        def fetchall(self):
+            return []
+
+        def copy_expert(self, sql, buffer):
+            self.copied.extend(buffer.read().splitlines())
+
+    cursor = FakeCursor()
+    connection = SimpleNamespace(cursor=lambda: cursor, commit=lambda: None, rollback=lambda: None, close=lambda: None)
+    engine = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), raw_connection=lambda: connection)
+
+    with patch.object(load_presence, "engine", engine):
+        stats = load_presence.load_presence(str(dump), "ndjson", 1, ZoneInfo("Asia/Jakarta"))
+
+    assert (stats.read, stats.loaded, stats.rejected) == (4, 2, 2)
+    assert [row.split(",")[2] for row in cursor.copied] == ["2024-01-15 08:00:00", "2024-01-15 09:00:00"]
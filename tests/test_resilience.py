@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.resilience import AdaptiveRateLimiter, CircuitBreaker, CircuitBreakerOpen
+
+
+def test_circuit_breaker_opens_on_failure_rate_and_probes_half_open():
+    """Test that the breaker opens at the failure rate, fails fast and closes after a good probe."""
+    breaker = CircuitBreaker(name="test", failure_rate_threshold=0.5, window_size=4, min_calls=4, open_seconds=30)
+
+    for outcome in (True, False, True):
+        call = breaker.before_call()
+        breaker.record_success(call) if outcome else breaker.record_failure(call)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure(breaker.before_call())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.before_call()
+    assert breaker.stats()["rejected_total"] == 1
+
+    # After open_seconds one probe is let through
+    with patch("app.core.resilience.time.monotonic", return_value=breaker._opened_at + 31):
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        probe = breaker.before_call()
+        with pytest.raises(CircuitBreakerOpen):
+            breaker.before_call()
+        breaker.record_failure(probe)
+        assert breaker.state == CircuitBreaker.OPEN
+
+    with patch("app.core.resilience.time.monotonic", return_value=breaker._opened_at + 31):
+        breaker.record_success(breaker.before_call())
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    assert breaker.stats()["opened_total"] == 2
+
+
+def test_cancelled_probe_reopens_circuit_breaker():
+    """Test that a half-open probe cancelled before its outcome reopens the breaker instead of wedging it."""
+    from app.services import notification_transport
+
+    breaker = CircuitBreaker(name="test", window_size=2, min_calls=2, open_seconds=30)
+    for _ in range(2):
+        breaker.record_failure(breaker.before_call())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    class HangingClient:
+        async def post(self, *args, **kwargs):
+            await asyncio.sleep(3600)
+
+    async def run_probe():
+        task = asyncio.create_task(notification_transport.post_notification({"to": "token"}))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # Probe right away instead of patching the clock, which the event loop shares
+    breaker.open_seconds = 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with patch.object(notification_transport, "notification_breaker", breaker), \
+            patch.object(notification_transport, "get_http_client", return_value=HangingClient()):
+        asyncio.run(run_probe())
+    assert breaker._state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened_total"] == 2
+    assert breaker.stats()["abandoned_total"] == 1
+
+    # The next probe window admits a call again
+    assert breaker.allows_requests
+    breaker.record_success(breaker.before_call())
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_late_outcomes_do_not_decide_the_probe():
+    """Test that calls admitted before the breaker opened neither close nor reopen it once half-open."""
+    breaker = CircuitBreaker(name="test", window_size=2, min_calls=2, open_seconds=30)
+    slow_failure = breaker.before_call()
+    slow_success = breaker.before_call()
+    for _ in range(2):
+        breaker.record_failure(breaker.before_call())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.open_seconds = 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    probe = breaker.before_call()
+
+    # The slow calls from the closed window finish during the probe
+    breaker.record_success(slow_success)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure(slow_failure)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.stats()["stale_outcomes_total"] == 2
+
+    breaker.record_success(probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["window_calls"] == 0
+    assert breaker.stats()["opened_total"] == 1
+
+
+def test_adaptive_rate_limiter_backs_off_and_recovers():
+    """Test that throttling halves the rate down to the minimum and successes add it back."""
+    limiter = AdaptiveRateLimiter(rate=8, min_rate=1, max_rate=10, burst=2, rate_increase=1)
+
+    limiter.on_throttle()
+    assert limiter.rate == 4
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.rate == 1
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.rate == 10
+    assert limiter.stats()["throttled_total"] == 6
+
+
+def test_adaptive_rate_limiter_paces_calls():
+    """Test that calls beyond the burst wait for tokens."""
+    limiter = AdaptiveRateLimiter(rate=50, min_rate=1, max_rate=50, burst=2)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(5):
+            await limiter.acquire()
+        return loop.time() - started
+
+    elapsed = asyncio.run(run())
+    # 2 calls from the burst, 3 more at 50/s
+    assert elapsed >= 0.05
+    assert limiter.stats()["waited_total"] == 3